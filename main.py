@@ -5,6 +5,8 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), 'src')))
 
 from src.run_pipeline import run_pipeline
+from config import setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     run_pipeline()
@@ -0,0 +1,146 @@
+import hashlib
+import logging
+import math
+import os
+import zlib
+from collections import Counter
+import numpy as np
+from scipy import sparse
+from config import DATA_DIR, NEIGHBORS_TOP_K, NEIGHBORS_FILE
+from text_preprocessing import tokenize_many
+
+# Upper bound on entries of one dense block of the similarity product
+BLOCK_ENTRIES = 16_000_000
+
+def build_tfidf_matrix(texts, min_df=2, max_df=0.5, n_features=None):
+    """
+    Build an L2-normalized sparse TF-IDF matrix (documents x terms) over `texts`.
+
+    Term frequencies are sublinear (1 + log tf) and idf is smoothed. Terms in
+    fewer than `min_df` documents or more than a `max_df` fraction of them
+    are dropped, unless the corpus is too small for any term to pass both,
+    in which case every term is kept. With `n_features`, terms are hashed into that many columns
+    instead of building a vocabulary, so the matrix width stays fixed as the
+    corpus grows.
+    """
+    token_lists = tokenize_many(texts)
+    n_docs = len(token_lists)
+    counts = [Counter(tokens) for tokens in token_lists]
+
+    if n_features:
+        def column(term):
+            return zlib.crc32(term.encode('utf-8')) % n_features
+        width = n_features
+        keep = None
+    else:
+        document_frequency = Counter(term for doc in counts for term in doc)
+        max_count = max_df * n_docs
+        if max_count < min_df:
+            min_df, max_count = 1, n_docs
+        terms = sorted(term for term, df in document_frequency.items() if min_df <= df <= max_count)
+        vocabulary = {term: i for i, term in enumerate(terms)}
+        column = vocabulary.get
+        width = len(vocabulary)
+        keep = vocabulary
+
+    rows, cols, data = [], [], []
+    for row, doc in enumerate(counts):
+        for term, tf in doc.items():
+            if keep is not None and term not in keep:
+                continue
+            rows.append(row)
+            cols.append(column(term))
+            data.append(1.0 + math.log(tf))
+
+    matrix = sparse.csr_matrix(
+        (np.asarray(data, dtype=np.float32), (rows, cols)), shape=(n_docs, width), dtype=np.float32
+    )
+    matrix.sum_duplicates()
+
+    df = np.bincount(matrix.indices, minlength=width)
+    idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+    matrix = matrix @ sparse.diags(idf)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.csr_matrix(sparse.diags(1 / norms) @ matrix, dtype=np.float32)
+
+def top_k_neighbors(matrix, k=NEIGHBORS_TOP_K, block_size=None):
+    """
+    Return (neighbors, scores): each row's `k` most cosine-similar other rows.
+
+    The product matrix @ matrix.T is computed in row blocks sized so each dense
+    block stays under BLOCK_ENTRIES values. Missing neighbours are -1 with score 0.
+    """
+    n = matrix.shape[0]
+    k = min(k, max(n - 1, 0))
+    neighbors = np.full((n, k), -1, dtype=np.int32)
+    scores = np.zeros((n, k), dtype=np.float32)
+    if k == 0:
+        return neighbors, scores
+
+    block_size = block_size or max(1, BLOCK_ENTRIES // n)
+    transposed = matrix.T.tocsc()
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = (matrix[start:stop] @ transposed).toarray()
+        block[np.arange(stop - start), np.arange(start, stop)] = -1  # exclude self
+        top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(block, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+        empty = top_scores <= 0
+        top[empty] = -1
+        top_scores[empty] = 0
+        neighbors[start:stop] = top
+        scores[start:stop] = top_scores
+    return neighbors, scores
+
+def corpus_fingerprint(papers):
+    digest = hashlib.sha256()
+    for paper in papers:
+        digest.update((paper.get('id') or '').encode('utf-8'))
+        digest.update(b'\0')
+        digest.update((paper.get('summary') or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+def get_neighbor_table(papers, k=NEIGHBORS_TOP_K, path=None):
+    """
+    Return (neighbors, scores) over the papers' abstracts, reusing the persisted table when the
+    papers (ids and abstracts, in order) and `k` are unchanged. The table is saved with the
+    papers' ids so load_related_papers can read it by arXiv id.
+    """
+    path = path or os.path.join(DATA_DIR, NEIGHBORS_FILE)
+    fingerprint = corpus_fingerprint(papers)
+    if os.path.exists(path):
+        with np.load(path) as saved:
+            if ('ids' in saved.files and str(saved['fingerprint']) == fingerprint
+                    and saved['neighbors'].shape[1] == min(k, max(len(papers) - 1, 0))):
+                logging.info(f"Reusing abstract neighbour table from {path}")
+                return saved['neighbors'], saved['scores']
+
+    matrix = build_tfidf_matrix([paper.get('summary') or '' for paper in papers])
+    neighbors, scores = top_k_neighbors(matrix, k)
+    ids = np.array([paper.get('id') or '' for paper in papers])
+    np.savez_compressed(path, fingerprint=np.array(fingerprint), ids=ids, neighbors=neighbors, scores=scores)
+    logging.info(f"Saved abstract neighbour table for {len(papers)} papers to {path}")
+    return neighbors, scores
+
+def load_related_papers(path=None):
+    """Read the persisted table as {paper_id: [(neighbor_id, score), ...]}, or {} if there is none."""
+    path = path or os.path.join(DATA_DIR, NEIGHBORS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with np.load(path) as saved:
+        if 'ids' not in saved.files:
+            return {}
+        ids = saved['ids']
+        return {
+            str(ids[row]): [
+                (str(ids[neighbor]), float(score))
+                for neighbor, score in zip(saved['neighbors'][row], saved['scores'][row]) if neighbor >= 0
+            ]
+            for row in range(len(ids))
+        }
@@ -1,104 +1,412 @@
 import requests
+import urllib3
 import xml.etree.ElementTree as ET
-import json
+import io
 from datetime import datetime, timedelta
 import os
 import logging
-from config import CATEGORIES, MAX_RESULTS, DATA_DIR, LOG_FILE
+from config import (
+    CATEGORIES, MAX_RESULTS, MAX_TOTAL_RESULTS, MAX_CONCURRENT_REQUESTS,
+    REQUEST_DELAY, PAGE_RETRIES, REQUEST_TIMEOUT, DATA_DIR, LOG_FILE,
+    LAST_UPDATE_FILE, FETCH_WINDOW_DAYS, parse_day, setup_logging, log_to_file
+)
+from paper_store import PaperStore
+from paper_files import latest_papers_path, write_papers
+import metrics
+import queue
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import pytz
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_FILE),
-        logging.StreamHandler()
-    ]
-)
-
 BASE_URL = "http://export.arxiv.org/api/query?"
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+OPENSEARCH_NS = '{http://a9.com/-/spec/opensearch/1.1/}'
+ENTRY_TAG = f'{ATOM_NS}entry'
+TOTAL_RESULTS_TAG = f'{OPENSEARCH_NS}totalResults'
 
-def get_date_range():
+def get_date_range(store=None):
+    """
+    Return the (start, end) submission dates to query.
+
+    Without a store this is the last FETCH_WINDOW_DAYS days in PST. With a
+    store that already holds papers, the range starts at the day of its
+    high-water mark so only new submissions are requested.
+    """
     pst = pytz.timezone('US/Pacific')
     now = datetime.now(pst)
     today = now.date()
-    two_days_ago = today - timedelta(days=2)
-    return two_days_ago, today
+    start_date = today - timedelta(days=FETCH_WINDOW_DAYS)
+    if store is not None:
+        high_water_mark = store.get_high_water_mark()
+        if high_water_mark is not None:
+            start_date = min(high_water_mark.date(), today)
+    return start_date, today
+
+def get_last_run_date():
+    file_path = os.path.join(DATA_DIR, LAST_UPDATE_FILE)
+    if os.path.exists(file_path):
+        with open(file_path, 'r') as f:
+            return datetime.strptime(f.read().strip(), '%Y-%m-%d').date()
+    return datetime.now().date() - timedelta(days=1)
+
+def save_last_run_date(date):
+    file_path = os.path.join(DATA_DIR, LAST_UPDATE_FILE)
+    with open(file_path, 'w') as f:
+        f.write(date.strftime('%Y-%m-%d'))
 
 def create_query(start_date, end_date):
     categories = ' OR '.join([f'cat:{cat}' for cat in CATEGORIES])
     return f"({categories}) AND submittedDate:[{start_date.strftime('%Y%m%d')}000000 TO {end_date.strftime('%Y%m%d')}235959]"
 
-def get_request_params(query):
+def get_request_params(query, start=0, max_results=MAX_RESULTS):
     return {
         'search_query': query,
-        'max_results': MAX_RESULTS,
+        'start': start,
+        'max_results': max_results,
         'sortBy': 'submittedDate',
         'sortOrder': 'descending'
     }
 
+def create_session():
+    """Create a pooled session shared by all page requests of a fetch."""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_REQUESTS)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({'Accept-Encoding': 'gzip, deflate'})
+    return session
+
+# Next request slot shared with other processes (see share_request_throttle); None keeps it per process
+_shared_slot = None
+
+def share_request_throttle(slot):
+    """
+    Make every RequestThrottle in this process use `slot`, a multiprocessing.Value('d')
+    shared with other processes, so parallel workers together honour REQUEST_DELAY.
+    """
+    global _shared_slot
+    _shared_slot = slot
+
+class RequestThrottle:
+    """Spaces out request start times so concurrent pages still honour REQUEST_DELAY."""
+
+    def __init__(self, delay, shared_slot=None):
+        self.delay = delay
+        self._shared = shared_slot if shared_slot is not None else _shared_slot
+        self._lock = self._shared.get_lock() if self._shared is not None else threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            next_slot = self._shared.value if self._shared is not None else self._next_slot
+            slot = max(now, next_slot)
+            if self._shared is not None:
+                self._shared.value = slot + self.delay
+            else:
+                self._next_slot = slot + self.delay
+        if slot > now:
+            time.sleep(slot - now)
+
+def fetch_page(session, throttle, query, start, page_size=MAX_RESULTS, on_paper=None):
+    """
+    Fetch a single page of results starting at offset `start`.
+
+    The response body is parsed as it streams in; `on_paper` is called with
+    each paper as soon as its <entry> has been read.
+
+    Returns:
+        tuple: (total_results, papers), or None once the page's retry budget is used up.
+    """
+    params = get_request_params(query, start, page_size)
+    retry_delay = 5  # seconds
+
+    for attempt in range(PAGE_RETRIES):
+        throttle.wait()
+        try:
+            total = {}
+            papers = []
+            with session.get(BASE_URL, params=params, timeout=REQUEST_TIMEOUT, stream=True) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                for paper in iter_arxiv_entries(response.raw, on_total=lambda n: total.setdefault('value', n)):
+                    papers.append(paper)
+                    if on_paper:
+                        on_paper(paper)
+                metrics.count('http_requests')
+                # tell() is what came over the wire, before gzip decoding
+                metrics.count('http_bytes', response.raw.tell())
+            total = total.get('value')
+            # arXiv occasionally answers with an empty page for offsets it does have
+            if not papers and total and start < total:
+                raise ValueError(f"Empty page at offset {start} of {total}")
+            logging.info(f"Fetched {len(papers)} papers at offset {start}")
+            return total, papers
+        # Reading the streamed body raises urllib3's own errors (dropped connection,
+        # read timeout, bad gzip), which requests only wraps for iter_content
+        except (requests.exceptions.RequestException, urllib3.exceptions.HTTPError, ET.ParseError, ValueError) as e:
+            metrics.count('http_errors')
+            logging.warning(f"Page at offset {start}, attempt {attempt + 1} failed: {str(e)}")
+            if attempt < PAGE_RETRIES - 1:
+                time.sleep(retry_delay * 2 ** attempt)
+
+    logging.error(f"Max retries reached. Giving up on page at offset {start}.")
+    return None
+
+def merge_pages(pages):
+    """Merge pages keyed by offset into one list, dropping duplicate entries."""
+    seen = set()
+    papers = []
+    for start in sorted(pages):
+        for paper in pages[start]:
+            if paper['id'] in seen:
+                continue
+            seen.add(paper['id'])
+            papers.append(paper)
+    return papers
+
+def fetch_all_pages(query, on_page=None, on_paper=None, session_factory=None, delay=None):
+    """
+    Fetch every page of `query`, calling `on_page(start, papers)` as pages complete.
+
+    `session_factory` (default create_session) and `delay` (default
+    REQUEST_DELAY) let benchmarks serve pages from a local stand-in without
+    the politeness delay.
+
+    Returns:
+        list: Offsets of pages that could not be fetched.
+    """
+    with (session_factory or create_session)() as session:
+        throttle = RequestThrottle(REQUEST_DELAY if delay is None else delay)
+        first_page = fetch_page(session, throttle, query, 0, on_paper=on_paper)
+        if first_page is None:
+            logging.error("Unable to fetch the first page of results.")
+            return [0]
+
+        total, papers = first_page
+        if on_page:
+            on_page(0, papers)
+        total = min(total if total is not None else len(papers), MAX_TOTAL_RESULTS)
+        offsets = range(MAX_RESULTS, total, MAX_RESULTS)
+        logging.info(f"Total results: {total}, fetching {len(offsets)} more pages")
+
+        failed = []
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+            futures = {
+                executor.submit(fetch_page, session, throttle, query, start, on_paper=on_paper): start
+                for start in offsets
+            }
+            try:
+                for future in as_completed(futures):
+                    start = futures[future]
+                    result = future.result()
+                    if result is None:
+                        failed.append(start)
+                    elif on_page:
+                        on_page(start, result[1])
+            except BaseException:
+                # Don't start the remaining pages once a callback has failed
+                for future in futures:
+                    future.cancel()
+                raise
+
+    if failed:
+        logging.warning(f"Skipped {len(failed)} pages that could not be fetched: offsets {sorted(failed)}")
+    return failed
+
 def fetch_papers(start_date, end_date):
+    """
+    Fetch every paper submitted from `start_date` to `end_date`.
+
+    Returns:
+        tuple: (papers, offsets of the pages that could not be fetched).
+    """
     query = create_query(start_date, end_date)
-    params = get_request_params(query)
-    
+
     logging.info(f"Fetching papers submitted from {start_date} to {end_date} (PST)")
     logging.info(f"Query: {query}")
-    logging.info(f"Params: {params}")
-    
-    max_retries = 3
-    retry_delay = 5  # seconds
-    
-    for attempt in range(max_retries):
+
+    pages = {}
+    failed = fetch_all_pages(query, on_page=pages.__setitem__)
+    papers = merge_pages(pages)
+    logging.info(f"Number of papers fetched: {len(papers)}")
+    return papers, failed
+
+class StreamClosed(Exception):
+    """Raised in stream_papers' download threads once the consumer has stopped reading."""
+
+def stream_papers(start_date, end_date):
+    """
+    Yield papers as soon as they are parsed off the wire, while later pages are still downloading.
+
+    Papers arrive in completion order rather than submission order, and
+    entries repeated across pages or retried pages are only yielded once.
+    Stopping early (break, or an exception in the consumer) cancels the
+    pages not yet downloaded.
+    """
+    query = create_query(start_date, end_date)
+    logging.info(f"Streaming papers submitted from {start_date} to {end_date} (PST)")
+
+    papers = queue.Queue(maxsize=MAX_RESULTS)
+    done = object()
+    stop = threading.Event()
+
+    def put(item):
+        # Wait for room in the queue only while someone is still consuming it
+        while not stop.is_set():
+            try:
+                papers.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+        raise StreamClosed()
+
+    def produce():
         try:
-            response = requests.get(BASE_URL, params=params)
-            response.raise_for_status()
-            logging.info(f"Response status code: {response.status_code}")
-            logging.info(f"Response content (first 500 characters): {response.text[:500]}")
-            root = ET.fromstring(response.text)
-            papers = parse_arxiv_response(root)
-            logging.info(f"Number of papers fetched: {len(papers)}")
-            return papers
-        except requests.exceptions.RequestException as e:
-            logging.warning(f"Attempt {attempt + 1} failed: {str(e)}")
-            if attempt < max_retries - 1:
-                time.sleep(retry_delay)
-            else:
-                logging.error("Max retries reached. Unable to fetch papers.")
-                return []
+            fetch_all_pages(query, on_paper=put)
+        except StreamClosed:
+            pass
+        finally:
+            if not stop.is_set():
+                put(done)
 
-def parse_arxiv_response(root):
-    papers = []
-    for entry in root.findall('{http://www.w3.org/2005/Atom}entry'):
-        paper = {
-            'id': entry.find('{http://www.w3.org/2005/Atom}id').text,
-            'title': entry.find('{http://www.w3.org/2005/Atom}title').text,
-            'summary': entry.find('{http://www.w3.org/2005/Atom}summary').text,
-            'authors': [author.find('{http://www.w3.org/2005/Atom}name').text for author in entry.findall('{http://www.w3.org/2005/Atom}author')],
-            'categories': [category.get('term') for category in entry.findall('{http://www.w3.org/2005/Atom}category')],
-            'published': entry.find('{http://www.w3.org/2005/Atom}published').text,
-            'updated': entry.find('{http://www.w3.org/2005/Atom}updated').text,
-        }
-        papers.append(paper)
-    return papers
+    producer = threading.Thread(target=produce, name='stream-papers', daemon=True)
+    producer.start()
 
-def save_papers(papers):
-    filename = os.path.join(DATA_DIR, "latest_papers.json")
-    with open(filename, 'w') as f:
-        json.dump(papers, f, indent=2)
-    logging.info(f"Saved {len(papers)} papers to {filename}")
+    seen = set()
+    try:
+        while True:
+            paper = papers.get()
+            if paper is done:
+                break
+            if paper['id'] in seen:
+                continue
+            seen.add(paper['id'])
+            yield paper
+    finally:
+        stop.set()
+        producer.join()
 
-def main():
-    start_date, end_date = get_date_range()
-    logging.info(f"Fetching papers from {start_date} to {end_date} (PST)")
-    papers = fetch_papers(start_date, end_date)
-    
+def entry_to_paper(entry):
+    return {
+        'id': entry.findtext(f'{ATOM_NS}id'),
+        'title': entry.findtext(f'{ATOM_NS}title'),
+        'summary': entry.findtext(f'{ATOM_NS}summary'),
+        'authors': [author.findtext(f'{ATOM_NS}name') for author in entry.iterfind(f'{ATOM_NS}author')],
+        'categories': [category.get('term') for category in entry.iterfind(f'{ATOM_NS}category')],
+        'published': entry.findtext(f'{ATOM_NS}published'),
+        'updated': entry.findtext(f'{ATOM_NS}updated'),
+    }
+
+def iter_arxiv_entries(source, on_total=None):
+    """
+    Incrementally parse an Atom feed, yielding one paper per <entry>.
+
+    Finished entries are cleared from the tree as soon as they have been
+    converted, so memory stays flat however large the feed is.
+
+    Args:
+        source: A file-like object streaming the feed, or the feed as str/bytes.
+        on_total (callable, optional): Called with opensearch:totalResults when it is read.
+    """
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+
+    context = ET.iterparse(source, events=('start', 'end'))
+    _, root = next(context)
+    depth = 0
+    for event, elem in context:
+        if event == 'start':
+            depth += 1
+            continue
+        depth -= 1
+        if depth:
+            continue
+        # Direct child of <feed> is complete
+        if elem.tag == ENTRY_TAG:
+            yield entry_to_paper(elem)
+        elif elem.tag == TOTAL_RESULTS_TAG and on_total and elem.text:
+            on_total(int(elem.text))
+        root.clear()
+
+def parse_arxiv_response(source):
+    """Parse a whole feed (an Element, str, bytes or stream) into a list of papers."""
+    if isinstance(source, ET.Element):
+        return [entry_to_paper(entry) for entry in source.iterfind(ENTRY_TAG)]
+    return list(iter_arxiv_entries(source))
+
+def fetch_daily_papers(date=None):
+    """
+    Fetch papers and add them to the paper store.
+
+    Args:
+        date (str or date, optional): Fetch the papers submitted on this day
+            ('YYYY-MM-DD'). Defaults to the usual window ending today (PST).
+
+    Raises:
+        RuntimeError: Some pages could not be fetched. The papers that were
+            fetched are stored, but the day is not reported as collected, so a
+            backfill fetches it again.
+    """
+    day = parse_day(date)
+    if day is None:
+        start_date, end_date = get_date_range()
+    else:
+        start_date = end_date = day
+    papers, failed = fetch_papers(start_date, end_date)
     if papers:
-        save_papers(papers)
-        logging.info(f"Saved {len(papers)} papers")
+        with PaperStore() as store:
+            store.upsert_papers(papers, advance_high_water_mark=not failed)
+    if failed:
+        raise RuntimeError(f"{len(failed)} pages from {start_date} to {end_date} could not be fetched")
+    return papers
+
+def save_papers(papers, date=None):
+    """
+    Write the papers handed to the downstream stages in PAPERS_FORMAT, in the
+    day's artifact directory when `date` is given.
+    """
+    filename = latest_papers_path(date)
+    count = write_papers(papers, filename)
+    logging.info(f"Saved {count} papers to {filename}")
+
+def main(date=None):
+    """Collect papers, logging to LOG_FILE as well as wherever the caller's logging goes."""
+    setup_logging()
+    with log_to_file(LOG_FILE):
+        collect(date)
+
+def collect(date=None):
+    if date is not None:
+        # A specific day is written even when empty, so a backfill can tell a quiet day from a failed one
+        save_papers(fetch_daily_papers(date), date)
+        return
+
+    logging.info(f"Last successful collection: {get_last_run_date()}")
+    with PaperStore() as store:
+        start_date, end_date = get_date_range(store)
+        logging.info(f"Fetching papers from {start_date} to {end_date} (PST)")
+        papers, failed = fetch_papers(start_date, end_date)
+        if papers:
+            # With pages missing, the next run has to start from the old mark to fetch them again
+            store.upsert_papers(papers, advance_high_water_mark=not failed)
+
+        # Downstream stages still see the full window, served from the store
+        window_start = end_date - timedelta(days=FETCH_WINDOW_DAYS)
+        recent_papers = store.get_papers(since=window_start)
+
+    if failed:
+        logging.warning(f"{len(failed)} pages could not be fetched; the next run fetches from {start_date} again")
+    if recent_papers:
+        save_papers(recent_papers)
+        if not failed:
+            save_last_run_date(end_date)
+        logging.info(f"Saved {len(recent_papers)} papers ({len(papers)} newly fetched)")
     else:
-        logging.warning(f"No papers found from {start_date} to {end_date} (PST)")
+        logging.warning(f"No papers found from {window_start} to {end_date} (PST)")
     
     logging.info("Paper collection process completed")
 
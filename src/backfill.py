@@ -0,0 +1,106 @@
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from config import (
+    BACKFILL_PROCESSES, LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, artifact_dir, parse_day
+)
+from stage_runner import StageFailed
+from paper_files import count_papers, find_latest_papers
+
+# Stages run for every day of a backfill, each for all days before the next starts, so
+# word cloud windows and trend history see the whole range when charts are rendered
+BACKFILL_STAGES = ['collect', 'analyze', 'visualize']
+
+def days_between(start_date, end_date):
+    start_date, end_date = parse_day(start_date), parse_day(end_date)
+    if end_date < start_date:
+        raise ValueError(f"Backfill end {end_date} is before its start {start_date}")
+    return [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+
+def create_shared_limits():
+    """Shared-memory rate limit state handed to every worker, so the pool as a whole honours the limits."""
+    now = time.monotonic()
+    return {
+        'arxiv_slot': multiprocessing.Value('d', 0.0),
+        'llm_requests': multiprocessing.Array('d', [LLM_REQUESTS_PER_MINUTE, now]),
+        'llm_tokens': multiprocessing.Array('d', [LLM_TOKENS_PER_MINUTE, now]),
+    }
+
+def _init_worker(limits):
+    import arxiv_data_collector
+    import llm_client
+    arxiv_data_collector.share_request_throttle(limits['arxiv_slot'])
+    llm_client.share_rate_limits(limits['llm_requests'], limits['llm_tokens'])
+
+def run_day_stage(day, stage):
+    """Run one stage for one day through that day's checkpointed runner; returns an outcome string."""
+    from run_pipeline import stage_runner
+    try:
+        outcome = stage_runner(day).run(start=stage, end=stage)
+        return outcome.get(stage, 'skipped')
+    except StageFailed as e:
+        logging.error(f"{day}: {e}")
+        return f"failed at {stage}: {e}"
+
+def has_papers(day):
+    try:
+        return count_papers(find_latest_papers(day)) > 0
+    except (FileNotFoundError, ValueError):
+        return False
+
+def backfill(start_date, end_date, processes=None, build_site=True):
+    """
+    Collect, analyze and render every day from `start_date` to `end_date`, then publish them.
+
+    Days run in parallel on a process pool, one stage at a time across all
+    days. Workers share the arXiv request throttle and the LLM rate limit
+    buckets, and each day writes to its own artifact directory with its own
+    stage manifest, so an interrupted backfill picks up where it stopped.
+    Days without papers (weekends, holidays) are skipped after collection.
+
+    Returns:
+        dict: {'YYYY-MM-DD': outcome} with 'done', 'no papers' or 'failed at <stage>: ...'.
+    """
+    days = days_between(start_date, end_date)
+    processes = max(1, min(processes or BACKFILL_PROCESSES, len(days)))
+    outcomes = {}
+    pending = list(days)
+
+    logging.info(f"Backfilling {len(days)} days from {days[0]} to {days[-1]} with {processes} processes")
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(create_shared_limits(),)) as executor:
+        for stage in BACKFILL_STAGES:
+            started = time.time()
+            results = list(executor.map(run_day_stage, pending, [stage] * len(pending)))
+            still_pending = []
+            for day, outcome in zip(pending, results):
+                if outcome.startswith('failed'):
+                    outcomes[str(day)] = outcome
+                elif stage == 'collect' and not has_papers(day):
+                    outcomes[str(day)] = 'no papers'
+                else:
+                    still_pending.append(day)
+            logging.info(f"Backfill {stage}: {len(still_pending)} of {len(pending)} days ok "
+                         f"in {time.time() - started:.1f}s")
+            pending = still_pending
+
+    for day in pending:
+        outcomes[str(day)] = 'done'
+
+    if build_site and pending:
+        publish_days(pending)
+    return outcomes
+
+def publish_days(days):
+    """Add the given days to the site in one incremental build, each with its rising and falling trends."""
+    from website_generator import SiteBuilder, load_results, load_trend_changes
+    builder = SiteBuilder()
+    for day in days:
+        results = load_results(day)
+        if results is not None:
+            builder.add_day(day, results, image_dir=artifact_dir(day), trend_changes=load_trend_changes(day))
+    written = builder.build()
+    logging.info(f"Published {len(days)} backfilled days: {len(written)} site files written")
+    return written
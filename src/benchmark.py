@@ -0,0 +1,405 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from config import (
+    DATA_DIR, BENCHMARK_SIZES, BENCHMARK_DIR, BENCHMARK_THRESHOLD, BENCHMARK_MIN_SECONDS, MAX_TOTAL_RESULTS
+)
+import metrics
+from synthetic_data import synthetic_papers, atom_feed, LocalArxivSession
+
+# name -> (setup, largest corpus size it runs at); setup(papers, work_dir) returns the callable to time
+BENCHMARKS = {}
+
+def benchmark(name, max_size=None):
+    def register(setup):
+        BENCHMARKS[name] = (setup, max_size)
+        return setup
+    return register
+
+_corpus = []
+
+def corpus(size):
+    """The first `size` papers of the synthetic corpus; smaller corpora are prefixes of larger ones."""
+    if len(_corpus) < size:
+        _corpus[:] = synthetic_papers(size)
+    return _corpus[:size]
+
+class _FreshPaths:
+    """Fresh names for state that must not be reused between repeats (layout and neighbour caches)."""
+
+    def __init__(self, work_dir):
+        self.work_dir = work_dir
+        self.n = 0
+
+    def path(self, name):
+        self.n += 1
+        return os.path.join(self.work_dir, f"{self.n}-{name}")
+
+@benchmark('parse_arxiv_response')
+def bench_parse(papers, work_dir):
+    from arxiv_data_collector import parse_arxiv_response
+    feed = atom_feed(papers)
+    return lambda: parse_arxiv_response(feed)
+
+@benchmark('fetch_all_pages')
+def bench_fetch(papers, work_dir):
+    from arxiv_data_collector import fetch_all_pages, create_query
+    served = papers[:MAX_TOTAL_RESULTS]
+    query = create_query(datetime(2024, 1, 1), datetime(2024, 1, 2))
+    return lambda: fetch_all_pages(query, session_factory=lambda: LocalArxivSession(served), delay=0)
+
+@benchmark('preprocess_text')
+def bench_preprocess(papers, work_dir):
+    from text_preprocessing import tokenize_many, get_stopwords
+    get_stopwords()
+    texts = [paper['summary'] for paper in papers]
+    return lambda: tokenize_many(texts)
+
+@benchmark('calculate_similarity')
+def bench_calculate_similarity(papers, work_dir):
+    from visual_summary import calculate_similarity
+    rng = random.Random(0)
+    pairs = [(rng.choice(papers), rng.choice(papers)) for _ in range(10000)]
+    return lambda: [calculate_similarity(a, b) for a, b in pairs]
+
+@benchmark('network_edges', max_size=10000)
+def bench_network_edges(papers, work_dir):
+    from similarity import title_tokens, shared_term_pairs
+    return lambda: shared_term_pairs([title_tokens(paper) for paper in papers], min_shared=2)
+
+@benchmark('paper_network_edges', max_size=10000)
+def bench_paper_network_edges(papers, work_dir):
+    from similarity import title_tokens, jaccard_pairs
+    return lambda: jaccard_pairs([title_tokens(paper) for paper in papers], 0.3)
+
+@benchmark('abstract_neighbors', max_size=10000)
+def bench_abstract_neighbors(papers, work_dir):
+    from abstract_similarity import get_neighbor_table
+    paths = _FreshPaths(work_dir)
+    return lambda: get_neighbor_table(papers, path=paths.path('neighbors.npz'))
+
+@benchmark('graph_layout', max_size=10000)
+def bench_graph_layout(papers, work_dir):
+    import networkx as nx
+    from graph_layout import layout_graph
+    from similarity import title_tokens, jaccard_pairs
+    G = nx.Graph()
+    for i, paper in enumerate(papers):
+        G.add_node(i, paper_id=paper['id'])
+    G.add_edges_from((i, j) for i, j, _ in jaccard_pairs([title_tokens(paper) for paper in papers], 0.3))
+    paths = _FreshPaths(work_dir)
+    return lambda: layout_graph(G, positions_path=paths.path('positions.json'), cache_dir=paths.path('cache'))
+
+@benchmark('render_charts')
+def bench_render(papers, work_dir):
+    import rendering
+    from text_preprocessing import count_tokens
+    from visual_summary import generate_frequency_wordcloud, generate_trend_graph
+    frequencies = dict(count_tokens(paper['summary'] for paper in papers[:2000]).most_common(200))
+    days = [(datetime(2024, 1, 1) + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(30)]
+    rng = random.Random(0)
+    history = {'days': days, 'series': {f"Trend {n}": [rng.randint(0, 20) for _ in days] for n in range(5)}}
+    jobs = [
+        (generate_frequency_wordcloud, (frequencies,), os.path.join(work_dir, 'wordcloud.png')),
+        (generate_trend_graph, (history,), os.path.join(work_dir, 'trend_graph.png')),
+    ]
+    return lambda: rendering.render_charts(jobs, processes=1)
+
+@benchmark('format_papers')
+def bench_format_papers(papers, work_dir):
+    from prompt_format import format_papers
+    return lambda: format_papers(papers)
+
+@benchmark('chunk_papers')
+def bench_chunk_papers(papers, work_dir):
+    from content_analysis import chunk_papers
+    return lambda: chunk_papers(papers)
+
+def _papers_file(papers, work_dir, fmt):
+    from paper_files import PAPERS_FILE_NAMES, write_papers
+    path = os.path.join(work_dir, PAPERS_FILE_NAMES[fmt])
+    write_papers(papers, path)
+    return path
+
+@benchmark('load_papers_json')
+def bench_load_papers_json(papers, work_dir):
+    from paper_files import iter_papers
+    path = _papers_file(papers, work_dir, 'json')
+    return lambda: list(iter_papers(path))
+
+@benchmark('load_papers_jsonl')
+def bench_load_papers_jsonl(papers, work_dir):
+    from paper_files import iter_papers
+    path = _papers_file(papers, work_dir, 'jsonl')
+    return lambda: list(iter_papers(path))
+
+@benchmark('load_papers_columnar')
+def bench_load_papers_columnar(papers, work_dir):
+    from paper_files import iter_papers
+    path = _papers_file(papers, work_dir, 'columnar')
+    return lambda: list(iter_papers(path))
+
+@benchmark('read_titles_jsonl')
+def bench_read_titles_jsonl(papers, work_dir):
+    from paper_files import read_columns
+    path = _papers_file(papers, work_dir, 'jsonl')
+    return lambda: read_columns(path, ['title'])
+
+@benchmark('read_titles_columnar')
+def bench_read_titles_columnar(papers, work_dir):
+    from paper_files import read_columns
+    path = _papers_file(papers, work_dir, 'columnar')
+    return lambda: read_columns(path, ['title'])
+
+@contextmanager
+def local_analysis(work_dir):
+    """Point content_analysis at the local LLM stand-in, without rate limits, cache or shared paper store."""
+    import content_analysis
+    from llm_backends import LocalBackend
+    from llm_cache import ResponseCache
+    from llm_client import LLMClient
+    from paper_store import PaperStore
+    saved = (content_analysis._backend, content_analysis._llm_client,
+             content_analysis.response_cache, content_analysis.PaperStore)
+    try:
+        backend = LocalBackend('instant')
+        paths = _FreshPaths(work_dir)
+        content_analysis._backend = backend
+        content_analysis._llm_client = LLMClient(backend.generate, requests_per_minute=10 ** 9, tokens_per_minute=10 ** 12)
+        content_analysis.response_cache = ResponseCache(enabled=False)
+        content_analysis.PaperStore = lambda: PaperStore(paths.path('papers.db'))
+        yield content_analysis
+    finally:
+        (content_analysis._backend, content_analysis._llm_client,
+         content_analysis.response_cache, content_analysis.PaperStore) = saved
+
+@benchmark('paper_analyzer', max_size=10000)
+def bench_paper_analyzer(papers, work_dir):
+    def run():
+        with local_analysis(work_dir) as content_analysis:
+            content_analysis.paper_analyzer_agent(papers)
+    return run
+
+def site_days(papers, papers_per_day=100):
+    """Day results for the site benchmarks, one day per `papers_per_day` papers."""
+    days = []
+    start = datetime(2024, 1, 1).date()
+    for n, i in enumerate(range(0, len(papers), papers_per_day)):
+        day_papers = papers[i:i + papers_per_day]
+        days.append((start + timedelta(days=n), {
+            'summary': ' '.join(paper['summary'] for paper in day_papers[:3]),
+            'trends': '\n'.join(f"{k}. {paper['title']}" for k, paper in enumerate(day_papers[:5], 1)),
+            'top_articles': '\n'.join(f"- **{paper['title']}**: {paper['summary'][:200]}" for paper in day_papers[:5]),
+        }))
+    return days
+
+@benchmark('site_build')
+def bench_site_build(papers, work_dir):
+    from website_generator import SiteBuilder
+    days = site_days(papers)
+    paths = _FreshPaths(work_dir)
+
+    def run():
+        builder = SiteBuilder(paths.path('site'), cache_dir=os.path.join(work_dir, 'template_cache'))
+        for day, results in days:
+            builder.add_day(day, results, image_dir=work_dir)
+        builder.build()
+    return run
+
+@benchmark('site_incremental')
+def bench_site_incremental(papers, work_dir):
+    from website_generator import SiteBuilder
+    days = site_days(papers)
+    output_dir = os.path.join(work_dir, 'site')
+    cache_dir = os.path.join(work_dir, 'template_cache')
+    builder = SiteBuilder(output_dir, cache_dir=cache_dir)
+    for day, results in days:
+        builder.add_day(day, results, image_dir=work_dir)
+    builder.build()
+    next_day = [days[-1][0]]
+
+    def run():
+        next_day[0] += timedelta(days=1)
+        builder = SiteBuilder(output_dir, cache_dir=cache_dir)
+        builder.add_day(next_day[0], days[-1][1], image_dir=work_dir)
+        builder.build()
+    return run
+
+def default_repeat(size):
+    return 5 if size <= 1000 else 3 if size <= 10000 else 1
+
+def run_benchmark(name, size, repeat=None):
+    """
+    Time one benchmark on the first `size` synthetic papers.
+
+    Setup (building the feed, graph or site to start from) is not timed.
+    Returns the best and median of `repeat` runs in seconds and the peak
+    RSS while they ran.
+    """
+    setup, _ = BENCHMARKS[name]
+    repeat = repeat or default_repeat(size)
+    with tempfile.TemporaryDirectory() as work_dir:
+        run = setup(corpus(size), work_dir)
+        times = []
+        metrics.reset_peak_rss()
+        for _ in range(repeat):
+            gc.collect()
+            started = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - started)
+        rss = metrics.peak_rss_mb()
+    return {
+        'seconds': round(min(times), 6),
+        'median_seconds': round(statistics.median(times), 6),
+        'repeat': repeat,
+        'peak_rss_mb': round(rss, 1) if rss is not None else None,
+    }
+
+def run_benchmarks(sizes=None, names=None, repeat=None, on_result=None):
+    """
+    Run the selected benchmarks at every size they support. Returns a results document.
+
+    `on_result(name, size, result)` is called as each measurement finishes, for progress.
+    """
+    sizes = sorted(sizes or BENCHMARK_SIZES)
+    names = names or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {unknown}. Benchmarks: {', '.join(BENCHMARKS)}")
+
+    results = {}
+    for name in names:
+        max_size = BENCHMARKS[name][1]
+        for size in sizes:
+            if max_size is not None and size > max_size:
+                continue
+            result = run_benchmark(name, size, repeat)
+            results.setdefault(name, {})[str(size)] = result
+            logging.info(f"{name} [{size}]: {result['seconds']:.4f}s")
+            if on_result:
+                on_result(name, size, result)
+    return {
+        'created': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+
+def save_results(document, path=None):
+    if path is None:
+        directory = os.path.join(DATA_DIR, BENCHMARK_DIR)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"bench-{document['created'].replace(':', '').replace('-', '')}.json")
+    with open(path, 'w') as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+    return path
+
+def load_results(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def compare_results(baseline, current, threshold=BENCHMARK_THRESHOLD, min_seconds=BENCHMARK_MIN_SECONDS):
+    """
+    Compare two results documents benchmark by benchmark.
+
+    A result regresses when it is more than `threshold` (a fraction) slower
+    than the baseline and by more than `min_seconds`, which keeps timer noise
+    on very fast benchmarks from being flagged.
+
+    Returns:
+        list: (name, size, baseline seconds, current seconds, ratio, status)
+        for every result in both documents, status 'regression', 'improved' or 'ok'.
+    """
+    rows = []
+    for name, sizes in sorted(current['results'].items()):
+        for size, result in sorted(sizes.items(), key=lambda item: int(item[0])):
+            before = baseline['results'].get(name, {}).get(size)
+            if before is None:
+                continue
+            old, new = before['seconds'], result['seconds']
+            ratio = new / old if old else float('inf')
+            if ratio > 1 + threshold and new - old > min_seconds:
+                status = 'regression'
+            elif ratio < 1 / (1 + threshold) and old - new > min_seconds:
+                status = 'improved'
+            else:
+                status = 'ok'
+            rows.append((name, int(size), old, new, ratio, status))
+    return rows
+
+def format_results(document):
+    lines = [f"{'benchmark':<22} {'papers':>7} {'best s':>10} {'median s':>10} {'peak MiB':>9}"]
+    for name, sizes in document['results'].items():
+        for size, result in sorted(sizes.items(), key=lambda item: int(item[0])):
+            rss = result['peak_rss_mb']
+            lines.append(f"{name:<22} {size:>7} {result['seconds']:>10.4f} {result['median_seconds']:>10.4f} "
+                         f"{rss if rss is not None else '-':>9}")
+    return '\n'.join(lines)
+
+def format_comparison(rows):
+    lines = [f"{'benchmark':<22} {'papers':>7} {'baseline s':>11} {'current s':>10} {'ratio':>7}"]
+    for name, size, old, new, ratio, status in rows:
+        flag = {'regression': '  REGRESSION', 'improved': '  improved'}.get(status, '')
+        lines.append(f"{name:<22} {size:>7} {old:>11.4f} {new:>10.4f} {ratio:>6.2f}x{flag}")
+    return '\n'.join(lines)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline's hot paths on synthetic corpora.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="Run benchmarks and save the results as JSON")
+    run_parser.add_argument('--sizes', type=int, nargs='+', help=f"Corpus sizes (default {BENCHMARK_SIZES})")
+    run_parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Benchmarks to run")
+    run_parser.add_argument('--repeat', type=int, help="Timed runs per benchmark (default depends on size)")
+    run_parser.add_argument('--output', help=f"Results file (default data/{BENCHMARK_DIR}/bench-<time>.json)")
+    run_parser.add_argument('--baseline', help="Compare against this results file afterwards")
+
+    compare_parser = commands.add_parser('compare', help="Compare a results file against a baseline")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+
+    for sub in (run_parser, compare_parser):
+        sub.add_argument('--threshold', type=float, default=BENCHMARK_THRESHOLD,
+                         help="Fraction slower than the baseline that counts as a regression")
+        sub.add_argument('--min-seconds', type=float, default=BENCHMARK_MIN_SECONDS,
+                         help="Ignore differences smaller than this many seconds")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        document = run_benchmarks(
+            args.sizes, args.only, args.repeat,
+            on_result=lambda name, size, result: print(f"{name} [{size}]: {result['seconds']:.4f}s", flush=True)
+        )
+        path = save_results(document, args.output)
+        print(format_results(document))
+        print(f"Results saved to {path}")
+        if not args.baseline:
+            return 0
+        baseline, current = load_results(args.baseline), document
+    else:
+        baseline, current = load_results(args.baseline), load_results(args.current)
+
+    rows = compare_results(baseline, current, args.threshold, args.min_seconds)
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row[-1] == 'regression']
+    if regressions:
+        print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    sys.exit(main())
@@ -1,44 +1,195 @@
 import os
 import logging
+from contextlib import contextmanager
+from datetime import date, datetime
 from dotenv import load_dotenv
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Log line format of the console and the per-stage log files
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 
 # arXiv categories to fetch papers from
 CATEGORIES = ['cs.AI', 'cs.LG', 'cs.CL', 'cs.CV', 'stat.ML']
 
-# Maximum number of results to fetch from the API
+# Maximum number of results to fetch per API request (page size)
 MAX_RESULTS = 1000
 
+# Upper bound on results across all pages (the arXiv API stops at 30000)
+MAX_TOTAL_RESULTS = 30000
+
+# Number of page requests allowed in flight at the same time
+MAX_CONCURRENT_REQUESTS = 3
+
+# Minimum delay between arXiv API requests in seconds (arXiv asks for 3)
+REQUEST_DELAY = 3
+
+# Attempts per page before it is given up on
+PAGE_RETRIES = 3
+
+# Timeout for a single arXiv API request in seconds
+REQUEST_TIMEOUT = 60
+
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, 'data')
 LOG_FILE = os.path.join(DATA_DIR, 'arxiv_collector.log')
 
+TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+SITE_DIR = os.path.join(BASE_DIR, 'output')
+
 # Ensure data directory exists
 os.makedirs(DATA_DIR, exist_ok=True)
 
+# Per-day artifacts of date-parameterized runs and backfills
+DAYS_DIR = os.path.join(DATA_DIR, 'days')
+
+# Seconds a SQLite connection waits for another process's write lock
+SQLITE_TIMEOUT = 30
+
+# Worker processes used by a backfill
+BACKFILL_PROCESSES = int(os.environ.get('BACKFILL_PROCESSES', 4))
+
 # Name of the file to store the last update date
 LAST_UPDATE_FILE = 'last_update.txt'
 
+# Name of the SQLite database holding every paper fetched so far
+PAPER_DB_FILE = 'papers.db'
+
+# Number of days of papers handed to the downstream stages each run
+FETCH_WINDOW_DAYS = 2
+
+# Format of the papers file handed to the downstream stages: 'jsonl', or 'columnar'
+# for memory-mapped columns (see paper_files)
+PAPERS_FORMAT = os.environ.get('PAPERS_FORMAT', 'jsonl').lower()
+
 # Name of the file to store the fetched papers
 PAPERS_FILE = 'daily_papers.json'
 
-# Name of the log file
-LOG_FILE = 'arxiv_collector.log'
+# Artifact hashes and status of each pipeline stage's last run
+PIPELINE_MANIFEST_FILE = 'pipeline_manifest.json'
+
+# Run metrics: per-run JSON records, stage profiles and the Prometheus textfile, under DATA_DIR
+METRICS_DIR = 'metrics'
+METRICS_PROM_FILE = 'pipeline.prom'
+METRICS_PREFIX = 'arxiv_pipeline'
+
+# Seconds between stack samples of a profiled stage
+PROFILE_INTERVAL = 0.005
+
+# Benchmark suite: synthetic corpus sizes, where results are kept, and what counts as a
+# regression (slower by more than the threshold fraction and by more than the minimum seconds)
+BENCHMARK_SIZES = [1000, 10000, 100000]
+BENCHMARK_DIR = 'benchmarks'
+BENCHMARK_THRESHOLD = 0.25
+BENCHMARK_MIN_SECONDS = 0.01
 
 # Load .env file if it exists
 dotenv_path = os.path.join(os.path.dirname(__file__), '..', '.env')
 if os.path.exists(dotenv_path):
     load_dotenv(dotenv_path)
 
+# Batches of at least this many documents are tokenized on a process pool
+PREPROCESS_PARALLEL_THRESHOLD = 50000
+
+# Nearest neighbours kept per paper in the abstract similarity table
+NEIGHBORS_TOP_K = 10
+
+# Name of the file holding the persisted abstract neighbour table
+NEIGHBORS_FILE = 'abstract_neighbors.npz'
+
+# Paper network layout: positions persisted by arXiv id, and layouts cached by graph hash
+LAYOUT_POSITIONS_FILE = 'layout_positions.json'
+LAYOUT_CACHE_DIR = 'layout_cache'
+LAYOUT_CACHE_SIZE = 30
+
+# Force iterations for a fresh layout, and for one seeded from previous positions
+LAYOUT_ITERATIONS = 50
+LAYOUT_REFINE_ITERATIONS = 10
+
+# Above this many nodes the grid-accelerated force layout replaces spring_layout
+# (they break even around 300 nodes; spring_layout takes seconds at a typical day's 1000)
+LAYOUT_GRID_THRESHOLD = 300
+
+# How many positions of papers no longer in the graph are kept (the most recent) for when they reappear
+LAYOUT_POSITIONS_RECENT = 5000
+
+LAYOUT_SEED = 42
+
+# Word cloud windows in days, ending on the newest day in the paper store
+WORDCLOUD_WINDOWS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+WORDCLOUD_MAX_WORDS = 200
+
+# Rendered word clouds, keyed by a hash of their frequency table
+WORDCLOUD_CACHE_DIR = 'wordcloud_cache'
+
+# Trend index: trends named by the LLM each day, with rolling mention counts
+TREND_DB_FILE = 'trends.db'
+TREND_WEEK_DAYS = 7
+TREND_MONTH_DAYS = 30
+
+# Trend chart: how many days of history and how many trends to plot
+TREND_CHART_DAYS = 30
+TREND_CHART_TOP = 5
+
+# Static site: manifest of build inputs, compiled template cache and archive page size
+SITE_MANIFEST_FILE = 'site_manifest.json'
+TEMPLATE_CACHE_DIR = 'template_cache'
+ARCHIVE_PAGE_SIZE = 30
+
+# Site asset stage: widths of the downscaled image variants, and which files get .gz/.br siblings
+SITE_IMAGE_WIDTHS = [400, 800]
+SITE_COMPRESS_EXTENSIONS = ('.html', '.json', '.svg')
+
+# Worker processes for rendering independent charts (1 renders in-process)
+RENDER_PROCESSES = int(os.environ.get('RENDER_PROCESSES', os.cpu_count() or 1))
+
+# Gemini model used by the content analysis agents
+MODEL_NAME = 'gemini-1.5-flash'
+
+# LLM backend: 'gemini', or 'local' for the deterministic offline stand-in
+LLM_BACKEND = os.environ.get('LLM_BACKEND', 'gemini').lower()
+
+# Latency/throughput/error profile of the local backend (see llm_backends.LOCAL_PROFILES)
+LLM_LOCAL_PROFILE = os.environ.get('LLM_LOCAL_PROFILE', 'instant')
+
+# Paper fields included in prompts, after the short arXiv id
+# (any of 'title', 'summary', 'categories', 'authors', 'published')
+PROMPT_PAPER_FIELDS = ['title', 'summary']
+
+# Abstracts longer than this many characters are trimmed in prompts
+PROMPT_ABSTRACT_CHARS = 600
+
+# Approximate prompt tokens of papers sent to the model in one batch
+ANALYSIS_BATCH_TOKENS = 30000
+
+# Number of batch prompts sent to the model at the same time
+ANALYSIS_CONCURRENCY = 4
+
+# Gemini quota: requests and prompt tokens allowed per minute
+LLM_REQUESTS_PER_MINUTE = 15
+LLM_TOKENS_PER_MINUTE = 1000000
+
+# Upper bound on concurrent model calls; lowered automatically while throttled
+LLM_MAX_CONCURRENCY = 8
+
+# Attempts per model call, and the base/maximum backoff between them in seconds
+LLM_MAX_RETRIES = 5
+LLM_BACKOFF_BASE = 2
+LLM_BACKOFF_MAX = 60
+
+# Name of the SQLite database caching LLM responses
+LLM_CACHE_FILE = 'llm_cache.db'
+
+# Seconds a cached LLM response stays valid
+LLM_CACHE_TTL = 7 * 24 * 60 * 60
+
+# Total size of cached responses before least recently used entries are evicted
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+# Set LLM_CACHE_DISABLED=1 to bypass the response cache
+LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_DISABLED', '').lower() not in ('1', 'true', 'yes')
+
 # Gemini API Key
 GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY') or os.environ.get('GOOGLE_API_KEY')
-if not GEMINI_API_KEY:
-    logging.warning("Neither GEMINI_API_KEY nor GOOGLE_API_KEY environment variable is set")
-else:
-    logging.info("API key found in environment variables")
 
 # Twitter API Credentials
 TWITTER_API_KEY = os.environ.get('TWITTER_API_KEY')
@@ -46,12 +197,51 @@ TWITTER_API_SECRET = os.environ.get('TWITTER_API_SECRET')
 TWITTER_ACCESS_TOKEN = os.environ.get('TWITTER_ACCESS_TOKEN')
 TWITTER_ACCESS_TOKEN_SECRET = os.environ.get('TWITTER_ACCESS_TOKEN_SECRET')
 
-logging.info(f"TWITTER_API_KEY from env: {bool(TWITTER_API_KEY)}")
-logging.info(f"TWITTER_API_SECRET from env: {bool(TWITTER_API_SECRET)}")
-logging.info(f"TWITTER_ACCESS_TOKEN from env: {bool(TWITTER_ACCESS_TOKEN)}")
-logging.info(f"TWITTER_ACCESS_TOKEN_SECRET from env: {bool(TWITTER_ACCESS_TOKEN_SECRET)}")
+def parse_day(value):
+    """Accept a date, a 'YYYY-MM-DD' string or None (the daily run)."""
+    if value is None or isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+def artifact_dir(day=None):
+    """Directory for a run's artifacts: DATA_DIR for the daily run, DAYS_DIR/<date> for a given day."""
+    day = parse_day(day)
+    if day is None:
+        return DATA_DIR
+    path = os.path.join(DAYS_DIR, day.strftime('%Y-%m-%d'))
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def setup_logging():
+    """Log INFO and above to the console. Called by entry points, not at import."""
+    logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
+
+@contextmanager
+def log_to_file(path):
+    """Also write everything logged inside the block to `path`."""
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root = logging.getLogger()
+    root.addHandler(handler)
+    try:
+        yield
+    finally:
+        root.removeHandler(handler)
+        handler.close()
+
+def check_credentials():
+    """Log which API credentials are available. Called by the pipeline, not at import."""
+    if not GEMINI_API_KEY:
+        logging.warning("Neither GEMINI_API_KEY nor GOOGLE_API_KEY environment variable is set")
+    else:
+        logging.info("API key found in environment variables")
+
+    logging.info(f"TWITTER_API_KEY from env: {bool(TWITTER_API_KEY)}")
+    logging.info(f"TWITTER_API_SECRET from env: {bool(TWITTER_API_SECRET)}")
+    logging.info(f"TWITTER_ACCESS_TOKEN from env: {bool(TWITTER_ACCESS_TOKEN)}")
+    logging.info(f"TWITTER_ACCESS_TOKEN_SECRET from env: {bool(TWITTER_ACCESS_TOKEN_SECRET)}")
 
-if not all([TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET]):
-    logging.warning("Twitter API credentials are not set in environment variables")
-else:
-    logging.info("Twitter API credentials found in environment variables")
+    if not all([TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET]):
+        logging.warning("Twitter API credentials are not set in environment variables")
+    else:
+        logging.info("Twitter API credentials found in environment variables")
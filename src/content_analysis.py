@@ -1,37 +1,50 @@
-import google.generativeai as genai
 import json
 import os
+import re
+import threading
 from datetime import datetime
 import logging
-from config import DATA_DIR, PAPERS_FILE, GEMINI_API_KEY
-
-def setup_logging():
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(os.path.join(DATA_DIR, 'content_analysis.log')),
-            logging.StreamHandler()
-        ]
-    )
-
-setup_logging()
-
-# Configure Gemini API
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    logging.info("Gemini API configured successfully")
-else:
-    logging.error("API key is not set. Gemini API will not be available.")
-    raise ValueError("API key is not set. Cannot proceed with content analysis.")
-
-# Initialize Gemini model
-try:
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    logging.info("Gemini model initialized successfully")
-except Exception as e:
-    logging.error(f"Failed to initialize Gemini model: {e}")
-    raise
+from concurrent.futures import ThreadPoolExecutor
+from config import DATA_DIR, ANALYSIS_BATCH_TOKENS, ANALYSIS_CONCURRENCY, artifact_dir, parse_day, setup_logging, log_to_file
+from llm_backends import get_backend
+from llm_cache import ResponseCache
+from task_graph import TaskGraph
+from paper_store import PaperStore, split_arxiv_id
+from trend_index import TrendIndex
+from paper_files import find_latest_papers, iter_papers
+from llm_client import LLMClient
+import metrics
+from prompt_format import estimate_tokens, short_id, format_paper, format_papers, TokenUsage
+
+# Matches the "[2409.12345v1] ..." line opening each per-paper analysis
+ANALYSIS_TAG_PATTERN = re.compile(r'^\s*(?:[-*]\s*|\d+\.\s*)?\**\[([^\]]+)\]\**:?\s*(.*)$')
+
+# Cache of model responses keyed by model, system message and prompt
+response_cache = ResponseCache()
+
+# Model backend selected by LLM_BACKEND and the rate-limited client shared by
+# every agent; both are created on first use so importing this module is cheap
+_backend = None
+_llm_client = None
+_llm_lock = threading.Lock()
+
+def get_llm_backend():
+    global _backend
+    with _llm_lock:
+        if _backend is None:
+            _backend = get_backend()
+        return _backend
+
+def get_llm_client():
+    global _llm_client
+    backend = get_llm_backend()
+    with _llm_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient(backend.generate)
+        return _llm_client
+
+# Estimated prompt and response tokens per agent
+token_usage = TokenUsage()
 
 class Agent:
     def __init__(self, name, system_message):
@@ -39,13 +52,12 @@ class Agent:
         self.system_message = system_message
 
     def generate_response(self, message):
-        if not model:
-            logging.error("Gemini model is not available. Cannot generate response.")
-            return None
         prompt = f"{self.system_message}\n\nHuman: {message}\n\n{self.name}:"
         try:
-            response = model.generate_content(prompt)
-            return response.text
+            return response_cache.get_or_generate(
+                get_llm_backend().model_name, self.system_message, prompt,
+                lambda: get_llm_client().generate(prompt, estimate_tokens(prompt))
+            )
         except Exception as e:
             logging.error(f"Error generating response for {self.name}: {e}")
             return None
@@ -85,16 +97,108 @@ article_selector = Agent(
     "You are an expert in evaluating the importance and usefulness of AI and ML research papers. Your task is to select the most interesting or useful articles from a collection of papers."
 )
 
-def generic_agent(prompt_template, papers=None, analysis=None, trends=None):
+def generic_agent(prompt_template, papers=None, analysis=None, trends=None, agent_name="Agent"):
     prompt = prompt_template.format(
-        papers=papers,
+        papers=format_papers(papers),
         analysis=analysis,
         trends=trends
     )
-    response = model.generate_content(prompt)
-    return response.text
+    prompt_tokens = estimate_tokens(prompt)
+    logging.info(f"{agent_name}: sending ~{prompt_tokens} prompt tokens")
+    response = response_cache.get_or_generate(
+        get_llm_backend().model_name, None, prompt,
+        lambda: get_llm_client().generate(prompt, prompt_tokens)
+    )
+    response_tokens = estimate_tokens(response) if response else 0
+    token_usage.record(agent_name, prompt_tokens, response_tokens)
+    logging.info(f"{agent_name}: received ~{response_tokens} response tokens")
+    return response
+
+def chunk_papers(papers, token_budget=ANALYSIS_BATCH_TOKENS):
+    """Split papers into consecutive batches whose prompts stay within `token_budget` tokens."""
+    batches = []
+    batch = []
+    used = 0
+    for paper in papers:
+        cost = estimate_tokens(paper if isinstance(paper, str) else format_paper(paper))
+        if batch and used + cost > token_budget:
+            batches.append(batch)
+            batch = []
+            used = 0
+        batch.append(paper)
+        used += cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+def map_batches(prompt_template, batches, **kwargs):
+    """
+    Run `prompt_template` over each batch of papers concurrently, returning responses in batch order.
+
+    A batch whose call still fails after the client's retries yields None
+    instead of failing the other batches.
+    """
+    def run_batch(batch):
+        try:
+            return generic_agent(prompt_template, papers=batch, **kwargs)
+        except Exception as e:
+            logging.error(f"Batch of {len(batch)} papers failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=ANALYSIS_CONCURRENCY) as executor:
+        return list(executor.map(run_batch, batches))
+
+def reduce_analyses(partials, token_budget=ANALYSIS_BATCH_TOKENS, max_rounds=3):
+    """
+    Combine per-batch analyses into one.
+
+    The partial analyses are joined as they are while the result fits in
+    `token_budget`; otherwise groups of them are condensed by the model,
+    concurrently, until it fits or `max_rounds` is reached.
+    """
+    prompt_template = """Condense the following analyses of AI/ML research papers into one analysis:
+
+{analysis}
+
+Keep one short entry per paper, preserving each paper's main contribution and key findings."""
+    partials = [partial for partial in partials if partial]
+    for _ in range(max_rounds):
+        combined = "\n\n".join(partials)
+        if len(partials) <= 1 or estimate_tokens(combined) <= token_budget:
+            return combined
+        groups = chunk_papers(partials, token_budget)
+        with ThreadPoolExecutor(max_workers=ANALYSIS_CONCURRENCY) as executor:
+            partials = [
+                partial for partial in executor.map(
+                    lambda group: generic_agent(
+                        prompt_template, analysis="\n\n".join(group), agent_name="Analysis_Reducer"
+                    ),
+                    groups
+                ) if partial
+            ]
+    return "\n\n".join(partials)
+
+def parse_paper_analyses(response):
+    """Split an analyzer response into {tag: analysis} using the [id] tag opening each entry."""
+    analyses = {}
+    tag = None
+    for line in response.splitlines():
+        match = ANALYSIS_TAG_PATTERN.match(line)
+        if match:
+            tag = match.group(1).strip()
+            analyses[tag] = match.group(2).strip()
+        elif tag is not None and line.strip():
+            analyses[tag] = f"{analyses[tag]} {line.strip()}".strip()
+    return analyses
 
 def paper_analyzer_agent(papers):
+    """
+    Analyze papers, reusing stored per-paper analyses.
+
+    Only papers without a stored analysis for their id and version are sent
+    to the model. New analyses are persisted, and the combined output lists
+    stored and fresh analyses in paper order.
+    """
     prompt_template = """Analyze the following AI/ML research papers:
 
 {papers}
@@ -104,8 +208,49 @@ Provide a concise summary for each paper, focusing on:
 2. Key findings or results
 3. Potential impact or applications
 
-Limit each summary to 2-3 sentences."""
-    return generic_agent(prompt_template, papers=papers)
+Limit each summary to 2-3 sentences. Start each summary on a new line with the paper's id in square brackets, for example [2409.12345v1]."""
+    if not papers:
+        # Nothing to look up or store, e.g. when the papers file is missing
+        return generic_agent(prompt_template, papers=papers, agent_name=paper_analyzer.name)
+
+    with PaperStore() as store:
+        analyses = store.get_analyses([paper['id'] for paper in papers if paper.get('id')])
+        new_papers = [paper for paper in papers if paper.get('id') not in analyses]
+        logging.info(f"Reusing {len(analyses)} stored paper analyses, analyzing {len(new_papers)} papers")
+
+        responses = []
+        if new_papers:
+            batches = chunk_papers(new_papers, ANALYSIS_BATCH_TOKENS)
+            if len(batches) <= 1:
+                responses = [generic_agent(prompt_template, papers=new_papers, agent_name=paper_analyzer.name)]
+            else:
+                logging.info(f"Analyzing {len(new_papers)} papers in {len(batches)} batches")
+                responses = map_batches(prompt_template, batches, agent_name=paper_analyzer.name)
+
+        # Match tagged entries back to papers by base id, since the model may drop the version
+        by_base_id = {split_arxiv_id(paper['id'])[0]: paper['id'] for paper in new_papers if paper.get('id')}
+        fresh = {}
+        unparsed = []
+        for response in responses:
+            if not response:
+                continue
+            matched = False
+            for tag, analysis in parse_paper_analyses(response).items():
+                paper_id = by_base_id.get(split_arxiv_id(tag)[0])
+                if paper_id and analysis:
+                    fresh[paper_id] = analysis
+                    matched = True
+            if not matched:
+                unparsed.append(response)
+        if fresh:
+            store.save_analyses(fresh, get_llm_backend().model_name)
+
+    analyses.update(fresh)
+    entries = [
+        f"[{short_id(paper['id'])}] {analyses[paper['id']]}"
+        for paper in papers if paper.get('id') in analyses
+    ]
+    return reduce_analyses(entries + unparsed, ANALYSIS_BATCH_TOKENS)
 
 def trend_spotter_agent(papers):
     prompt_template = """Identify the top 3-5 trends in the following AI/ML research papers:
@@ -117,7 +262,7 @@ For each trend:
 2. Give a brief explanation (1 sentence)
 
 Format the output as a numbered list."""
-    return generic_agent(prompt_template, papers=papers)
+    return generic_agent(prompt_template, papers=papers, agent_name=trend_spotter.name)
 
 def summary_writer_agent(papers, analysis, trends):
     prompt_template = """Based on the following information about recent AI/ML research papers:
@@ -131,24 +276,29 @@ Provide a concise overall summary that:
 3. Suggests potential future directions
 
 Limit the summary to 2-3 sentences."""
-    return generic_agent(prompt_template, analysis=analysis, trends=trends)
+    return generic_agent(prompt_template, analysis=analysis, trends=trends, agent_name=summary_writer.name)
 
-def load_papers():
-    file_path = os.path.join(DATA_DIR, "latest_papers.json")
+def load_papers(day=None, columns=None):
+    """
+    Read the run's papers, streaming them from the JSON Lines or columnar file.
+
+    Args:
+        columns (list, optional): Only these fields of each paper.
+    """
+    file_path = find_latest_papers(day)
     if not os.path.exists(file_path):
         logging.error(f"No papers file found: {file_path}")
         return None
 
     try:
-        with open(file_path, 'r') as f:
-            return json.load(f)
-    except json.JSONDecodeError as e:
-        logging.error(f"Error decoding JSON from {file_path}: {e}")
+        return list(iter_papers(file_path, columns))
+    except (json.JSONDecodeError, ValueError) as e:
+        logging.error(f"Error decoding papers from {file_path}: {e}")
         return None
 
-def save_results(results):
+def save_results(results, day=None):
     results_file = 'content_analysis_results.json'
-    file_path = os.path.join(DATA_DIR, results_file)
+    file_path = os.path.join(artifact_dir(day), results_file)
     try:
         with open(file_path, 'w') as f:
             json.dump(results, f, indent=2)
@@ -171,42 +321,90 @@ Select the top 3-5 most interesting or useful articles. For each selected articl
 2. Give a brief explanation of why it's important or interesting (1-2 sentences)
 
 Format the output as a numbered list."""
-    return generic_agent(prompt_template, papers=papers, analysis=analysis)
+    batches = chunk_papers(papers, ANALYSIS_BATCH_TOKENS)
+    if len(batches) <= 1:
+        return generic_agent(prompt_template, papers=papers, analysis=analysis, agent_name=article_selector.name)
+
+    # Shortlist candidates from each batch, then pick the final articles from the shortlists
+    shortlist_template = """From the following AI/ML research papers:
+
+{papers}
+
+Select up to 5 candidate articles that are the most interesting or useful. For each, give the title and a one-sentence reason."""
+    logging.info(f"Selecting articles from {len(papers)} papers in {len(batches)} batches")
+    shortlists = [
+        shortlist for shortlist in map_batches(shortlist_template, batches, agent_name=article_selector.name)
+        if shortlist
+    ]
+    return generic_agent(
+        prompt_template, papers="\n\n".join(shortlists), analysis=analysis, agent_name=article_selector.name
+    )
+
+def record_trends(trends, papers, day=None):
+    """Add the day's trends to the trend index, dated by `day` or else the newest paper analysed."""
+    published = [paper['published'][:10] for paper in papers if paper.get('published')]
+    if day is None:
+        day = datetime.strptime(max(published), '%Y-%m-%d').date() if published else datetime.now().date()
+    try:
+        with TrendIndex() as index:
+            index.record_day(day, trends, papers)
+    except Exception as e:
+        logging.error(f"Error recording trends: {str(e)}")
 
 def run_content_analysis(test_date=None):
     """
     Run the content analysis pipeline.
 
     Args:
-        test_date (str, optional): Date in the format 'YYYY-MM-DD'. Defaults to None.
+        test_date (str, optional): Date in the format 'YYYY-MM-DD'. Papers are read
+            from and results written to that day's artifact directory. Defaults
+            to None, the daily run in DATA_DIR.
 
     Raises:
         ValueError: If the provided date is invalid.
     """
+    day = parse_day(test_date)
     try:
-        papers = load_papers()
+        papers = load_papers(day)
     except ValueError as e:
         logging.error(f"Error loading papers: {str(e)}")
         raise
 
     try:
-        analysis = paper_analyzer_agent(papers)
-        trends = trend_spotter_agent(papers)
-        summary = summary_writer_agent(papers, analysis, trends)
-        top_articles = article_selector_agent(papers, analysis)
+        # The analyzer and trend spotter only need the papers, so they run side by side
+        graph = TaskGraph()
+        graph.add("analysis", paper_analyzer_agent, inputs=["papers"])
+        graph.add("trends", trend_spotter_agent, inputs=["papers"])
+        graph.add("summary", summary_writer_agent, inputs=["papers", "analysis", "trends"])
+        graph.add("top_articles", article_selector_agent, inputs=["papers", "analysis"])
+        outputs, timings = graph.run({"papers": papers})
+        for name, seconds in timings.items():
+            metrics.count(f"agent_{name}_seconds", seconds)
 
         results = {
-            "analysis": analysis,
-            "trends": trends,
-            "summary": summary,
-            "top_articles": top_articles
+            "analysis": outputs["analysis"],
+            "trends": outputs["trends"],
+            "summary": outputs["summary"],
+            "top_articles": outputs["top_articles"]
         }
 
-        save_results(results)
+        save_results(results, day)
+        record_trends(results["trends"], papers, day)
+        stats = response_cache.stats()
+        logging.info(f"LLM cache: {stats['hits']} hits, {stats['misses']} misses")
+        token_usage.log_summary()
+        if _llm_client is not None:
+            logging.info(f"LLM client: {_llm_client.stats()}")
         logging.info("Content analysis completed successfully")
     except Exception as e:
         logging.error(f"Error during content analysis: {str(e)}")
         raise
 
+def main(test_date=None):
+    """Run the content analysis, logging to data/content_analysis.log as well."""
+    setup_logging()
+    with log_to_file(os.path.join(DATA_DIR, 'content_analysis.log')):
+        run_content_analysis(test_date)
+
 if __name__ == "__main__":
-    run_content_analysis()
+    main()
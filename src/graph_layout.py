@@ -0,0 +1,180 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import numpy as np
+import networkx as nx
+import metrics
+from config import (
+    DATA_DIR, LAYOUT_POSITIONS_FILE, LAYOUT_CACHE_DIR, LAYOUT_CACHE_SIZE, LAYOUT_ITERATIONS,
+    LAYOUT_REFINE_ITERATIONS, LAYOUT_GRID_THRESHOLD, LAYOUT_POSITIONS_RECENT, LAYOUT_SEED
+)
+
+def node_keys(G):
+    """Stable key per node: its 'paper_id' attribute when present, else the node itself."""
+    return {node: str(G.nodes[node].get('paper_id') or node) for node in G.nodes}
+
+def graph_hash(G, keys=None):
+    """Hash of the graph's nodes and weighted edges, independent of insertion order."""
+    keys = keys or node_keys(G)
+    digest = hashlib.sha256()
+    digest.update(json.dumps(sorted(keys.values())).encode('utf-8'))
+    edges = sorted(
+        tuple(sorted((keys[u], keys[v]))) + (round(data.get('weight', 1.0), 4),)
+        for u, v, data in G.edges(data=True)
+    )
+    digest.update(json.dumps(edges).encode('utf-8'))
+    return digest.hexdigest()
+
+def load_positions(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return {key: tuple(value) for key, value in json.load(f).items()}
+
+def save_positions(positions, path):
+    with open(path, 'w') as f:
+        json.dump({key: [round(float(x), 6), round(float(y), 6)] for key, (x, y) in positions.items()}, f)
+
+def seed_positions(G, keys, previous, seed=LAYOUT_SEED):
+    """
+    Initial positions: previous ones where known, otherwise the centroid of
+    already-placed neighbours (or a random point) plus a little jitter.
+    """
+    rng = np.random.default_rng(seed)
+    pos = {node: np.array(previous[keys[node]], dtype=float) for node in G.nodes if keys[node] in previous}
+    for node in G.nodes:
+        if node in pos:
+            continue
+        placed = [pos[neighbor] for neighbor in G.neighbors(node) if neighbor in pos]
+        if placed:
+            pos[node] = np.mean(placed, axis=0) + rng.normal(scale=0.02, size=2)
+        else:
+            pos[node] = rng.uniform(-1, 1, size=2)
+    return pos
+
+def grid_force_layout(G, pos, iterations=LAYOUT_ITERATIONS, k=None):
+    """
+    Fruchterman-Reingold layout with grid-accelerated repulsion.
+
+    Repulsion is only computed between nodes in the same or adjacent cells
+    of a grid with cell size 2k (the original paper's grid variant), so an
+    iteration costs O(n + edges) for evenly spread layouts instead of O(n^2).
+    """
+    nodes = list(G.nodes)
+    index = {node: i for i, node in enumerate(nodes)}
+    n = len(nodes)
+    if n == 0:
+        return {}
+    xy = np.array([pos[node] for node in nodes], dtype=float)
+    edges = np.array([(index[u], index[v]) for u, v in G.edges() if u != v], dtype=int).reshape(-1, 2)
+    weights = np.array([data.get('weight', 1.0) for u, v, data in G.edges(data=True) if u != v], dtype=float)
+
+    # Work in a unit square so k and the temperature are independent of the input scale
+    xy -= xy.min(axis=0)
+    xy /= max(xy.max(), 1e-9)
+    k = k or 1 / math.sqrt(n)
+    cell_size = 2 * k
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    for _ in range(iterations):
+        displacement = np.zeros_like(xy)
+
+        cells = np.floor(xy / cell_size).astype(int)
+        buckets = {}
+        for i, cell in enumerate(map(tuple, cells)):
+            buckets.setdefault(cell, []).append(i)
+        for (cx, cy), members in buckets.items():
+            members = np.array(members)
+            nearby = np.concatenate([
+                buckets[(cx + dx, cy + dy)]
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (cx + dx, cy + dy) in buckets
+            ])
+            delta = xy[members, None, :] - xy[None, nearby, :]
+            distance = np.sqrt((delta ** 2).sum(axis=2))
+            within = (distance > 0) & (distance < cell_size)
+            distance = np.where(within, distance, 1)
+            force = np.where(within, k * k / distance ** 2, 0)
+            displacement[members] += (delta * force[:, :, None]).sum(axis=1)
+
+        if len(edges):
+            delta = xy[edges[:, 0]] - xy[edges[:, 1]]
+            distance = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-9)
+            pull = delta * (distance * weights / k)[:, None]
+            np.add.at(displacement, edges[:, 0], -pull)
+            np.add.at(displacement, edges[:, 1], pull)
+
+        length = np.maximum(np.sqrt((displacement ** 2).sum(axis=1)), 1e-9)
+        xy += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    # Rescale to [-1, 1] around the origin like nx.spring_layout
+    xy -= xy.mean(axis=0)
+    xy /= max(np.abs(xy).max(), 1e-9)
+    return {node: xy[i] for i, node in enumerate(nodes)}
+
+def layout_graph(G, positions_path=None, cache_dir=None, seed=LAYOUT_SEED):
+    """
+    Lay out a paper network, keeping nodes where they were on previous days.
+
+    A layout already computed for an identical graph is returned from the
+    cache. Otherwise nodes start from their persisted positions (new nodes
+    next to their placed neighbours) and only LAYOUT_REFINE_ITERATIONS are run
+    when most nodes were seeded. Graphs above LAYOUT_GRID_THRESHOLD nodes use
+    grid_force_layout instead of nx.spring_layout. The resulting positions are
+    persisted by arXiv id for the next day, along with the LAYOUT_POSITIONS_RECENT
+    most recently placed papers that dropped out of the graph.
+    """
+    positions_path = positions_path or os.path.join(DATA_DIR, LAYOUT_POSITIONS_FILE)
+    cache_dir = cache_dir or os.path.join(DATA_DIR, LAYOUT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    keys = node_keys(G)
+    cache_path = os.path.join(cache_dir, f"{graph_hash(G, keys)}.json")
+    if os.path.exists(cache_path):
+        cached = load_positions(cache_path)
+        if all(keys[node] in cached for node in G.nodes):
+            logging.info("Reusing cached layout for identical graph")
+            metrics.count('layout_cache_hits')
+            os.utime(cache_path)
+            return {node: np.array(cached[keys[node]]) for node in G.nodes}
+
+    metrics.count('layout_cache_misses')
+    previous = load_positions(positions_path)
+    seeded = sum(1 for key in keys.values() if key in previous)
+    iterations = LAYOUT_REFINE_ITERATIONS if seeded * 2 >= len(keys) and seeded else LAYOUT_ITERATIONS
+    initial = seed_positions(G, keys, previous, seed)
+
+    with metrics.timed('layout'):
+        if len(G) > LAYOUT_GRID_THRESHOLD:
+            pos = grid_force_layout(G, initial, iterations=iterations)
+        else:
+            pos = nx.spring_layout(G, pos=initial, iterations=iterations, seed=seed)
+    logging.info(f"Laid out {len(G)} nodes ({seeded} seeded) with {iterations} iterations")
+
+    layout = {keys[node]: pos[node] for node in G.nodes}
+    save_positions(retain_positions(previous, layout, LAYOUT_POSITIONS_RECENT), positions_path)
+    save_positions(layout, cache_path)
+    prune_cache(cache_dir)
+    return pos
+
+def retain_positions(previous, layout, recent=LAYOUT_POSITIONS_RECENT):
+    """
+    Positions to persist: the current layout plus the `recent` latest entries of
+    `previous` not in it. The file lists oldest first, so the current layout goes last.
+    """
+    dropped = [(key, xy) for key, xy in previous.items() if key not in layout]
+    retained = dict(dropped[len(dropped) - recent:] if recent else [])
+    retained.update(layout)
+    return retained
+
+def prune_cache(cache_dir, keep=LAYOUT_CACHE_SIZE):
+    """Delete all but the `keep` most recently used cached layouts."""
+    files = sorted(
+        (os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith('.json')),
+        key=os.path.getmtime, reverse=True
+    )
+    for path in files[keep:]:
+        os.remove(path)
@@ -0,0 +1,47 @@
+import importlib
+import threading
+
+class LazyModule:
+    """
+    Stand-in for a module that is only imported on first attribute access.
+
+    Lets heavy dependencies stay module-level names (so callers and tests
+    can reference or patch them) without paying their import cost until
+    a stage actually uses them.
+    """
+
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._module is None:
+                self.__dict__['_module'] = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_callable(module_name, attr):
+    """Return a function that imports `module_name` on first call and forwards to its `attr`."""
+    module = LazyModule(module_name)
+
+    def call(*args, **kwargs):
+        return getattr(module, attr)(*args, **kwargs)
+
+    call.__name__ = attr
+    call.__qualname__ = attr
+    call.__doc__ = f"Lazily imported {module_name}.{attr}."
+    return call
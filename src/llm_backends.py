@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from config import LLM_BACKEND, LLM_LOCAL_PROFILE, MODEL_NAME, GEMINI_API_KEY
+
+class LLMBackend:
+    """Interface the agents talk to: a model name (part of the cache key) and generate(prompt) -> str."""
+
+    model_name = None
+
+    def generate(self, prompt):
+        raise NotImplementedError
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini through google-generativeai, configured on first use."""
+
+    def __init__(self, model_name=MODEL_NAME, api_key=GEMINI_API_KEY):
+        self.model_name = model_name
+        self.api_key = api_key
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        with self._lock:
+            if self._model is None:
+                if not self.api_key:
+                    raise ValueError("API key is not set. Cannot use the Gemini backend.")
+                import google.generativeai as genai
+                genai.configure(api_key=self.api_key)
+                self._model = genai.GenerativeModel(self.model_name)
+                logging.info(f"Gemini model {self.model_name} initialized successfully")
+            return self._model
+
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+
+class LocalBackendError(Exception):
+    """Simulated API error; `code` is the HTTP status it stands in for."""
+
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+# latency: fixed seconds per call
+# tokens_per_second: generation speed for the response, None for instant
+# error_rate: fraction of calls failing with a retryable 503
+# max_concurrency: calls in flight above this fail with 429, None for unlimited
+LOCAL_PROFILES = {
+    'instant': {'latency': 0.0, 'tokens_per_second': None, 'error_rate': 0.0, 'max_concurrency': None},
+    'flash': {'latency': 0.8, 'tokens_per_second': 200, 'error_rate': 0.0, 'max_concurrency': None},
+    'quota': {'latency': 0.5, 'tokens_per_second': 200, 'error_rate': 0.0, 'max_concurrency': 4},
+    'flaky': {'latency': 0.5, 'tokens_per_second': 100, 'error_rate': 0.2, 'max_concurrency': None},
+}
+
+ID_LINE_PATTERN = re.compile(r'^\[([^\]]+)\]\s*(.*)$', re.MULTILINE)
+WORD_PATTERN = re.compile(r'[A-Za-z][A-Za-z-]{4,}')
+
+class LocalBackend(LLMBackend):
+    """
+    Deterministic offline stand-in for load tests and runs without network.
+
+    The same prompt always produces the same response. Prompts listing
+    "[id] title" entries get one tagged line per entry, so per-paper analysis
+    works offline; anything else gets a numbered list built from the prompt's
+    most frequent words. Latency, throughput, error rate and a concurrency
+    quota are simulated according to the profile.
+    """
+
+    def __init__(self, profile=LLM_LOCAL_PROFILE, seed=0, sleep=time.sleep, **overrides):
+        if isinstance(profile, str):
+            if profile not in LOCAL_PROFILES:
+                raise ValueError(f"Unknown local LLM profile: {profile}")
+            profile = LOCAL_PROFILES[profile]
+        self.profile = {**profile, **overrides}
+        self.model_name = 'local-stand-in'
+        self._sleep = sleep
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+
+    def respond(self, prompt):
+        """The deterministic response text for `prompt`, without any simulation."""
+        entries = ID_LINE_PATTERN.findall(prompt)
+        if entries:
+            return '\n'.join(
+                f"[{paper_id}] {title or 'This paper'} is summarized by the local stand-in."
+                for paper_id, title in entries
+            )
+        words = Counter(word.lower() for word in WORD_PATTERN.findall(prompt))
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        top_words = [word for word, _ in words.most_common(5)] or ['result']
+        return '\n'.join(
+            f"{i}. {word.capitalize()}: local stand-in finding {digest}-{i}."
+            for i, word in enumerate(top_words, 1)
+        )
+
+    def generate(self, prompt):
+        with self._lock:
+            self.calls += 1
+            failed = self._random.random() < self.profile['error_rate']
+            max_concurrency = self.profile['max_concurrency']
+            if max_concurrency is not None and self.in_flight >= max_concurrency:
+                raise LocalBackendError(429, "Simulated quota exceeded")
+            self.in_flight += 1
+        try:
+            response = self.respond(prompt)
+            delay = self.profile['latency']
+            if self.profile['tokens_per_second']:
+                delay += (len(response) / 4) / self.profile['tokens_per_second']
+            if delay:
+                self._sleep(delay)
+            if failed:
+                raise LocalBackendError(503, "Simulated backend error")
+            return response
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+def get_backend(name=None):
+    """Build the backend named by `name`, defaulting to config.LLM_BACKEND."""
+    name = (name or LLM_BACKEND).lower()
+    if name == 'gemini':
+        return GeminiBackend()
+    if name == 'local':
+        return LocalBackend()
+    raise ValueError(f"Unknown LLM backend: {name}")
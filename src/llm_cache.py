@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+import metrics
+from config import DATA_DIR, LLM_CACHE_FILE, LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES, LLM_CACHE_ENABLED, SQLITE_TIMEOUT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses (last_access);
+"""
+
+def make_cache_key(model_name, system_message, prompt):
+    """Content address of a call: a hash of the model name, system message and rendered prompt."""
+    digest = hashlib.sha256()
+    for part in (model_name, system_message or '', prompt):
+        encoded = part.encode('utf-8')
+        digest.update(f'{len(encoded)}:'.encode('ascii'))
+        digest.update(encoded)
+    return digest.hexdigest()
+
+class ResponseCache:
+    """On-disk LLM response cache with TTL expiry and size-bounded LRU eviction."""
+
+    def __init__(self, path=None, ttl=LLM_CACHE_TTL, max_bytes=LLM_CACHE_MAX_BYTES, enabled=LLM_CACHE_ENABLED):
+        self.path = path or os.path.join(DATA_DIR, LLM_CACHE_FILE)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=SQLITE_TIMEOUT)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss or expired entry."""
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.ttl is not None and now - row[1] > self.ttl):
+                if row is not None:
+                    with conn:
+                        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                metrics.count('llm_cache_misses')
+                return None
+            with conn:
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            metrics.count('llm_cache_hits')
+            return row[0]
+
+    def set(self, key, response):
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("""
+                    INSERT OR REPLACE INTO responses (key, response, size, created, last_access)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (key, response, size, now, now))
+                self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = 0
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+        logging.info(f"Evicted {evicted} least recently used LLM cache entries")
+
+    def get_or_generate(self, model_name, system_message, prompt, generate):
+        """
+        Return the cached response for this call, calling `generate()` on a miss.
+
+        Responses that come back as None are not cached. When the cache is
+        disabled `generate()` is always called and nothing is recorded.
+        """
+        if not self.enabled:
+            return generate()
+        key = make_cache_key(model_name, system_message, prompt)
+        response = self.get(key)
+        if response is not None:
+            return response
+        response = generate()
+        if response is not None:
+            self.set(key, response)
+        return response
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,188 @@
+import logging
+import random
+import threading
+import time
+import metrics
+from prompt_format import estimate_tokens
+from config import (
+    LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE, LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX
+)
+
+# HTTP status codes worth retrying; 429 also means we are over quota
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+THROTTLED_CODES = {429}
+
+def error_code(exc):
+    """HTTP status of an API error (google.api_core exceptions carry it as `code`), if any."""
+    code = getattr(exc, 'code', None)
+    return code if isinstance(code, int) else None
+
+def is_throttled(exc):
+    return error_code(exc) in THROTTLED_CODES
+
+def is_retryable(exc):
+    return isinstance(exc, (TimeoutError, ConnectionError)) or error_code(exc) in RETRYABLE_CODES
+
+# Bucket states shared with other processes (see share_rate_limits); None keeps limits per process
+_shared_request_state = None
+_shared_token_state = None
+
+def share_rate_limits(request_state, token_state):
+    """
+    Make LLM clients created in this process draw from buckets shared with other processes.
+
+    Each state is a multiprocessing.Array('d', [tokens, last refill time])
+    created by the parent, so parallel workers together stay within
+    LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE.
+    """
+    global _shared_request_state, _shared_token_state
+    _shared_request_state = request_state
+    _shared_token_state = token_state
+
+class TokenBucket:
+    """
+    Blocking token bucket refilled continuously at `rate` per second up to `capacity`.
+
+    With `shared` (a multiprocessing.Array('d', [tokens, updated])) the
+    bucket's level lives in shared memory and is guarded by the array's lock,
+    so every process holding it draws from the same bucket.
+    """
+
+    def __init__(self, capacity, rate, clock=time.monotonic, sleep=time.sleep, shared=None):
+        self.capacity = capacity
+        self.rate = rate
+        self._clock = clock
+        self._sleep = sleep
+        if shared is not None:
+            self._state = shared
+            self._lock = shared.get_lock()
+        else:
+            self._state = [capacity, clock()]
+            self._lock = threading.Lock()
+
+    @property
+    def tokens(self):
+        return self._state[0]
+
+    def acquire(self, amount=1):
+        # A request larger than the bucket would wait forever, so it only waits for a full bucket
+        amount = min(amount, self.capacity)
+        while True:
+            with self._lock:
+                now = self._clock()
+                tokens = min(self.capacity, self._state[0] + (now - self._state[1]) * self.rate)
+                self._state[1] = now
+                if tokens >= amount:
+                    self._state[0] = tokens - amount
+                    return
+                self._state[0] = tokens
+                wait = (amount - tokens) / self.rate
+            self._sleep(wait)
+
+class AIMDLimiter:
+    """
+    Concurrency limit with additive increase and multiplicative decrease.
+
+    Each success raises the limit by 1/limit, about one slot per window of
+    successful calls, and each throttled call halves it.
+    """
+
+    def __init__(self, max_limit, min_limit=1):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit / 2)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+class LLMClient:
+    """
+    Shared wrapper around a model's generate call.
+
+    Calls are paced by request and token buckets sized from the per-minute
+    quotas, limited by an AIMD concurrency window, and retried with jittered
+    exponential backoff on retryable errors.
+    """
+
+    def __init__(self, generate, requests_per_minute=LLM_REQUESTS_PER_MINUTE,
+                 tokens_per_minute=LLM_TOKENS_PER_MINUTE, max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_retries=LLM_MAX_RETRIES, backoff_base=LLM_BACKOFF_BASE,
+                 backoff_max=LLM_BACKOFF_MAX, sleep=time.sleep):
+        self._generate = generate
+        self.request_bucket = TokenBucket(
+            requests_per_minute, requests_per_minute / 60, sleep=sleep, shared=_shared_request_state
+        )
+        self.token_bucket = TokenBucket(
+            tokens_per_minute, tokens_per_minute / 60, sleep=sleep, shared=_shared_token_state
+        )
+        self.concurrency = AIMDLimiter(max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self.counters = {'requests': 0, 'successes': 0, 'retries': 0, 'throttled': 0, 'failures': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+        metrics.count(f"llm_{name}")
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff for the given zero-based attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def generate(self, prompt, prompt_tokens=0):
+        """
+        Generate a response for `prompt`, retrying retryable errors.
+
+        Raises:
+            Exception: The last error once retries are exhausted, or any non-retryable error.
+        """
+        for attempt in range(self.max_retries):
+            self.request_bucket.acquire()
+            self.token_bucket.acquire(prompt_tokens)
+            self.concurrency.acquire()
+            self._count('requests')
+            throttled = False
+            try:
+                response = self._generate(prompt)
+                self._count('successes')
+                metrics.count('llm_prompt_tokens', prompt_tokens)
+                if isinstance(response, str):
+                    metrics.count('llm_response_tokens', estimate_tokens(response))
+                return response
+            except Exception as e:
+                throttled = is_throttled(e)
+                if throttled:
+                    self._count('throttled')
+                if not is_retryable(e) or attempt == self.max_retries - 1:
+                    self._count('failures')
+                    raise
+                delay = self.backoff(attempt)
+                self._count('retries')
+                logging.warning(f"Model call failed ({e}); retrying in {delay:.1f}s (attempt {attempt + 1})")
+            finally:
+                self.concurrency.release(throttled)
+            self._sleep(delay)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counters)
+        stats['concurrency_limit'] = int(self.concurrency.limit)
+        return stats
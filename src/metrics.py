@@ -0,0 +1,279 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from config import DATA_DIR, METRICS_DIR, METRICS_PROM_FILE, METRICS_PREFIX, PROFILE_INTERVAL
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Run being recorded in this process (see RunMetrics); counters are dropped when there is none
+_active = None
+
+def count(name, value=1):
+    """Add `value` to a counter of the running stage, e.g. count('http_bytes', 5120). Cheap when not recording."""
+    run = _active
+    if run is not None:
+        run.add(name, value)
+
+@contextmanager
+def timed(name):
+    """Add the block's wall time to the '<name>_seconds' counter, to split a stage into its steps."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        count(f"{name}_seconds", time.perf_counter() - started)
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS mark (Linux), so each stage reports its own peak."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    """Peak resident set size in MiB: since the last reset on Linux, since process start elsewhere."""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+def child_cpu_seconds():
+    """CPU time of reaped child processes, e.g. the chart rendering pool."""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def cache_hit_rates(counters):
+    """{cache: hit rate} for every '<cache>_cache_hits'/'<cache>_cache_misses' counter pair."""
+    rates = {}
+    for name in counters:
+        if name.endswith('_cache_hits'):
+            cache = name[:-len('_cache_hits')]
+            hits = counters[name]
+            lookups = hits + counters.get(f"{cache}_cache_misses", 0)
+            rates[cache] = hits / lookups if lookups else 0.0
+    return rates
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler for one stage.
+
+    A background thread samples the stack of every other thread each
+    `interval` seconds. Stacks are written in the collapsed format
+    ("thread;outer;...;inner count" per line) read by flamegraph.pl and
+    speedscope.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            for stack, samples in self.samples.most_common():
+                f.write(f"{stack} {samples}\n")
+        logging.info(f"Wrote {sum(self.samples.values())} profile samples to {path}")
+
+class RunMetrics:
+    """
+    Timing, memory and I/O measurements of one pipeline run.
+
+    Used as a context manager around the run, it becomes the target of
+    count(), and StageRunner measures each stage through stage(). Per stage
+    it records wall and CPU time (its own and that of child processes it
+    reaped), peak RSS and the counters bumped while it ran: HTTP requests
+    and bytes, LLM calls and tokens, cache hits and misses, and step timers.
+
+    Args:
+        labels (dict, optional): Fields identifying the run, e.g. {'day': '2024-09-10'}.
+        profile (iterable, optional): Stage names to run under the SamplingProfiler.
+        output_dir (str, optional): Where the run record, profiles and the
+            Prometheus textfile are written. Defaults to METRICS_DIR.
+    """
+
+    def __init__(self, labels=None, profile=(), output_dir=None):
+        self.labels = dict(labels or {})
+        self.profile = set(profile)
+        self.output_dir = output_dir or os.path.join(DATA_DIR, METRICS_DIR)
+        self.started = datetime.now(timezone.utc)
+        self.run_id = self.started.strftime('%Y%m%dT%H%M%SZ')
+        self.stages = {}
+        self.totals = Counter()
+        self.success = None
+        self._current = None
+        self._lock = threading.Lock()
+        self._wall = self._cpu = None
+
+    def __enter__(self):
+        global _active
+        _active = self
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        global _active
+        self.wall_seconds = time.perf_counter() - self._wall
+        self.cpu_seconds = time.process_time() - self._cpu
+        _active = None
+        if self.success is None:
+            self.success = exc_type is None
+
+    def add(self, name, value=1):
+        with self._lock:
+            self.totals[name] += value
+            if self._current is not None:
+                self._current['counters'][name] += value
+
+    def skipped(self, name):
+        self.stages[name] = {'status': 'skipped'}
+
+    @contextmanager
+    def stage(self, name):
+        """Measure one stage; its record is marked 'failed' if the block raises."""
+        record = {'status': 'ran', 'counters': Counter()}
+        profiler = None
+        if name in self.profile:
+            profiler = SamplingProfiler()
+            profiler.start()
+        with self._lock:
+            self._current = record
+        reset_peak_rss()
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        child_cpu = child_cpu_seconds()
+        try:
+            yield record
+        except BaseException:
+            record['status'] = 'failed'
+            raise
+        finally:
+            record['wall_seconds'] = round(time.perf_counter() - wall, 3)
+            record['cpu_seconds'] = round(time.process_time() - cpu, 3)
+            record['child_cpu_seconds'] = round(child_cpu_seconds() - child_cpu, 3)
+            rss = peak_rss_mb()
+            record['peak_rss_mb'] = round(rss, 1) if rss is not None else None
+            with self._lock:
+                self._current = None
+            record['counters'] = dict(record['counters'])
+            record['cache_hit_rates'] = cache_hit_rates(record['counters'])
+            self.stages[name] = record
+            if profiler is not None:
+                profiler.stop()
+                os.makedirs(self.output_dir, exist_ok=True)
+                profiler.save(os.path.join(self.output_dir, f"profile-{self.run_id}-{name}.txt"))
+            logging.info(f"Stage '{name}': {record['wall_seconds']}s wall, {record['cpu_seconds']}s CPU, "
+                         f"peak RSS {record['peak_rss_mb']} MiB")
+
+    def record(self):
+        """The run as a JSON-serializable dict."""
+        return {
+            'run_id': self.run_id,
+            'started': self.started.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'labels': self.labels,
+            'success': self.success,
+            'wall_seconds': round(getattr(self, 'wall_seconds', 0.0), 3),
+            'cpu_seconds': round(getattr(self, 'cpu_seconds', 0.0), 3),
+            'stages': self.stages,
+            'counters': dict(self.totals),
+            'cache_hit_rates': cache_hit_rates(self.totals),
+        }
+
+    def prometheus(self):
+        """The run in the Prometheus text exposition format, for node_exporter's textfile collector."""
+        record = self.record()
+        lines = []
+
+        def metric(name, help_text, samples):
+            if not samples:
+                return
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{label}"' for key, label in sorted(labels.items()))
+                lines.append(f"{METRICS_PREFIX}_{name}{{{label_text}}} {value}" if label_text
+                             else f"{METRICS_PREFIX}_{name} {value}")
+
+        metric('last_run_timestamp_seconds', 'Start of the last pipeline run.',
+               [({}, round(self.started.timestamp(), 3))])
+        metric('last_run_success', 'Whether the last pipeline run succeeded.', [({}, 1 if self.success else 0)])
+        metric('run_wall_seconds', 'Wall time of the last run.', [({}, record['wall_seconds'])])
+
+        ran = {name: stage for name, stage in record['stages'].items() if stage['status'] != 'skipped'}
+        metric('stage_ran', 'Whether each stage ran (1), failed (-1) or was up to date (0) in the last run.',
+               [({'stage': name}, {'ran': 1, 'failed': -1}.get(stage['status'], 0))
+                for name, stage in record['stages'].items()])
+        for field, help_text in (('wall_seconds', 'Wall time'), ('cpu_seconds', 'CPU time'),
+                                 ('child_cpu_seconds', 'CPU time of child processes'),
+                                 ('peak_rss_mb', 'Peak resident set size in MiB')):
+            metric(f"stage_{field}", f"{help_text} of each stage in the last run.",
+                   [({'stage': name}, stage[field]) for name, stage in ran.items() if stage[field] is not None])
+
+        counter_names = sorted({counter for stage in ran.values() for counter in stage['counters']})
+        for counter in counter_names:
+            metric(f"stage_{counter}", f"{counter.replace('_', ' ').capitalize()} per stage in the last run.",
+                   [({'stage': name}, stage['counters'][counter])
+                    for name, stage in ran.items() if counter in stage['counters']])
+        metric('cache_hit_rate', 'Hit rate of each cache over the last run.',
+               [({'cache': cache}, rate) for cache, rate in sorted(record['cache_hit_rates'].items())])
+        return '\n'.join(lines) + '\n'
+
+    def save(self, prom_path=None):
+        """Write run-<id>.json and replace the Prometheus textfile. Returns the JSON path."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        json_path = os.path.join(self.output_dir, f"run-{self.run_id}.json")
+        with open(json_path, 'w') as f:
+            json.dump(self.record(), f, indent=2, sort_keys=True)
+
+        # The collector may read at any moment, so the textfile is swapped in whole
+        prom_path = prom_path or os.path.join(self.output_dir, METRICS_PROM_FILE)
+        with open(prom_path + '.tmp', 'w') as f:
+            f.write(self.prometheus())
+        os.replace(prom_path + '.tmp', prom_path)
+        logging.info(f"Run metrics written to {json_path} and {prom_path}")
+        return json_path
@@ -0,0 +1,241 @@
+import json
+import os
+import struct
+from config import PAPERS_FORMAT, artifact_dir
+from lazy_imports import LazyModule
+
+# Only the columnar format needs numpy; JSON Lines readers and writers don't pay for its import
+np = LazyModule('numpy')
+
+# File name of the papers handed to the downstream stages, per format
+PAPERS_FILE_NAMES = {
+    'jsonl': 'latest_papers.jsonl',
+    'columnar': 'latest_papers.cols',
+    'json': 'latest_papers.json',
+}
+
+COLUMNAR_MAGIC = b'ARXCOLS1'
+COLUMNAR_ALIGN = 64
+
+FORMAT_EXTENSIONS = {os.path.splitext(file_name)[1]: fmt for fmt, file_name in PAPERS_FILE_NAMES.items()}
+
+def papers_format(path):
+    """Format of a papers file, from its extension."""
+    fmt = FORMAT_EXTENSIONS.get(os.path.splitext(path)[1])
+    if fmt is None:
+        raise ValueError(f"Unknown papers file format: {path}")
+    return fmt
+
+def latest_papers_path(day=None, fmt=None):
+    """Where the collector writes a run's papers, in the configured format."""
+    return os.path.join(artifact_dir(day), PAPERS_FILE_NAMES[fmt or PAPERS_FORMAT])
+
+def find_latest_papers(day=None):
+    """The run's papers file: the configured format's if it exists, else one written in another format."""
+    path = latest_papers_path(day)
+    if not os.path.exists(path):
+        for file_name in PAPERS_FILE_NAMES.values():
+            candidate = os.path.join(artifact_dir(day), file_name)
+            if os.path.exists(candidate):
+                return candidate
+    return path
+
+def write_papers(papers, path):
+    """
+    Write papers as JSON Lines, columnar or (legacy) JSON, chosen by the file extension.
+
+    The file is replaced atomically, so a reader or the stage runner never
+    sees a partial write. Returns the number of papers written.
+    """
+    fmt = papers_format(path)
+    tmp_path = path + '.tmp'
+    if fmt == 'jsonl':
+        count = 0
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for paper in papers:
+                f.write(json.dumps(paper, ensure_ascii=False, separators=(',', ':')))
+                f.write('\n')
+                count += 1
+    elif fmt == 'columnar':
+        count = _write_columnar(list(papers), tmp_path)
+    else:
+        papers = list(papers)
+        count = len(papers)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(papers, f, indent=2)
+    os.replace(tmp_path, path)
+    return count
+
+def iter_papers(path, columns=None):
+    """
+    Stream the papers in a file one dict at a time.
+
+    Args:
+        columns (list, optional): Fields to return. Columnar files only read
+            (and page in) those columns; other formats drop the rest.
+    """
+    fmt = papers_format(path)
+    if fmt == 'columnar':
+        with ColumnarPapers(path) as table:
+            yield from table.rows(columns)
+        return
+    if fmt == 'jsonl':
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    paper = json.loads(line)
+                    yield {name: paper.get(name) for name in columns} if columns else paper
+        return
+    with open(path, 'r', encoding='utf-8') as f:
+        for paper in json.load(f):
+            yield {name: paper.get(name) for name in columns} if columns else paper
+
+def read_columns(path, columns):
+    """Return {column: [values in paper order]} for the given columns only."""
+    if papers_format(path) == 'columnar':
+        with ColumnarPapers(path) as table:
+            return {name: list(table.column(name)) for name in columns}
+    values = {name: [] for name in columns}
+    for paper in iter_papers(path, columns):
+        for name in columns:
+            values[name].append(paper[name])
+    return values
+
+def count_papers(path):
+    """Number of papers in a file, without decoding them where the format allows."""
+    fmt = papers_format(path)
+    if fmt == 'columnar':
+        with ColumnarPapers(path) as table:
+            return len(table)
+    if fmt == 'jsonl':
+        with open(path, 'rb') as f:
+            return sum(1 for line in f if line.strip())
+    with open(path, 'r', encoding='utf-8') as f:
+        return len(json.load(f))
+
+def _encode_column(values):
+    """(kind, encoded values): 'str' when every value is a string, else 'json' (lists, numbers, None)."""
+    if all(isinstance(value, str) for value in values):
+        return 'str', [value.encode('utf-8') for value in values]
+    return 'json', [json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8') for value in values]
+
+def _write_columnar(papers, path):
+    """
+    Columnar layout: magic, header length, JSON header, then per column an
+    int64 offsets array (count + 1 entries) and a byte heap, each section
+    aligned to COLUMNAR_ALIGN so it can be viewed straight from the mapping.
+    """
+    names = []
+    for paper in papers:
+        names.extend(name for name in paper if name not in names)
+
+    sections = []
+    columns = {}
+    position = 0
+    for name in names:
+        kind, encoded = _encode_column([paper.get(name) for paper in papers])
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        heap = b''.join(encoded)
+        entry = {'kind': kind}
+        for part, data in (('offsets', offsets.tobytes()), ('heap', heap)):
+            position += -position % COLUMNAR_ALIGN
+            entry[part] = [position, len(data)]
+            sections.append((position, data))
+            position += len(data)
+        columns[name] = entry
+
+    header = json.dumps({'count': len(papers), 'columns': columns}).encode('utf-8')
+    data_start = len(COLUMNAR_MAGIC) + 8 + len(header)
+    data_start += -data_start % COLUMNAR_ALIGN
+    with open(path, 'wb') as f:
+        f.write(COLUMNAR_MAGIC)
+        f.write(struct.pack('<Q', len(header)))
+        f.write(header)
+        for offset, data in sections:
+            f.seek(data_start + offset)
+            f.write(data)
+        f.truncate(data_start + position)
+    return len(papers)
+
+class StringColumn:
+    """One column of a ColumnarPapers file: offsets and heap viewed from the memory map."""
+
+    def __init__(self, kind, offsets, heap):
+        self.kind = kind
+        self.offsets = offsets
+        self.heap = heap
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def _decode(self, raw):
+        text = raw.decode('utf-8')
+        return text if self.kind == 'str' else json.loads(text)
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self._decode(self.heap[start:end].tobytes())
+
+    def __iter__(self):
+        # One copy of the heap and the offsets, instead of a slice of the map per value
+        heap = self.heap.tobytes()
+        offsets = self.offsets.tolist()
+        if self.kind == 'json':
+            # Values are whole JSON documents back to back, so one parse decodes the column
+            yield from json.loads(b'[' + b','.join(heap[start:end] for start, end in zip(offsets, offsets[1:])) + b']')
+            return
+        for start, end in zip(offsets, offsets[1:]):
+            yield heap[start:end].decode('utf-8')
+
+class ColumnarPapers:
+    """
+    Read-only, memory-mapped view of a columnar papers file.
+
+    Only the pages of the columns actually read are loaded, so projecting
+    titles out of an archive-sized file costs about as much as the titles.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+                raise ValueError(f"Not a columnar papers file: {path}")
+            header_length, = struct.unpack('<Q', f.read(8))
+            header = json.loads(f.read(header_length))
+        self.count = header['count']
+        self.columns = header['columns']
+        data_start = len(COLUMNAR_MAGIC) + 8 + header_length
+        data_start += -data_start % COLUMNAR_ALIGN
+        self._map = np.memmap(path, dtype=np.uint8, mode='r')
+        self._data = self._map[data_start:]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        # The mapping is unmapped once no column view refers to it any more
+        self._data = None
+        self._map = None
+
+    def __len__(self):
+        return self.count
+
+    def column(self, name):
+        entry = self.columns.get(name)
+        if entry is None:
+            return [None] * self.count
+        (offsets_start, offsets_length), (heap_start, heap_length) = entry['offsets'], entry['heap']
+        offsets = self._data[offsets_start:offsets_start + offsets_length].view('<i8')
+        heap = self._data[heap_start:heap_start + heap_length]
+        return StringColumn(entry['kind'], offsets, heap)
+
+    def rows(self, columns=None):
+        """Yield one dict per paper with the given columns (all by default)."""
+        names = list(columns or self.columns)
+        selected = [iter(self.column(name)) for name in names]
+        for values in zip(*selected):
+            yield dict(zip(names, values))
@@ -0,0 +1,286 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from config import DATA_DIR, PAPER_DB_FILE, SQLITE_TIMEOUT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    base_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    id TEXT NOT NULL,
+    title TEXT,
+    summary TEXT,
+    authors TEXT,
+    categories TEXT,
+    published TEXT,
+    updated TEXT,
+    PRIMARY KEY (base_id, version)
+);
+CREATE INDEX IF NOT EXISTS idx_papers_published ON papers (published);
+
+CREATE TABLE IF NOT EXISTS paper_categories (
+    base_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    PRIMARY KEY (base_id, version, category)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_categories_category ON paper_categories (category);
+
+CREATE TABLE IF NOT EXISTS paper_analyses (
+    base_id TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    analysis TEXT NOT NULL,
+    model TEXT,
+    created TEXT NOT NULL,
+    PRIMARY KEY (base_id, version)
+);
+
+CREATE TABLE IF NOT EXISTS term_counts (
+    day TEXT NOT NULL,
+    term TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (day, term)
+);
+
+CREATE TABLE IF NOT EXISTS counted_papers (
+    base_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    day TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+ARXIV_ID_PATTERN = re.compile(r'(?:abs/)?([^/]+/\d+|\d+\.\d+)(?:v(\d+))?$')
+
+def split_arxiv_id(arxiv_id):
+    """
+    Split an arXiv id or abs URL into its base id and version.
+
+    >>> split_arxiv_id('http://arxiv.org/abs/2409.12345v2')
+    ('2409.12345', 2)
+    """
+    match = ARXIV_ID_PATTERN.search(arxiv_id.strip())
+    if not match:
+        return arxiv_id, 1
+    return match.group(1), int(match.group(2) or 1)
+
+class PaperStore:
+    """SQLite-backed history of every paper fetched, keyed by base arXiv id and version."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, PAPER_DB_FILE)
+        self.conn = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the database write lock across a read-modify-write, e.g. against parallel backfill workers."""
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+            if self.conn.in_transaction:
+                self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+
+    def upsert_papers(self, papers, advance_high_water_mark=True):
+        """
+        Insert or refresh papers and advance the high-water mark. Returns the number written.
+
+        Pass advance_high_water_mark=False for an incomplete fetch, so the next
+        incremental fetch still covers the papers that are missing.
+        """
+        rows = []
+        category_rows = []
+        for paper in papers:
+            base_id, version = split_arxiv_id(paper['id'])
+            rows.append((
+                base_id, version, paper['id'], paper.get('title'), paper.get('summary'),
+                json.dumps(paper.get('authors', [])), json.dumps(paper.get('categories', [])),
+                paper.get('published'), paper.get('updated'),
+            ))
+            category_rows.extend((base_id, version, category) for category in paper.get('categories', []))
+
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO papers (base_id, version, id, title, summary, authors, categories, published, updated)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (base_id, version) DO UPDATE SET
+                    id = excluded.id, title = excluded.title, summary = excluded.summary,
+                    authors = excluded.authors, categories = excluded.categories,
+                    published = excluded.published, updated = excluded.updated
+            """, rows)
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO paper_categories (base_id, version, category) VALUES (?, ?, ?)",
+                category_rows
+            )
+            newest = max((row[7] for row in rows if row[7]), default=None)
+            if newest and advance_high_water_mark:
+                self.conn.execute("""
+                    INSERT INTO meta (key, value) VALUES ('high_water_mark', ?)
+                    ON CONFLICT (key) DO UPDATE SET value = MAX(value, excluded.value)
+                """, (newest,))
+
+        logging.info(f"Upserted {len(rows)} papers into {self.path}")
+        return len(rows)
+
+    def get_high_water_mark(self):
+        """Return the newest published timestamp stored, or None for an empty store."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'high_water_mark'").fetchone()
+        if row is None:
+            return None
+        return datetime.strptime(row['value'], '%Y-%m-%dT%H:%M:%SZ')
+
+    def get_papers(self, since=None, until=None, category=None):
+        """
+        Return the latest version of each stored paper, newest first.
+
+        Args:
+            since (date, optional): Only papers published on or after this date.
+            until (date, optional): Only papers published on or before this date.
+            category (str, optional): Only papers listed under this arXiv category.
+        """
+        query = """
+            SELECT p.* FROM papers p
+            WHERE p.version = (SELECT MAX(version) FROM papers WHERE base_id = p.base_id)
+        """
+        params = []
+        if since is not None:
+            query += " AND p.published >= ?"
+            params.append(since.strftime('%Y-%m-%d'))
+        if until is not None:
+            query += " AND p.published < ?"
+            params.append((until + timedelta(days=1)).strftime('%Y-%m-%d'))
+        if category is not None:
+            query += """ AND EXISTS (
+                SELECT 1 FROM paper_categories c
+                WHERE c.base_id = p.base_id AND c.version = p.version AND c.category = ?
+            )"""
+            params.append(category)
+        query += " ORDER BY p.published DESC"
+        return [self._row_to_paper(row) for row in self.conn.execute(query, params)]
+
+    def get_paper(self, arxiv_id):
+        """Return the stored paper for an id, honouring an explicit version if one is given."""
+        base_id, version = split_arxiv_id(arxiv_id)
+        if re.search(r'v\d+$', arxiv_id):
+            row = self.conn.execute(
+                "SELECT * FROM papers WHERE base_id = ? AND version = ?", (base_id, version)
+            ).fetchone()
+        else:
+            row = self.conn.execute(
+                "SELECT * FROM papers WHERE base_id = ? ORDER BY version DESC LIMIT 1", (base_id,)
+            ).fetchone()
+        return self._row_to_paper(row) if row else None
+
+    def get_analyses(self, arxiv_ids):
+        """Return {arxiv_id: analysis} for the ids that already have a stored per-paper analysis."""
+        analyses = {}
+        for arxiv_id in arxiv_ids:
+            base_id, version = split_arxiv_id(arxiv_id)
+            row = self.conn.execute(
+                "SELECT analysis FROM paper_analyses WHERE base_id = ? AND version = ?", (base_id, version)
+            ).fetchone()
+            if row is not None:
+                analyses[arxiv_id] = row['analysis']
+        return analyses
+
+    def save_analyses(self, analyses, model=None):
+        """Persist {arxiv_id: analysis}, replacing any earlier analysis of the same version."""
+        created = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+        rows = [(*split_arxiv_id(arxiv_id), analysis, model, created) for arxiv_id, analysis in analyses.items()]
+        with self.conn:
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO paper_analyses (base_id, version, analysis, model, created)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+        return len(rows)
+
+    def get_uncounted_papers(self):
+        """
+        Return (paper, previous) for every paper whose latest version is not yet in the term counts.
+
+        `previous` is the earlier version that was counted (so its counts can
+        be subtracted), or None for a paper that was never counted.
+        """
+        rows = self.conn.execute("""
+            SELECT p.*, c.version AS counted_version FROM papers p
+            LEFT JOIN counted_papers c ON c.base_id = p.base_id
+            WHERE p.version = (SELECT MAX(version) FROM papers WHERE base_id = p.base_id)
+              AND (c.version IS NULL OR c.version < p.version)
+        """).fetchall()
+        pending = []
+        for row in rows:
+            previous = None
+            if row['counted_version'] is not None:
+                previous = self.get_paper(f"{row['base_id']}v{row['counted_version']}")
+            pending.append((self._row_to_paper(row), previous))
+        return pending
+
+    def add_term_counts(self, deltas, counted):
+        """
+        Apply per-day term count deltas and mark papers as counted, in one transaction.
+
+        Args:
+            deltas (dict): {day: Counter} of changes; negative counts subtract.
+            counted (list): arXiv ids (with version) whose text the deltas include.
+        """
+        rows = [(day, term, count) for day, counter in deltas.items() for term, count in counter.items() if count]
+        counted_rows = []
+        for arxiv_id, day in counted:
+            base_id, version = split_arxiv_id(arxiv_id)
+            counted_rows.append((base_id, version, day))
+        with self.conn:
+            self.conn.executemany("""
+                INSERT INTO term_counts (day, term, count) VALUES (?, ?, ?)
+                ON CONFLICT (day, term) DO UPDATE SET count = count + excluded.count
+            """, rows)
+            self.conn.execute("DELETE FROM term_counts WHERE count <= 0")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO counted_papers (base_id, version, day) VALUES (?, ?, ?)",
+                counted_rows
+            )
+        return len(rows)
+
+    def get_daily_term_counts(self, since, until):
+        """Return {date: {term: count}} for the days in [since, until] that have counts."""
+        daily = {}
+        rows = self.conn.execute(
+            "SELECT day, term, count FROM term_counts WHERE day >= ? AND day <= ?",
+            (since.strftime('%Y-%m-%d'), until.strftime('%Y-%m-%d'))
+        )
+        for row in rows:
+            day = datetime.strptime(row['day'], '%Y-%m-%d').date()
+            daily.setdefault(day, {})[row['term']] = row['count']
+        return daily
+
+    @staticmethod
+    def _row_to_paper(row):
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'summary': row['summary'],
+            'authors': json.loads(row['authors']),
+            'categories': json.loads(row['categories']),
+            'published': row['published'],
+            'updated': row['updated'],
+        }
@@ -0,0 +1,83 @@
+import logging
+import threading
+from collections import defaultdict
+from config import PROMPT_PAPER_FIELDS, PROMPT_ABSTRACT_CHARS
+from paper_store import split_arxiv_id
+
+def estimate_tokens(text):
+    """Rough token count for budgeting prompts (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def short_id(arxiv_id):
+    """'http://arxiv.org/abs/2409.12345v2' -> '2409.12345v2'"""
+    base_id, version = split_arxiv_id(arxiv_id)
+    return f"{base_id}v{version}"
+
+def normalize_whitespace(text):
+    return ' '.join((text or '').split())
+
+def trim(text, max_chars):
+    """Trim text to at most `max_chars` characters, cutting at a word boundary."""
+    if max_chars is None or len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(' ', 1)[0]
+    return cut.rstrip(',.;:') + '...'
+
+def format_paper(paper, fields=None, abstract_chars=None):
+    """
+    Serialize one paper as a dense prompt entry.
+
+    The entry opens with "[short id] title", followed by one line per other
+    selected field:
+
+        [2409.12345v1] Title of the paper
+        Trimmed abstract...
+        Categories: cs.AI, cs.LG
+    """
+    fields = PROMPT_PAPER_FIELDS if fields is None else fields
+    abstract_chars = PROMPT_ABSTRACT_CHARS if abstract_chars is None else abstract_chars
+
+    header = f"[{short_id(paper['id'])}]" if paper.get('id') else ''
+    if 'title' in fields:
+        header = f"{header} {normalize_whitespace(paper.get('title'))}".strip()
+    lines = [header] if header else []
+    if 'summary' in fields and paper.get('summary'):
+        lines.append(trim(normalize_whitespace(paper['summary']), abstract_chars))
+    if 'categories' in fields and paper.get('categories'):
+        lines.append(f"Categories: {', '.join(paper['categories'])}")
+    if 'authors' in fields and paper.get('authors'):
+        lines.append(f"Authors: {', '.join(paper['authors'])}")
+    if 'published' in fields and paper.get('published'):
+        lines.append(f"Published: {paper['published'][:10]}")
+    return '\n'.join(lines)
+
+def format_papers(papers, fields=None, abstract_chars=None):
+    """Serialize a list of papers for a prompt; strings are passed through unchanged."""
+    if papers is None or isinstance(papers, str):
+        return papers
+    return '\n\n'.join(format_paper(paper, fields, abstract_chars) for paper in papers)
+
+class TokenUsage:
+    """Thread-safe per-agent tally of estimated prompt and response tokens."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._usage = defaultdict(lambda: {'calls': 0, 'prompt_tokens': 0, 'response_tokens': 0})
+
+    def record(self, agent_name, prompt_tokens, response_tokens):
+        with self._lock:
+            usage = self._usage[agent_name]
+            usage['calls'] += 1
+            usage['prompt_tokens'] += prompt_tokens
+            usage['response_tokens'] += response_tokens
+
+    def snapshot(self):
+        with self._lock:
+            return {agent_name: dict(usage) for agent_name, usage in self._usage.items()}
+
+    def log_summary(self):
+        for agent_name, usage in sorted(self.snapshot().items()):
+            logging.info(
+                f"{agent_name}: {usage['calls']} calls, ~{usage['prompt_tokens']} prompt tokens, "
+                f"~{usage['response_tokens']} response tokens"
+            )
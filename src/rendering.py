@@ -0,0 +1,77 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+import matplotlib
+
+# Charts are only ever written to files; never let pyplot pick an interactive backend
+matplotlib.use('Agg')
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from config import RENDER_PROCESSES
+
+def new_figure(figsize=(10, 5)):
+    """
+    Create a Figure attached to an Agg canvas.
+
+    The figure is not registered with pyplot, so nothing keeps it alive
+    once the caller drops it and it never touches global plotting state.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
+
+def close_figure(fig):
+    """Release a figure's artists (and the image data they hold) right away."""
+    fig.clear()
+
+@contextmanager
+def figure(figsize=(10, 5)):
+    fig = new_figure(figsize)
+    try:
+        yield fig
+    finally:
+        close_figure(fig)
+
+def save_figure(fig, path, **kwargs):
+    """Write `fig` to `path` and close it, even if saving fails."""
+    try:
+        fig.savefig(path, **kwargs)
+    finally:
+        close_figure(fig)
+    return path
+
+def render_chart(job):
+    """Render one (chart_function, args, path) job: build the figure, write it, close it."""
+    chart, args, path = job
+    return save_figure(chart(*args), path)
+
+def render_charts(jobs, processes=None):
+    """
+    Render independent charts, each job a (chart_function, args, path) tuple.
+
+    Chart functions must be module-level so they can be sent to worker
+    processes; each worker writes its PNG directly. With one job or one
+    process everything renders in-process. Returns the paths that were
+    written; failed charts are logged and skipped.
+    """
+    jobs = list(jobs)
+    processes = min(processes or RENDER_PROCESSES, len(jobs))
+    written = []
+    if processes <= 1:
+        for job in jobs:
+            try:
+                written.append(render_chart(job))
+            except Exception as e:
+                logging.error(f"Error rendering {os.path.basename(job[2])}: {str(e)}")
+        return written
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [(job, executor.submit(render_chart, job)) for job in jobs]
+        for job, future in futures:
+            try:
+                written.append(future.result())
+            except Exception as e:
+                logging.error(f"Error rendering {os.path.basename(job[2])}: {str(e)}")
+    return written
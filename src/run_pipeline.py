@@ -1,52 +1,170 @@
+import argparse
 import logging
+import os
 import sys
 from datetime import datetime
+from functools import partial
 import pytz
-from arxiv_data_collector import main as collect_papers, get_date_range
-from content_analysis import run_content_analysis
-from visual_summary import create_visual_summary
-from website_generator import generate_website
-from config import GEMINI_API_KEY
-from social_media_integration import run_social_media_integration
+from config import (
+    SITE_DIR, TEMPLATES_DIR, PIPELINE_MANIFEST_FILE, GEMINI_API_KEY, LLM_BACKEND, MODEL_NAME,
+    artifact_dir, parse_day, check_credentials, setup_logging
+)
+from stage_runner import Stage, StageRunner, StageFailed
+from metrics import RunMetrics
+from paper_files import latest_papers_path, find_latest_papers
 
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# Each stage's module is imported only when the stage starts
 
-def run_pipeline():
+def collect_papers(day=None):
+    from arxiv_data_collector import main
+    main(day)
+
+def analyze_content(day=None):
+    from content_analysis import main
+    main(day)
+
+def visualize(day=None):
+    from visual_summary import create_visual_summary
+    create_visual_summary(day)
+
+def build_website(day=None):
+    from website_generator import generate_website
+    generate_website(day, publish_day=publish_day(day))
+
+def post_to_social_media():
+    from social_media_integration import run_social_media_integration
+    run_social_media_integration()
+
+def publish_day(day=None):
+    """The day a run collects and publishes: `day`, or today on arXiv's US/Pacific calendar."""
+    return day or datetime.now(pytz.timezone('US/Pacific')).date()
+
+def collection_day(day=None):
+    """arXiv announces on US/Pacific days; a new day means a new collection."""
+    return {'day': publish_day(day).strftime('%Y-%m-%d')}
+
+def build_stages(day=None):
+    """
+    The pipeline's stages for the daily run, or for one given day.
+
+    A given day reads and writes its own artifact directory and has no
+    tweet stage, since only the daily run is announced.
+    """
+    day = parse_day(day)
+    directory = artifact_dir(day)
+    papers = latest_papers_path(day)
+    # Resolved once collect has run, so a legacy latest_papers.json is only used when nothing newer was written
+    found_papers = partial(find_latest_papers, day)
+    results = os.path.join(directory, 'content_analysis_results.json')
+    wordcloud = os.path.join(directory, 'summary_wordcloud.png')
+    templates = [
+        os.path.join(TEMPLATES_DIR, name) for name in sorted(os.listdir(TEMPLATES_DIR))
+    ] if os.path.isdir(TEMPLATES_DIR) else []
+
+    stages = [
+        Stage('collect', partial(collect_papers, day), outputs=[papers], params=partial(collection_day, day)),
+        Stage('analyze', partial(analyze_content, day), inputs=[found_papers], outputs=[results],
+              params={'backend': LLM_BACKEND, 'model': MODEL_NAME}),
+        Stage('visualize', partial(visualize, day), inputs=[found_papers, results], outputs=[wordcloud]),
+        Stage('website', partial(build_website, day), inputs=[results, wordcloud] + templates,
+              outputs=[os.path.join(SITE_DIR, 'index.html')], params=partial(collection_day, day)),
+    ]
+    if day is None:
+        # No outputs: it is skipped once it has succeeded for these results, so a rerun never posts twice
+        stages.append(Stage('tweet', post_to_social_media, inputs=[results]))
+    return stages
+
+def stage_runner(day=None, metrics=None):
+    """StageRunner for the daily run or one day, with its manifest beside that run's artifacts."""
+    return StageRunner(build_stages(day), os.path.join(artifact_dir(day), PIPELINE_MANIFEST_FILE), metrics)
+
+# Order of the stages built by build_stages, for the --from/--to choices
+STAGE_NAMES = ['collect', 'analyze', 'visualize', 'website', 'tweet']
+
+def run_pipeline(test_date=None, start=None, end=None, resume=False, force=False, profile=()):
+    """
+    Run the pipeline stages, skipping any whose inputs are unchanged since their last successful run.
+
+    Args:
+        test_date (str, optional): Run for this day ('YYYY-MM-DD') in its own artifact
+            directory instead of the daily run.
+        start (str, optional): First stage to run.
+        end (str, optional): Last stage to run.
+        resume (bool): Start from the stage that failed last time.
+        force (bool): Run the selected stages even if they are up to date.
+        profile (iterable): Stages to run under the sampling profiler.
+
+    Every run writes its per-stage timings, peak memory and I/O counters to
+    data/metrics/run-<id>.json and data/metrics/pipeline.prom.
+
+    Returns:
+        bool: Whether every selected stage succeeded or was up to date.
+    """
+    run_metrics = RunMetrics(labels={'day': str(test_date or 'daily')}, profile=profile)
+    with run_metrics:
+        run_metrics.success = _run_stages(run_metrics, test_date, start, end, resume, force)
+    try:
+        run_metrics.save()
+    except OSError as e:
+        logging.error(f"Could not write run metrics: {str(e)}")
+    return run_metrics.success
+
+def _run_stages(run_metrics, test_date, start, end, resume, force):
     try:
         logging.info("Starting arXiv AI/ML summary pipeline...")
+        check_credentials()
         
-        if not GEMINI_API_KEY:
+        if LLM_BACKEND == 'gemini' and not GEMINI_API_KEY:
             raise ValueError("Gemini API key is not set. Cannot proceed with the pipeline.")
-        
-        # Step 1: Collect papers
-        logging.info("Collecting papers...")
-        start_date, end_date = get_date_range()
+
         pst = pytz.timezone('US/Pacific')
-        now = datetime.now(pst)
-        logging.info(f"Current time: {now.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-        logging.info(f"Fetching papers from {start_date} to {end_date} (PST)")
-        collect_papers()
-        
-        # Step 2: Analyze content
-        logging.info("Analyzing content...")
-        run_content_analysis()
-        
-        # Step 3: Create visual summary
-        logging.info("Creating visual summary...")
-        create_visual_summary()
-        
-        # Step 4: Generate website
-        logging.info("Generating website...")
-        generate_website()
-        
-        # Step 5: Run social media integration
-        logging.info("Running social media integration...")
-        run_social_media_integration()
-        
-        logging.info("Pipeline completed successfully.")
+        logging.info(f"Current time: {datetime.now(pst).strftime('%Y-%m-%d %H:%M:%S %Z')}")
+
+        runner = stage_runner(test_date, run_metrics)
+        results = runner.run(start=start, end=end, resume=resume, force=force)
+        ran = [name for name, outcome in results.items() if outcome == 'ran']
+        logging.info(f"Pipeline completed successfully. Ran: {', '.join(ran) or 'nothing'}")
+        return True
+    except StageFailed as e:
+        logging.error(f"{e}. Rerun with --resume to continue from '{e.stage}'.", exc_info=True)
     except Exception as e:
         logging.error(f"An error occurred during pipeline execution: {str(e)}", exc_info=True)
-        # Don't raise the exception here, allow the pipeline to complete
+    # Don't raise the exception here, allow the pipeline to complete
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the arXiv AI/ML summary pipeline.")
+    parser.add_argument('--import-report', action='store_true',
+                        help="Print a cold-start import time breakdown per stage instead of running")
+    parser.add_argument('--from', dest='start', choices=STAGE_NAMES, help="First stage to run")
+    parser.add_argument('--to', dest='end', choices=STAGE_NAMES, help="Last stage to run")
+    parser.add_argument('--resume', action='store_true', help="Start from the stage that failed last time")
+    parser.add_argument('--force', action='store_true', help="Run the selected stages even if they are up to date")
+    parser.add_argument('--date', help="Run for one day (YYYY-MM-DD) instead of the daily run")
+    parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'),
+                        help="Collect, analyze and render every day from START to END (YYYY-MM-DD) in parallel, "
+                             "then add them to the site")
+    parser.add_argument('--processes', type=int, help="Worker processes for --backfill")
+    parser.add_argument('--profile', action='append', default=[], choices=STAGE_NAMES,
+                        help="Run a stage under the sampling profiler (repeatable); "
+                             "stacks are written to data/metrics/profile-<run>-<stage>.txt")
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.import_report:
+        from startup_report import startup_report, format_report
+        print(format_report(startup_report()))
+        return
+
+    if args.backfill:
+        from backfill import backfill
+        outcomes = backfill(*args.backfill, processes=args.processes)
+        for day, outcome in sorted(outcomes.items()):
+            print(f"{day}: {outcome}")
+        sys.exit(1 if any(outcome.startswith('failed') for outcome in outcomes.values()) else 0)
+
+    run_pipeline(args.date, start=args.start, end=args.end, resume=args.resume, force=args.force,
+                 profile=args.profile)
 
 if __name__ == "__main__":
-    run_pipeline()
\ No newline at end of file
+    main()
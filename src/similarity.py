@@ -0,0 +1,78 @@
+import math
+from collections import defaultdict
+
+def title_tokens(paper):
+    """The set of lowercase, whitespace-separated title words used for title similarity."""
+    return frozenset((paper.get('title') or '').lower().split())
+
+def jaccard(tokens1, tokens2):
+    union = len(tokens1 | tokens2)
+    return len(tokens1 & tokens2) / union if union else 0.0
+
+def build_inverted_index(token_sets):
+    """Map each token to the ascending list of document indexes containing it."""
+    index = defaultdict(list)
+    for doc, tokens in enumerate(token_sets):
+        for token in tokens:
+            index[token].append(doc)
+    return index
+
+def shared_term_pairs(token_sets, min_shared=2):
+    """
+    Return (i, j, shared) for every pair of documents with at least `min_shared` tokens in common.
+
+    Co-occurrences are counted along the inverted index's posting lists,
+    so only pairs that actually share a token are ever visited.
+    """
+    index = build_inverted_index(token_sets)
+    edges = []
+    for i, tokens in enumerate(token_sets):
+        shared = defaultdict(int)
+        for token in tokens:
+            for j in index[token]:
+                if j > i:
+                    shared[j] += 1
+        edges.extend((i, j, count) for j, count in shared.items() if count >= min_shared)
+    edges.sort()
+    return edges
+
+def jaccard_pairs(token_sets, threshold):
+    """
+    Return (i, j, similarity) for every pair of documents whose Jaccard similarity exceeds `threshold`.
+
+    Uses prefix filtering: tokens are ordered rarest first and only each
+    document's prefix of length |x| - ceil(threshold * |x|) + 1 is indexed,
+    which is guaranteed to overlap for any pair at or above the threshold.
+    Candidates are further pruned by size before the exact similarity is
+    computed, so common words never produce a quadratic candidate set.
+    """
+    frequency = defaultdict(int)
+    for tokens in token_sets:
+        for token in tokens:
+            frequency[token] += 1
+
+    ordered = [sorted(tokens, key=lambda token: (frequency[token], token)) for tokens in token_sets]
+    # Visit documents by increasing size so each is only compared against smaller or equal ones
+    order = sorted(range(len(token_sets)), key=lambda doc: len(token_sets[doc]))
+
+    index = defaultdict(list)
+    edges = []
+    for doc in order:
+        tokens = ordered[doc]
+        size = len(tokens)
+        if not size:
+            continue
+        prefix = size - math.ceil(threshold * size) + 1
+        min_size = threshold * size
+        candidates = set()
+        for token in tokens[:prefix]:
+            for other in index[token]:
+                if len(token_sets[other]) >= min_size:
+                    candidates.add(other)
+            index[token].append(doc)
+        for other in candidates:
+            similarity = jaccard(token_sets[doc], token_sets[other])
+            if similarity > threshold:
+                edges.append((min(doc, other), max(doc, other), similarity))
+    edges.sort()
+    return edges
@@ -0,0 +1,139 @@
+import gzip
+import hashlib
+import logging
+import os
+import re
+from config import SITE_IMAGE_WIDTHS, SITE_COMPRESS_EXTENSIONS
+from lazy_imports import LazyModule
+
+Image = LazyModule('PIL.Image')
+
+# Brotli is optional; without it only .gz siblings are written
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+CLASS_ATTRIBUTE_PATTERN = re.compile(r'class="([^"]*)"')
+CSS_CLASS_PATTERN = re.compile(r'\.([A-Za-z0-9_-]+)')
+CSS_COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.S)
+
+def variant_path(rel_path, width, ext):
+    stem, _ = os.path.splitext(rel_path)
+    return f"{stem}.w{width}{ext}" if width else f"{stem}{ext}"
+
+def image_variants(output_dir, rel_path, widths=None):
+    """
+    Write WebP and downscaled PNG variants of a fingerprinted image.
+
+    Variants are named after the fingerprinted source, so an image whose
+    content hash is unchanged already has them and nothing is re-encoded.
+
+    Returns:
+        dict: 'width' and 'height' of the original, and 'png' / 'webp' lists
+        of (rel_path, width) from smallest to largest.
+    """
+    widths = SITE_IMAGE_WIDTHS if widths is None else widths
+    source = os.path.join(output_dir, rel_path)
+    with Image.open(source) as image:
+        width, height = image.size
+        variants = {'width': width, 'height': height, 'png': [], 'webp': []}
+        for target in sorted(w for w in widths if w < width) + [None]:
+            target_width = target or width
+            for ext, key in (('.png', 'png'), ('.webp', 'webp')):
+                out = variant_path(rel_path, target, ext)
+                variants[key].append((out, target_width))
+                out_path = os.path.join(output_dir, out)
+                if out == rel_path or os.path.exists(out_path):
+                    continue
+                resized = image if target is None else image.resize(
+                    (target_width, max(1, round(height * target_width / width))), Image.LANCZOS
+                )
+                if ext == '.webp':
+                    resized.save(out_path, 'WEBP', quality=80, method=6)
+                else:
+                    resized.save(out_path, 'PNG', optimize=True)
+    return variants
+
+def srcset(entries, root=''):
+    return ', '.join(f"{root}{path} {width}w" for path, width in entries)
+
+def compress_file(path):
+    """Write .gz (and .br when brotli is installed) siblings of `path`; returns their paths."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    # mtime=0 keeps the .gz byte-identical for identical content
+    with open(path + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    written.append(path + '.gz')
+    if brotli is not None:
+        with open(path + '.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+        written.append(path + '.br')
+    return written
+
+def compress_outputs(output_dir, rel_paths, hashes):
+    """
+    Precompress the given site files, skipping any whose content hash is unchanged.
+
+    Args:
+        rel_paths: Files written by this build.
+        hashes (dict): {rel_path: content hash} from earlier builds, updated in place.
+    """
+    compressed = 0
+    for rel_path in rel_paths:
+        if not rel_path.endswith(SITE_COMPRESS_EXTENSIONS):
+            continue
+        path = os.path.join(output_dir, rel_path)
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        if hashes.get(rel_path) == digest and os.path.exists(path + '.gz'):
+            continue
+        compress_file(path)
+        hashes[rel_path] = digest
+        compressed += 1
+    logging.info(f"Compressed {compressed} site files")
+    return compressed
+
+def used_classes(html_sources):
+    classes = set()
+    for html in html_sources:
+        for attribute in CLASS_ATTRIBUTE_PATTERN.findall(html):
+            classes.update(attribute.split())
+    return classes
+
+def _selector_used(selector, classes):
+    return all(name in classes for name in CSS_CLASS_PATTERN.findall(selector))
+
+def _purge_rules(css, classes):
+    kept = []
+    position = 0
+    while True:
+        start = css.find('{', position)
+        if start == -1:
+            break
+        prelude = css[position:start].strip()
+        if prelude.startswith('@'):
+            # One level of nesting (@media): purge the inner rules, drop the block if nothing is left
+            depth, end = 1, start + 1
+            while depth and end < len(css):
+                depth += {'{': 1, '}': -1}.get(css[end], 0)
+                end += 1
+            inner = _purge_rules(css[start + 1:end - 1], classes)
+            if inner:
+                kept.append(f"{prelude}{{{inner}}}")
+            position = end
+            continue
+        end = css.find('}', start)
+        selectors = [selector.strip() for selector in prelude.split(',')]
+        selectors = [selector for selector in selectors if _selector_used(selector, classes)]
+        if selectors:
+            body = ' '.join(css[start + 1:end].split())
+            kept.append(f"{','.join(selectors)}{{{body}}}")
+        position = end + 1
+    return ''.join(kept)
+
+def purge_css(css, html_sources):
+    """Keep only the CSS rules whose class selectors are all used in `html_sources`, minified."""
+    return _purge_rules(CSS_COMMENT_PATTERN.sub('', css), used_classes(html_sources))
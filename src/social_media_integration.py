@@ -1,12 +1,12 @@
-import tweepy
 import os
 import json
 from datetime import datetime
 import logging
-from config import DATA_DIR, TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET
+from lazy_imports import LazyModule
+from config import DATA_DIR, TWITTER_API_KEY, TWITTER_API_SECRET, TWITTER_ACCESS_TOKEN, TWITTER_ACCESS_TOKEN_SECRET, setup_logging
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+# tweepy is only imported once a tweet is actually set up or posted
+tweepy = LazyModule('tweepy')
 
 def setup_twitter_api():
     logging.info(f"TWITTER_API_KEY set: {bool(TWITTER_API_KEY)}")
@@ -72,4 +72,5 @@ def run_social_media_integration():
         logging.error("Failed to post tweet.")
 
 if __name__ == "__main__":
+    setup_logging()
     run_social_media_integration()
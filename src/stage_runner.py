@@ -0,0 +1,173 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from config import DATA_DIR, PIPELINE_MANIFEST_FILE
+
+class StageFailed(Exception):
+    """Raised by StageRunner.run when a stage raises or does not produce its declared outputs."""
+
+    def __init__(self, stage, message):
+        super().__init__(f"Stage '{stage}' failed: {message}")
+        self.stage = stage
+
+class Stage:
+    """
+    One pipeline step and the artifacts it reads and writes.
+
+    Args:
+        name (str): Stage name, used by --from/--to and in the manifest.
+        func (callable): Called with no arguments to run the stage.
+        inputs (list): Artifact paths whose content the stage depends on; a
+            callable entry is evaluated when the runner checks the stage, for
+            paths that depend on what earlier stages wrote.
+        outputs (list): Artifact paths the stage must produce.
+        params (dict or callable, optional): Values other than files that the
+            result depends on (a date, a model name); a callable is
+            evaluated when the runner checks the stage.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=(), params=None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.params = params
+
+    def get_params(self):
+        return self.params() if callable(self.params) else (self.params or {})
+
+    def get_inputs(self):
+        return [path() if callable(path) else path for path in self.inputs]
+
+def artifact_hash(path):
+    """Content hash of a file, or None if it does not exist."""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class StageRunner:
+    """
+    Run stages in order, skipping those whose inputs and outputs are unchanged.
+
+    The manifest records, per stage, a hash of its params and input
+    contents, the hashes of the outputs it produced and whether it
+    succeeded. A stage is skipped when its last run succeeded with the same
+    input hash and its outputs are still exactly what it wrote. Because one
+    stage's outputs are the next one's inputs, a change anywhere reruns
+    everything downstream of it and nothing upstream.
+
+    With `metrics` (a metrics.RunMetrics) every stage that runs is measured
+    and skipped stages are recorded as such.
+    """
+
+    def __init__(self, stages, manifest_path=None, metrics=None):
+        self.stages = list(stages)
+        self.manifest_path = manifest_path or os.path.join(DATA_DIR, PIPELINE_MANIFEST_FILE)
+        self.metrics = metrics
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {'stages': {}, 'failed': None}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def stage_names(self):
+        return [stage.name for stage in self.stages]
+
+    def inputs_hash(self, stage, inputs=None):
+        payload = {
+            'params': stage.get_params(),
+            'inputs': {path: artifact_hash(path) for path in (stage.get_inputs() if inputs is None else inputs)},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def is_fresh(self, stage, inputs_hash):
+        record = self.manifest['stages'].get(stage.name)
+        if not record or record.get('status') != 'ok' or record.get('inputs_hash') != inputs_hash:
+            return False
+        return all(artifact_hash(path) == record['outputs'].get(path) for path in stage.outputs)
+
+    def select(self, start=None, end=None, resume=False):
+        """Stages from `start` (or the last failed stage when resuming) through `end`."""
+        names = self.stage_names()
+        for name in (start, end):
+            if name is not None and name not in names:
+                raise ValueError(f"Unknown stage '{name}'. Stages: {', '.join(names)}")
+        if resume and self.manifest.get('failed') in names:
+            start = self.manifest['failed']
+        first = names.index(start) if start else 0
+        last = names.index(end) if end else len(names) - 1
+        return self.stages[first:last + 1]
+
+    def run(self, start=None, end=None, resume=False, force=False):
+        """
+        Run the selected stages, stopping at the first failure.
+
+        Returns:
+            dict: {stage name: 'ran' or 'skipped'}.
+
+        Raises:
+            StageFailed: The failed stage is recorded so --resume starts there.
+        """
+        results = {}
+        for stage in self.select(start, end, resume):
+            inputs = stage.get_inputs()
+            inputs_hash = self.inputs_hash(stage, inputs)
+            missing = [path for path in inputs if not os.path.exists(path)]
+            if missing:
+                self._record_failure(stage, inputs_hash)
+                raise StageFailed(stage.name, f"missing inputs {missing}")
+            if not force and self.is_fresh(stage, inputs_hash):
+                logging.info(f"Stage '{stage.name}' is up to date, skipping")
+                results[stage.name] = 'skipped'
+                if self.metrics is not None:
+                    self.metrics.skipped(stage.name)
+                continue
+
+            logging.info(f"Running stage '{stage.name}'...")
+            started = time.time()
+            try:
+                with self.metrics.stage(stage.name) if self.metrics is not None else nullcontext():
+                    stage.func()
+            except Exception as e:
+                self._record_failure(stage, inputs_hash)
+                raise StageFailed(stage.name, str(e)) from e
+            outputs = {path: artifact_hash(path) for path in stage.outputs}
+            missing = [path for path, digest in outputs.items() if digest is None]
+            if missing:
+                self._record_failure(stage, inputs_hash)
+                raise StageFailed(stage.name, f"did not produce {missing}")
+
+            self.manifest['stages'][stage.name] = {
+                'status': 'ok',
+                'inputs_hash': inputs_hash,
+                'outputs': outputs,
+                'finished': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'seconds': round(time.time() - started, 3),
+            }
+            if self.manifest.get('failed') == stage.name:
+                self.manifest['failed'] = None
+            self._save_manifest()
+            results[stage.name] = 'ran'
+        return results
+
+    def _record_failure(self, stage, inputs_hash):
+        self.manifest['stages'][stage.name] = {'status': 'failed', 'inputs_hash': inputs_hash, 'outputs': {}}
+        self.manifest['failed'] = stage.name
+        self._save_manifest()
@@ -0,0 +1,75 @@
+import os
+import re
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Module each pipeline stage imports before it can do any work
+STAGE_MODULES = {
+    'collect': 'arxiv_data_collector',
+    'analyze': 'content_analysis',
+    'visualize': 'visual_summary',
+    'website': 'website_generator',
+    'tweet': 'social_media_integration',
+}
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s*(\d+)\s*\|\s*(\d+)\s*\|(\s*)(\S+)')
+
+def measure_import(module, top=5):
+    """
+    Import `module` in a fresh interpreter under -X importtime.
+
+    Returns:
+        dict: 'total_ms' (wall time of the cold import, interpreter start-up
+        excluded) and 'heaviest', the `top` direct dependencies by cumulative
+        import time in milliseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=SRC_DIR, capture_output=True, text=True,
+        env={**os.environ, 'PYTHONPATH': SRC_DIR},
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    # -X importtime prints post-order: a module's dependencies come right before it
+    total_us = 0
+    children = []
+    pending = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative = int(match.group(2))
+        depth = (len(match.group(3)) - 1) // 2
+        name = match.group(4)
+        if depth == 1:
+            pending.append((name, cumulative))
+        elif depth == 0:
+            if name == module:
+                total_us = cumulative
+                children = pending
+            pending = []
+
+    children.sort(key=lambda item: item[1], reverse=True)
+    return {
+        'total_ms': total_us / 1000,
+        'heaviest': [(name, us / 1000) for name, us in children[:top]],
+    }
+
+def startup_report(stages=None, top=5):
+    """Return {stage: measure_import(...)} for the given pipeline stages (all by default)."""
+    stages = stages or list(STAGE_MODULES)
+    return {stage: measure_import(STAGE_MODULES[stage], top) for stage in stages}
+
+def format_report(report):
+    lines = []
+    for stage, timing in report.items():
+        lines.append(f"{stage:<10} {STAGE_MODULES[stage]:<26} {timing['total_ms']:8.1f} ms")
+        for name, ms in timing['heaviest']:
+            lines.append(f"{'':<10}   {name:<35} {ms:8.1f} ms")
+    return '\n'.join(lines)
+
+if __name__ == "__main__":
+    print(format_report(startup_report(sys.argv[1:] or None)))
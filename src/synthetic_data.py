@@ -0,0 +1,153 @@
+import io
+import random
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+from config import CATEGORIES
+
+# Common words of AI/ML titles and abstracts; the synthetic vocabulary extends
+# them with generated terms so word frequencies have a realistic long tail
+SEED_TERMS = """
+learning model models neural network networks language large training data deep attention transformer
+transformers graph representation representations reinforcement policy agents agent diffusion generative
+image images vision video visual multimodal reasoning inference optimization gradient stochastic convex
+benchmark benchmarks evaluation dataset datasets task tasks performance robust robustness adversarial
+generalization efficient efficiency scalable sparse federated privacy fairness uncertainty bayesian
+probabilistic causal contrastive supervised unsupervised self-supervised semi-supervised fine-tuning
+pretraining pretrained prompt prompting instruction alignment retrieval augmented knowledge embedding
+embeddings token tokens sequence sequences temporal spatial segmentation detection classification
+regression clustering kernel estimation sampling variational autoencoder latent encoder decoder
+architecture layer layers parameter parameters compression quantization pruning distillation memory
+speech audio text translation summarization question answering dialogue code program synthesis robot
+robotics control planning navigation world simulation physics medical clinical molecular protein
+theory theoretical analysis bounds convergence complexity framework approach method methods novel
+""".split()
+
+TITLE_JOINERS = ['for', 'with', 'via', 'of', 'in', 'and', 'towards', 'using', 'from', 'on']
+SYLLABLES = ['ra', 'to', 'ne', 'mi', 'lo', 'ver', 'stra', 'con', 'dis', 'ex', 'pre', 'tion', 'al', 'ic', 'ive',
+             'gen', 'form', 'lat', 'ent', 'mo', 'dal', 'spec', 'tral', 'met', 'ric', 'sym', 'bol', 'net']
+FIRST_NAMES = ['Ana', 'Bo', 'Chen', 'Dara', 'Eli', 'Fatima', 'Guo', 'Hana', 'Ivan', 'Jun', 'Kofi', 'Lena',
+               'Mateo', 'Nina', 'Omar', 'Priya', 'Qi', 'Rosa', 'Sven', 'Tomas', 'Uma', 'Wei', 'Yuki', 'Zoe']
+LAST_NAMES = ['Adams', 'Bauer', 'Costa', 'Dubois', 'Eriksson', 'Fischer', 'Garcia', 'Huang', 'Ito', 'Jensen',
+              'Kim', 'Li', 'Martin', 'Nakamura', 'Okafor', 'Patel', 'Rossi', 'Singh', 'Tanaka', 'Wang', 'Zhang']
+
+def make_vocabulary(size, rng):
+    """SEED_TERMS followed by generated terms, `size` words in all, most frequent first."""
+    vocabulary = list(SEED_TERMS)
+    seen = set(vocabulary)
+    while len(vocabulary) < size:
+        word = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            vocabulary.append(word)
+    return vocabulary[:size]
+
+def synthetic_papers(count, seed=0, papers_per_day=500, vocabulary_size=20000, start=datetime(2024, 1, 1)):
+    """
+    Deterministic corpus of `count` arXiv-like papers.
+
+    Words are drawn from a Zipf distribution over the vocabulary, titles mix
+    them with the usual joining words, abstracts run 120-250 words in
+    sentences, and papers are spread over consecutive days `papers_per_day`
+    at a time. The same arguments always give the same corpus.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size, rng)
+    cumulative = []
+    total = 0.0
+    for rank in range(1, len(vocabulary) + 1):
+        total += 1.0 / rank
+        cumulative.append(total)
+
+    papers = []
+    for index in range(count):
+        title_words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(4, 9))
+        title_words.insert(rng.randint(1, len(title_words) - 1), rng.choice(TITLE_JOINERS))
+        title = ' '.join(title_words)
+
+        words = rng.choices(vocabulary, cum_weights=cumulative, k=rng.randint(120, 250))
+        sentences = [' '.join(words[i:i + 20]) for i in range(0, len(words), 20)]
+        summary = ' '.join(sentence.capitalize() + '.' for sentence in sentences)
+
+        published = start + timedelta(days=index // papers_per_day, seconds=rng.randint(0, 86399))
+        version = 1 if rng.random() < 0.9 else 2
+        papers.append({
+            'id': f"http://arxiv.org/abs/{2401 + index // 90000}.{index % 90000 + 1:05d}v{version}",
+            'title': title.capitalize(),
+            'summary': summary,
+            'authors': [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(rng.randint(1, 8))],
+            'categories': rng.sample(CATEGORIES, rng.randint(1, 3)),
+            'published': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'updated': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        })
+    return papers
+
+def atom_feed(papers, total_results=None, start_index=0):
+    """The papers as an arXiv API Atom response (bytes), the way export.arxiv.org formats them."""
+    out = io.StringIO()
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<feed xmlns="http://www.w3.org/2005/Atom" '
+              'xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/" '
+              'xmlns:arxiv="http://arxiv.org/schemas/atom">\n')
+    out.write('  <title type="html">ArXiv Query: synthetic</title>\n')
+    out.write(f'  <opensearch:totalResults>{len(papers) if total_results is None else total_results}'
+              f'</opensearch:totalResults>\n')
+    out.write(f'  <opensearch:startIndex>{start_index}</opensearch:startIndex>\n')
+    out.write(f'  <opensearch:itemsPerPage>{len(papers)}</opensearch:itemsPerPage>\n')
+    for paper in papers:
+        out.write('  <entry>\n')
+        out.write(f"    <id>{escape(paper['id'])}</id>\n")
+        out.write(f"    <updated>{paper['updated']}</updated>\n")
+        out.write(f"    <published>{paper['published']}</published>\n")
+        out.write(f"    <title>{escape(paper['title'])}</title>\n")
+        out.write(f"    <summary>  {escape(paper['summary'])}\n</summary>\n")
+        for author in paper['authors']:
+            out.write(f"    <author>\n      <name>{escape(author)}</name>\n    </author>\n")
+        out.write(f'    <link href="{escape(paper["id"])}" rel="alternate" type="text/html"/>\n')
+        out.write(f'    <arxiv:primary_category term="{paper["categories"][0]}" '
+                  f'scheme="http://arxiv.org/schemas/atom"/>\n')
+        for category in paper['categories']:
+            out.write(f'    <category term="{category}" scheme="http://arxiv.org/schemas/atom"/>\n')
+        out.write('  </entry>\n')
+    out.write('</feed>\n')
+    return out.getvalue().encode('utf-8')
+
+class LocalArxivResponse:
+    """Streamed response of LocalArxivSession, usable like requests' in a `with` block."""
+
+    def __init__(self, body):
+        self.raw = io.BytesIO(body)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.raw.close()
+
+    def raise_for_status(self):
+        pass
+
+class LocalArxivSession:
+    """
+    Offline stand-in for the arXiv API session used by fetch_page.
+
+    Serves `papers` as paginated Atom feeds honouring the start and
+    max_results request parameters, so the collector's paging, streaming
+    parse and entry conversion run without network.
+    """
+
+    def __init__(self, papers):
+        self.papers = papers
+        self.requests = 0
+
+    def get(self, url, params=None, **kwargs):
+        self.requests += 1
+        params = params or {}
+        start = int(params.get('start', 0))
+        end = min(len(self.papers), start + int(params.get('max_results', len(self.papers))))
+        return LocalArxivResponse(atom_feed(self.papers[start:end], len(self.papers), start))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
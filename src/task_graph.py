@@ -0,0 +1,88 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+class TaskGraph:
+    """
+    Small dependency-graph executor.
+
+    Each node names the inputs it consumes, either other nodes or initial
+    values passed to `run`, and is called with them positionally as soon as
+    they are all available. Independent nodes run concurrently on a thread pool.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def add(self, name, func, inputs=()):
+        if name in self.nodes:
+            raise ValueError(f"Duplicate node: {name}")
+        self.nodes[name] = (func, tuple(inputs))
+
+    def _validate(self, initial):
+        for name, (_, inputs) in self.nodes.items():
+            for dep in inputs:
+                if dep not in self.nodes and dep not in initial:
+                    raise ValueError(f"Node {name} depends on unknown input {dep}")
+
+        # Kahn's algorithm over the node-to-node edges to reject cycles
+        remaining = {name: {dep for dep in inputs if dep in self.nodes} for name, (_, inputs) in self.nodes.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Cycle between nodes: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def run(self, initial=None, max_workers=None):
+        """
+        Run every node once its inputs are ready.
+
+        Args:
+            initial (dict, optional): Values available to nodes before anything runs.
+            max_workers (int, optional): Thread pool size. Defaults to the number of nodes.
+
+        Returns:
+            tuple: (outputs, timings) dicts keyed by node name, timings in seconds.
+
+        Raises:
+            Exception: The first exception raised by a node; nodes not yet started are cancelled.
+        """
+        initial = dict(initial or {})
+        self._validate(initial)
+        values = dict(initial)
+        outputs = {}
+        timings = {}
+        pending = dict(self.nodes)
+        running = {}
+
+        def timed(name, func, args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                timings[name] = time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=max_workers or max(len(self.nodes), 1)) as executor:
+            while pending or running:
+                for name, (func, inputs) in list(pending.items()):
+                    if all(dep in values for dep in inputs):
+                        args = [values[dep] for dep in inputs]
+                        running[executor.submit(timed, name, func, args)] = name
+                        del pending[name]
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        values[name] = outputs[name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        for name, seconds in timings.items():
+            logging.info(f"Node {name} finished in {seconds:.2f}s")
+        return outputs, timings
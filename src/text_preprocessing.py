@@ -0,0 +1,91 @@
+import logging
+import os
+import string
+import threading
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from config import PREPROCESS_PARALLEL_THRESHOLD
+from lazy_imports import LazyModule
+
+nltk = LazyModule('nltk')
+
+# Single bytes.translate pass: lowercase ASCII letters and delete everything
+# that is not a letter or whitespace (non-ASCII is dropped by the encode)
+LOWERCASE_TABLE = bytes.maketrans(string.ascii_uppercase.encode(), string.ascii_lowercase.encode())
+NON_ALPHA_BYTES = bytes(b for b in range(128) if chr(b) not in string.ascii_letters + string.whitespace)
+
+MIN_TOKEN_LENGTH = 3
+
+FALLBACK_STOPWORDS = frozenset(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
+
+_stopwords = None
+_stopwords_lock = threading.Lock()
+
+def download_nltk_data():
+    print("Downloading necessary NLTK data...")
+    import ssl
+    # Some Python installs lack CA certificates; only relax verification for this download
+    default_context = ssl._create_default_https_context
+    ssl._create_default_https_context = ssl._create_unverified_context
+    try:
+        nltk.download('stopwords', quiet=True)
+    except Exception as e:
+        print(f"Error downloading NLTK data: {e}")
+        print("Continuing without NLTK data. Some functionality may be limited.")
+    finally:
+        ssl._create_default_https_context = default_context
+
+def get_stopwords():
+    """English stopwords, loaded once per process (downloading the NLTK corpus if it is missing)."""
+    global _stopwords
+    with _stopwords_lock:
+        if _stopwords is None:
+            try:
+                try:
+                    nltk.data.find('corpora/stopwords')
+                except LookupError:
+                    download_nltk_data()
+                _stopwords = frozenset(nltk.corpus.stopwords.words('english'))
+            except (LookupError, OSError):
+                logging.warning("NLTK stopwords not available. Using a minimal set.")
+                _stopwords = FALLBACK_STOPWORDS
+        return _stopwords
+
+def tokenize(text, stop_words=None):
+    """Lowercase `text`, strip non-letters and return the tokens that are not stopwords."""
+    stop_words = get_stopwords() if stop_words is None else stop_words
+    cleaned = text.encode('ascii', 'ignore').translate(LOWERCASE_TABLE, NON_ALPHA_BYTES).decode('ascii')
+    return [word for word in cleaned.split() if len(word) >= MIN_TOKEN_LENGTH and word not in stop_words]
+
+def _init_worker(stop_words):
+    global _stopwords
+    _stopwords = stop_words
+
+def _tokenize_chunk(texts):
+    return [tokenize(text, _stopwords) for text in texts]
+
+def tokenize_many(texts, processes=None, parallel_threshold=PREPROCESS_PARALLEL_THRESHOLD):
+    """
+    Tokenize a batch of documents, returning one token list per document in order.
+
+    Batches smaller than `parallel_threshold` are tokenized in-process; larger
+    ones are split into chunks across a process pool whose workers receive
+    the stopword set once at start-up.
+    """
+    texts = [text or '' for text in texts]
+    stop_words = get_stopwords()
+    if len(texts) < parallel_threshold:
+        return [tokenize(text, stop_words) for text in texts]
+
+    processes = processes or os.cpu_count() or 1
+    chunk_size = max(1, -(-len(texts) // (processes * 4)))
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(stop_words,)) as executor:
+        return [tokens for chunk in executor.map(_tokenize_chunk, chunks) for tokens in chunk]
+
+def count_tokens(texts, **kwargs):
+    """Token frequencies over a batch of documents."""
+    counts = Counter()
+    for tokens in tokenize_many(texts, **kwargs):
+        counts.update(tokens)
+    return counts
@@ -0,0 +1,234 @@
+import logging
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from config import DATA_DIR, SQLITE_TIMEOUT, TREND_DB_FILE, TREND_WEEK_DAYS, TREND_MONTH_DAYS
+from text_preprocessing import tokenize, tokenize_many
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trend_mentions (
+    day TEXT NOT NULL,
+    trend TEXT NOT NULL,
+    mentions INTEGER NOT NULL,
+    PRIMARY KEY (day, trend)
+);
+CREATE INDEX IF NOT EXISTS idx_trend_mentions_trend ON trend_mentions (trend, day);
+
+CREATE TABLE IF NOT EXISTS trend_names (
+    trend TEXT PRIMARY KEY,
+    display TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS trend_rollups (
+    day TEXT NOT NULL,
+    trend TEXT NOT NULL,
+    daily INTEGER NOT NULL,
+    weekly INTEGER NOT NULL,
+    monthly INTEGER NOT NULL,
+    PRIMARY KEY (day, trend)
+);
+CREATE INDEX IF NOT EXISTS idx_trend_rollups_weekly ON trend_rollups (day, weekly);
+"""
+
+# "1. **Name**: explanation", "2) Name - explanation", "- Name: explanation"
+TREND_LINE_PATTERN = re.compile(r'^\s*(?:\d+[.)]|[-*])\s+(.+)$')
+TREND_NAME_SEPARATORS = re.compile(r'\s*(?::|\s[-–—]\s)\s*')
+
+def parse_trend_names(trends_text):
+    """
+    Pull the trend names out of the trend spotter's numbered list.
+
+    Falls back to comma-separated names when the text is not a list.
+    """
+    names = []
+    for line in (trends_text or '').splitlines():
+        match = TREND_LINE_PATTERN.match(line)
+        if match:
+            name = TREND_NAME_SEPARATORS.split(match.group(1).replace('**', ''), maxsplit=1)[0]
+            names.append(name.strip(' *_.'))
+    if not names:
+        names = [name.strip() for name in (trends_text or '').split(',')]
+    return [name for name in names if name]
+
+def singular(word):
+    if len(word) > 3 and word.endswith('s') and not word.endswith(('ss', 'is', 'us')):
+        return word[:-1]
+    return word
+
+def normalize_trend(name):
+    """
+    Canonical key for a trend name, so 'Large Language Models' and
+    'large-language model' are counted as the same trend.
+    """
+    words = re.sub(r'[^a-z0-9]+', ' ', name.lower()).split()
+    return ' '.join(singular(word) for word in words)
+
+def day_key(day):
+    return day.strftime('%Y-%m-%d')
+
+class TrendIndex:
+    """
+    SQLite index of the trends named each day.
+
+    Each recorded day stores, per normalized trend, how many of that day's
+    papers mention it, and keeps rollup rows with the daily, weekly and
+    monthly totals up to date so rising and falling trends are simple
+    indexed lookups.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(DATA_DIR, TREND_DB_FILE)
+        self.conn = sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def record_day(self, day, trends_text, papers=()):
+        """
+        Record the trends named for `day`, replacing anything recorded for it before.
+
+        A trend's frequency is the number of that day's papers whose title
+        and abstract contain every word of its name, and at least 1 since
+        the trend spotter named it. Returns {trend: mentions}.
+        """
+        names = {}
+        for name in parse_trend_names(trends_text):
+            names.setdefault(normalize_trend(name), name)
+        names.pop('', None)
+
+        paper_tokens = [set(tokens) for tokens in tokenize_many(
+            [f"{paper.get('title') or ''} {paper.get('summary') or ''}" for paper in papers]
+        )]
+        paper_tokens = [{singular(token) for token in tokens} for tokens in paper_tokens]
+        mentions = {}
+        for trend in names:
+            words = {singular(word) for word in tokenize(trend)}
+            count = sum(1 for tokens in paper_tokens if words and words <= tokens)
+            mentions[trend] = max(count, 1)
+
+        key = day_key(day)
+        with self.conn:
+            self.conn.execute("DELETE FROM trend_mentions WHERE day = ?", (key,))
+            self.conn.executemany(
+                "INSERT INTO trend_mentions (day, trend, mentions) VALUES (?, ?, ?)",
+                [(key, trend, count) for trend, count in mentions.items()]
+            )
+            self.conn.executemany("""
+                INSERT INTO trend_names (trend, display, first_seen, last_seen) VALUES (?, ?, ?, ?)
+                ON CONFLICT (trend) DO UPDATE SET
+                    first_seen = MIN(first_seen, excluded.first_seen),
+                    last_seen = MAX(last_seen, excluded.last_seen)
+            """, [(trend, names[trend], key, key) for trend in mentions])
+            # This day feeds the windows of the month that follows it; refresh any of those already rolled up
+            affected = [day] + [
+                datetime.strptime(row['day'], '%Y-%m-%d').date()
+                for row in self.conn.execute(
+                    "SELECT DISTINCT day FROM trend_rollups WHERE day > ? AND day <= ?",
+                    (key, day_key(day + timedelta(days=TREND_MONTH_DAYS - 1)))
+                )
+            ]
+            for rollup_day in affected:
+                self._roll_up(rollup_day)
+
+        logging.info(f"Recorded {len(mentions)} trends for {key}")
+        return mentions
+
+    def _roll_up(self, day):
+        key = day_key(day)
+        week_start = day_key(day - timedelta(days=TREND_WEEK_DAYS - 1))
+        month_start = day_key(day - timedelta(days=TREND_MONTH_DAYS - 1))
+        self.conn.execute("DELETE FROM trend_rollups WHERE day = ?", (key,))
+        self.conn.execute("""
+            INSERT INTO trend_rollups (day, trend, daily, weekly, monthly)
+            SELECT ?, trend,
+                   SUM(CASE WHEN day = ? THEN mentions ELSE 0 END),
+                   SUM(CASE WHEN day >= ? THEN mentions ELSE 0 END),
+                   SUM(mentions)
+            FROM trend_mentions
+            WHERE day >= ? AND day <= ?
+            GROUP BY trend
+        """, (key, key, week_start, month_start, key))
+
+    def get_counts(self, day, limit=None, window='weekly'):
+        """Return [(display name, daily, weekly, monthly)] for `day`, ordered by `window`."""
+        if window not in ('daily', 'weekly', 'monthly'):
+            raise ValueError(f"Unknown trend window: {window}")
+        query = f"""
+            SELECT n.display, r.daily, r.weekly, r.monthly FROM trend_rollups r
+            JOIN trend_names n ON n.trend = r.trend
+            WHERE r.day = ? ORDER BY r.{window} DESC, r.trend
+        """
+        params = [day_key(day)]
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return [tuple(row) for row in self.conn.execute(query, params)]
+
+    def _changes(self, day, order, limit):
+        # The previous week is summed straight from the mentions, so it works
+        # even when nothing was recorded exactly a week earlier
+        rows = self.conn.execute(f"""
+            SELECT n.display, cur.weekly, COALESCE(prev.weekly, 0) AS previous,
+                   cur.weekly - COALESCE(prev.weekly, 0) AS change
+            FROM trend_rollups cur
+            JOIN trend_names n ON n.trend = cur.trend
+            LEFT JOIN (
+                SELECT trend, SUM(mentions) AS weekly FROM trend_mentions
+                WHERE day >= ? AND day <= ? GROUP BY trend
+            ) prev ON prev.trend = cur.trend
+            WHERE cur.day = ? AND cur.weekly - COALESCE(prev.weekly, 0) {'>' if order == 'DESC' else '<'} 0
+            ORDER BY change {order}, cur.trend
+            LIMIT ?
+        """, (
+            day_key(day - timedelta(days=2 * TREND_WEEK_DAYS - 1)), day_key(day - timedelta(days=TREND_WEEK_DAYS)),
+            day_key(day), limit
+        ))
+        return [(row['display'], row['previous'], row['weekly']) for row in rows]
+
+    def rising(self, day, limit=5):
+        """Trends whose weekly count grew most against the week before: [(name, previous, current)]."""
+        return self._changes(day, 'DESC', limit)
+
+    def falling(self, day, limit=5):
+        """Trends whose weekly count shrank most against the week before: [(name, previous, current)]."""
+        return self._changes(day, 'ASC', limit)
+
+    def get_history(self, end, days, top=5):
+        """
+        Daily mentions of the `top` trends of the last `days` days, for charting.
+
+        Returns {'days': [iso dates], 'series': {name: [mentions per day]}}.
+        """
+        start = end - timedelta(days=days - 1)
+        top_trends = self.conn.execute("""
+            SELECT trend, SUM(mentions) AS total FROM trend_mentions
+            WHERE day >= ? AND day <= ?
+            GROUP BY trend ORDER BY total DESC, trend LIMIT ?
+        """, (day_key(start), day_key(end), top)).fetchall()
+        day_keys = [day_key(start + timedelta(days=offset)) for offset in range(days)]
+        series = {}
+        for row in top_trends:
+            counts = dict(self.conn.execute(
+                "SELECT day, mentions FROM trend_mentions WHERE trend = ? AND day >= ? AND day <= ?",
+                (row['trend'], day_keys[0], day_keys[-1])
+            ).fetchall())
+            display = self.conn.execute(
+                "SELECT display FROM trend_names WHERE trend = ?", (row['trend'],)
+            ).fetchone()['display']
+            series[display] = [counts.get(key, 0) for key in day_keys]
+        return {'days': day_keys, 'series': series}
+
+    def get_latest_day(self):
+        row = self.conn.execute("SELECT MAX(day) AS day FROM trend_mentions").fetchone()
+        return datetime.strptime(row['day'], '%Y-%m-%d').date() if row['day'] else None
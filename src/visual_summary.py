@@ -1,60 +1,25 @@
 import json
 import os
 from datetime import datetime
-import matplotlib.pyplot as plt
-import networkx as nx
-from wordcloud import WordCloud
-from collections import Counter
-from config import DATA_DIR
-import markdown
-import re
-
-# Download NLTK data
-import nltk
-import ssl
-
-try:
-    _create_unverified_https_context = ssl._create_unverified_context
-except AttributeError:
-    pass
-else:
-    ssl._create_default_https_context = _create_unverified_https_context
-
-def download_nltk_data():
-    print("Downloading necessary NLTK data...")
-    try:
-        nltk.download('punkt', quiet=True)
-        nltk.download('stopwords', quiet=True)
-    except Exception as e:
-        print(f"Error downloading NLTK data: {e}")
-        print("Continuing without NLTK data. Some functionality may be limited.")
-
-download_nltk_data()
-
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
-def simple_tokenize(text):
-    return text.split()
-
-def preprocess_text(text):
-    text = re.sub(r'[^a-zA-Z\s]', '', text)
-    try:
-        tokens = word_tokenize(text.lower())
-    except LookupError:
-        print("Warning: NLTK tokenization failed. Using simple tokenization.")
-        tokens = simple_tokenize(text.lower())
-    try:
-        stop_words = set(stopwords.words('english'))
-    except LookupError:
-        print("Warning: NLTK stopwords not available. Using a minimal set.")
-        stop_words = set(['the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'])
-    filtered_tokens = [word for word in tokens if word not in stop_words and len(word) > 2]
-    return filtered_tokens
-
-def load_content_analysis_results():
+from config import TREND_CHART_DAYS, TREND_CHART_TOP, artifact_dir, parse_day, setup_logging
+from lazy_imports import LazyModule, lazy_callable
+from text_preprocessing import tokenize as preprocess_text, count_tokens
+from paper_store import PaperStore
+from trend_index import TrendIndex
+import word_frequencies
+import metrics
+from similarity import title_tokens, jaccard, shared_term_pairs, jaccard_pairs
+
+# Heavy dependencies are imported on first use so importing this module stays cheap
+rendering = LazyModule('rendering')
+nx = LazyModule('networkx')
+WordCloud = lazy_callable('wordcloud', 'WordCloud')
+abstract_similarity = LazyModule('abstract_similarity')
+graph_layout = LazyModule('graph_layout')
+
+def load_content_analysis_results(day=None):
     file_name = 'content_analysis_results.json'
-    file_path = os.path.join(DATA_DIR, file_name)
+    file_path = os.path.join(artifact_dir(day), file_name)
     try:
         with open(file_path, 'r') as f:
             return json.load(f)
@@ -65,136 +30,154 @@ def load_content_analysis_results():
         print(f"Error: Unable to parse content analysis results file at {file_path}")
         return None
 
+# Output file for each word cloud window; the daily cloud keeps the name the website expects
+WORDCLOUD_FILES = {
+    'daily': 'summary_wordcloud.png',
+    'weekly': 'wordcloud_weekly.png',
+    'monthly': 'wordcloud_monthly.png',
+}
+
 def generate_wordcloud(text):
-    wordcloud = WordCloud(width=800, height=400, background_color='white').generate(text)
-    plt.figure(figsize=(10, 5))
-    plt.imshow(wordcloud, interpolation='bilinear')
-    plt.axis('off')
-    return plt
-
-def generate_trend_graph(trends):
-    trend_list = [trend.strip() for trend in trends.split(',')]
-    trend_counts = Counter(trend_list)
-    top_trends = dict(sorted(trend_counts.items(), key=lambda x: x[1], reverse=True)[:10])
-    
-    try:
-        fig, ax = plt.subplots(figsize=(14, 10))  # Increased height
-    except ValueError:
-        # If subplots() fails, create a new figure and axis manually
-        fig = plt.figure(figsize=(14, 10))
-        ax = fig.add_subplot(111)
-    
-    bars = ax.barh(list(top_trends.keys()), list(top_trends.values()))
-    ax.set_title('Top 10 Trends')
-    ax.set_xlabel('Frequency')
-    ax.set_ylabel('Trends')
-    
-    # Add value labels to the right of each bar
-    for bar in bars:
-        width = bar.get_width()
-        ax.text(width, bar.get_y() + bar.get_height()/2, f'{width}',
-                ha='left', va='center', fontweight='bold')
-    
-    # Adjust layout and margins
-    plt.tight_layout()
-    plt.subplots_adjust(left=0.3)  # Increase left margin for labels
+    """Word cloud of free text, tokenized by the preprocessing pipeline rather than WordCloud's own."""
+    return generate_frequency_wordcloud(word_frequencies.top_frequencies(count_tokens([text])))
+
+def generate_frequency_wordcloud(frequencies):
+    wordcloud = WordCloud(width=800, height=400, background_color='white').generate_from_frequencies(frequencies)
+    fig = rendering.new_figure(figsize=(10, 5))
+    ax = fig.add_subplot()
+    ax.imshow(wordcloud.to_array(), interpolation='bilinear')
+    ax.axis('off')
+    return fig
+
+def generate_trend_graph(history):
+    """
+    Line chart of the daily paper mentions of the top trends.
+
+    Args:
+        history (dict): {'days': [iso dates], 'series': {trend: [mentions per day]}},
+            as returned by TrendIndex.get_history.
+    """
+    fig = rendering.new_figure(figsize=(14, 8))
+    ax = fig.add_subplot()
     
-    # Reverse y-axis to show most frequent trends at the top
-    ax.invert_yaxis()
+    days = [datetime.strptime(day, '%Y-%m-%d') for day in history['days']]
+    for trend, counts in history['series'].items():
+        ax.plot(days, counts, marker='o', markersize=3, label=trend)
+    ax.set_title('Top Trends Over Time')
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Papers mentioning the trend')
+    ax.legend(loc='upper left')
+    fig.autofmt_xdate()
+    fig.tight_layout()
     
-    return plt
+    return fig
+
+def draw_network(G, title, label_offset=0.0):
+    fig = rendering.new_figure(figsize=(12, 8))
+    ax = fig.add_subplot()
+    pos = graph_layout.layout_graph(G)
+    nx.draw(G, pos, ax=ax, with_labels=False, node_size=100, node_color='skyblue', font_size=8, font_weight='bold')
+    labels = nx.get_node_attributes(G, 'title')
+    label_pos = {k: (v[0], v[1]+label_offset) for k, v in pos.items()}
+    nx.draw_networkx_labels(G, label_pos, labels, font_size=6, ax=ax)
+    ax.set_title(title)
+    ax.axis('off')
+    return fig
 
 def generate_network_graph(papers):
     G = nx.Graph()
     for i, paper in enumerate(papers):
-        G.add_node(i, title=paper['title'])
-    for i, paper1 in enumerate(papers):
-        for j, paper2 in enumerate(papers[i+1:], i+1):
-            common_words = set(paper1['title'].lower().split()) & set(paper2['title'].lower().split())
-            if len(common_words) > 1:
-                G.add_edge(i, j)
-    plt.figure(figsize=(12, 8))
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=False, node_size=100, node_color='skyblue', font_size=8, font_weight='bold')
-    labels = nx.get_node_attributes(G, 'title')
-    label_pos = {k: (v[0], v[1]+0.02) for k, v in pos.items()}
-    nx.draw_networkx_labels(G, label_pos, labels, font_size=6)
-    plt.title("Paper Relationship Network")
-    plt.axis('off')
-    return plt
+        G.add_node(i, title=paper['title'], paper_id=paper.get('id'))
+    token_sets = [title_tokens(paper) for paper in papers]
+    G.add_edges_from((i, j) for i, j, _ in shared_term_pairs(token_sets, min_shared=2))
+    return draw_network(G, "Paper Relationship Network", label_offset=0.02)
 
-def generate_paper_network(papers):
+def generate_paper_network(papers, threshold=0.3):
     G = nx.Graph()
     for i, paper in enumerate(papers):
-        G.add_node(i, title=paper['title'])
-    
-    for i, paper1 in enumerate(papers):
-        for j, paper2 in enumerate(papers[i+1:], i+1):
-            similarity = calculate_similarity(paper1, paper2)
-            if similarity > 0.3:  # Adjust this threshold as needed
-                G.add_edge(i, j, weight=similarity)
+        G.add_node(i, title=paper['title'], paper_id=paper.get('id'))
     
-    plt.figure(figsize=(12, 8))
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=False, node_size=100, node_color='skyblue', font_size=8, font_weight='bold')
+    if any(paper.get('summary') for paper in papers):
+        # Cosine similarity of TF-IDF abstracts, from the persisted top-k neighbour table
+        neighbors, scores = abstract_similarity.get_neighbor_table(papers)
+        for i, row in enumerate(neighbors):
+            for j, similarity in zip(row, scores[i]):
+                if j >= 0 and similarity > threshold:
+                    G.add_edge(i, int(j), weight=float(similarity))
+    else:
+        token_sets = [title_tokens(paper) for paper in papers]
+        for i, j, similarity in jaccard_pairs(token_sets, threshold):
+            G.add_edge(i, j, weight=similarity)
     
-    labels = nx.get_node_attributes(G, 'title')
-    nx.draw_networkx_labels(G, pos, labels, font_size=6)
-    
-    plt.title("Paper Relationship Network")
-    plt.axis('off')
-    return plt
+    return draw_network(G, "Paper Relationship Network")
 
 def calculate_similarity(paper1, paper2):
-    # Implement a similarity measure between papers
-    # This could be based on common keywords, authors, or more sophisticated NLP techniques
-    # For now, let's use a simple Jaccard similarity on the titles
-    words1 = set(paper1['title'].lower().split())
-    words2 = set(paper2['title'].lower().split())
-    return len(words1.intersection(words2)) / len(words1.union(words2))
-
-def create_visual_summary():
-    results = load_content_analysis_results()
-    if results is None:
-        print("Error: Unable to create visual summary due to missing content analysis results.")
-        return
+    # Jaccard similarity on the title words; the network builders use the
+    # equivalent batched jaccard_pairs instead of calling this per pair
+    return jaccard(title_tokens(paper1), title_tokens(paper2))
 
-    print("Content analysis results keys:", results.keys())
+def wordcloud_frequencies(results, day=None):
+    """
+    Frequency tables for the word clouds, as {output_path: frequencies}.
 
-    summary_wordcloud = generate_wordcloud(results.get('summary', ''))
-    summary_wordcloud.savefig(os.path.join(DATA_DIR, 'summary_wordcloud.png'))
-    
-    summary_html = markdown.markdown(results.get('summary', ''))
-    trends_html = markdown.markdown(results.get('trends', ''))
-    top_articles_html = markdown.markdown(results.get('top_articles', ''))
-    
-    html_content = f"""
-    <html>
-    <head>
-        <title>ArXiv AI/ML Daily Summary</title>
-        <style>
-            body {{ font-family: Arial, sans-serif; line-height: 1.6; padding: 20px; max-width: 800px; margin: 0 auto; }}
-            h1 {{ color: #333; }}
-            h2 {{ color: #666; }}
-            img {{ max-width: 100%; height: auto; }}
-        </style>
-    </head>
-    <body>
-        <h1>ArXiv AI/ML Daily Summary</h1>
-        <h2>Word Cloud</h2>
-        <img src="summary_wordcloud.png" alt="Summary Word Cloud">
-        <h2>Top Articles</h2>
-        {top_articles_html}
-        <h2>Trends</h2>
-        {trends_html}
-    </body>
-    </html>
+    Clouds cover the daily, weekly and monthly windows of abstracts in the
+    paper store ending on `day` (by default its newest day), whose term
+    counts are brought up to date incrementally. An empty store falls back
+    to the LLM summary text.
     """
-    
-    with open(os.path.join(DATA_DIR, 'daily_summary.html'), 'w') as f:
-        f.write(html_content)
+    output_dir = artifact_dir(day)
+    with PaperStore() as store:
+        word_frequencies.update_term_counts(store)
+        newest = store.get_high_water_mark()
+        if newest is not None:
+            windows = word_frequencies.window_frequencies(store, day or newest.date())
+            return {
+                os.path.join(output_dir, WORDCLOUD_FILES[name]): word_frequencies.top_frequencies(counter)
+                for name, counter in windows.items() if counter and name in WORDCLOUD_FILES
+            }
+    summary_counts = count_tokens([results.get('summary', '')])
+    return {os.path.join(output_dir, WORDCLOUD_FILES['daily']): word_frequencies.top_frequencies(summary_counts)}
+
+def load_trend_history(day=None):
+    """Trend history as of `day` or else the latest day in the trend index, or None before any trends."""
+    with TrendIndex() as index:
+        latest = day or index.get_latest_day()
+        if latest is None:
+            return None
+        return index.get_history(latest, TREND_CHART_DAYS, top=TREND_CHART_TOP)
+
+def create_visual_summary(test_date=None):
+    """
+    Render the charts for a run; the site builder publishes them with the day's page.
+
+    Args:
+        test_date (str, optional): Date in the format 'YYYY-MM-DD'. Results are
+            read from and charts written to that day's artifact directory.
+            Defaults to None, the daily run in DATA_DIR.
+
+    Returns:
+        list: Paths of the charts written, or None without content analysis results.
+    """
+    day = parse_day(test_date)
+    output_dir = artifact_dir(day)
+    results = load_content_analysis_results(day)
+    if results is None:
+        print("Error: Unable to create visual summary due to missing content analysis results.")
+        return None
+
+    # Word clouds already rendered for the same frequency table are copied from the cache
+    charts, cloud_copies = word_frequencies.plan_wordclouds(wordcloud_frequencies(results, day), generate_frequency_wordcloud)
+    trend_history = load_trend_history(day)
+    if trend_history and trend_history['series']:
+        charts.append((generate_trend_graph, (trend_history,), os.path.join(output_dir, 'trend_graph.png')))
+    # Charts are independent, so they render in parallel and each worker writes its own PNG
+    with metrics.timed('render'):
+        rendered = rendering.render_charts(charts)
+    rendered += word_frequencies.publish_wordclouds(cloud_copies)
 
-    print(f"Visual summary created and saved as 'daily_summary.html' in {DATA_DIR}")
+    print(f"Visual summary: {len(rendered)} charts written to {output_dir}")
+    return rendered
 
 if __name__ == "__main__":
+    setup_logging()
     create_visual_summary()
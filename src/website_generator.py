@@ -1,33 +1,295 @@
+import hashlib
+import json
+import logging
 import os
 import shutil
-from config import DATA_DIR
+from datetime import date
+from config import (
+    DATA_DIR, SITE_DIR, TEMPLATES_DIR, SITE_MANIFEST_FILE, TEMPLATE_CACHE_DIR, ARCHIVE_PAGE_SIZE,
+    artifact_dir, parse_day, setup_logging
+)
+from lazy_imports import LazyModule
+from trend_index import TrendIndex
+import site_assets
+import metrics
 
-def generate_website():
-    # Path to the daily_summary.html file
-    daily_summary_path = os.path.join(DATA_DIR, 'daily_summary.html')
-    wordcloud_path = os.path.join(DATA_DIR, 'summary_wordcloud.png')
+jinja2 = LazyModule('jinja2')
+markupsafe = LazyModule('markupsafe')
+markdown = LazyModule('markdown')
 
-    # Check if the required files exist
-    if not os.path.exists(daily_summary_path):
-        print(f"Error: daily_summary.html not found in {DATA_DIR}")
-        return
-    if not os.path.exists(wordcloud_path):
-        print(f"Error: summary_wordcloud.png not found in {DATA_DIR}")
-        return
+# Charts published with each day's page, in page order, when they were rendered
+SITE_IMAGES = [
+    ('summary_wordcloud.png', 'Word Cloud'),
+    ('wordcloud_weekly.png', 'Weekly Word Cloud'),
+    ('wordcloud_monthly.png', 'Monthly Word Cloud'),
+    ('trend_graph.png', 'Top Trends Over Time'),
+]
 
-    # Set up the output directory
-    output_dir = os.path.join(os.path.dirname(__file__), '..', 'output')
-    os.makedirs(output_dir, exist_ok=True)
+MANIFEST_VERSION = 1
 
-    # Copy the daily_summary.html to the output directory as index.html
-    output_file = os.path.join(output_dir, 'index.html')
-    shutil.copy(daily_summary_path, output_file)
+def content_hash(data):
+    return hashlib.sha256(data).hexdigest()
 
-    # Copy the summary_wordcloud.png to the output directory
-    shutil.copy(wordcloud_path, os.path.join(output_dir, 'summary_wordcloud.png'))
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
 
-    print(f"Website generated: {output_file}")
-    print(f"Word cloud image copied to output directory")
+def headline(summary, limit=200):
+    """First sentence of a summary, for archive listings."""
+    text = ' '.join((summary or '').split())
+    sentence = text.split('. ')[0]
+    if len(sentence) > limit:
+        sentence = sentence[:limit].rsplit(' ', 1)[0] + '...'
+    return sentence
+
+class SiteBuilder:
+    """
+    Incremental builder for the static site in SITE_DIR.
+
+    Layout:
+        index.html              the latest day
+        days/<date>.html        one page per day, rendered from days/<date>.json
+        archive/page-<n>.html   days in chronological pages of ARCHIVE_PAGE_SIZE
+        archive/index.html      the newest archive page
+        assets/<name>.<hash>    content-fingerprinted images, with WebP and
+                                downscaled variants for srcset
+
+    The manifest records a hash of every page's inputs (templates, the day's
+    content and its neighbours), so a build only rewrites pages whose
+    inputs changed: normally the new day, its predecessor's "next" link,
+    the newest archive page and the index. Archive pages are numbered from
+    the oldest day so older pages never shift.
+    """
+
+    def __init__(self, output_dir=None, template_dir=None, cache_dir=None):
+        self.output_dir = output_dir or SITE_DIR
+        self.template_dir = template_dir or TEMPLATES_DIR
+        self.cache_dir = cache_dir or os.path.join(DATA_DIR, TEMPLATE_CACHE_DIR)
+        self.manifest_path = os.path.join(self.output_dir, SITE_MANIFEST_FILE)
+        self.manifest = self._load_manifest()
+        self.written = []
+        self.skipped = 0
+        self._env = None
+        self._templates_hash = None
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r') as f:
+                manifest = json.load(f)
+            if manifest.get('version') == MANIFEST_VERSION:
+                return manifest
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+        return {'version': MANIFEST_VERSION, 'files': {}, 'days': {}}
+
+    def save_manifest(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(self.manifest_path, 'w') as f:
+            json.dump(self.manifest, f, indent=1, sort_keys=True)
+
+    @property
+    def env(self):
+        """Jinja2 environment, created once, with compiled templates cached on disk between runs."""
+        if self._env is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self._env = jinja2.Environment(
+                loader=jinja2.FileSystemLoader(self.template_dir),
+                bytecode_cache=jinja2.FileSystemBytecodeCache(self.cache_dir),
+                autoescape=jinja2.select_autoescape(['html']),
+                auto_reload=False,
+            )
+            self._env.filters['markdown'] = lambda text: markupsafe.Markup(markdown.markdown(text or ''))
+            self._env.filters['srcset'] = site_assets.srcset
+            self._env.globals['inline_css'] = markupsafe.Markup(self.inline_css())
+        return self._env
+
+    def inline_css(self):
+        """templates/site.css purged down to the classes the templates use, for inlining in <head>."""
+        sources = []
+        for name in sorted(os.listdir(self.template_dir)):
+            if name.endswith('.html'):
+                with open(os.path.join(self.template_dir, name), 'r', encoding='utf-8') as f:
+                    sources.append(f.read())
+        css_path = os.path.join(self.template_dir, 'site.css')
+        if not os.path.exists(css_path):
+            return ''
+        with open(css_path, 'r', encoding='utf-8') as f:
+            return site_assets.purge_css(f.read(), sources)
+
+    @property
+    def templates_hash(self):
+        """Hash of every template source; a template change rebuilds every page."""
+        if self._templates_hash is None:
+            digest = hashlib.sha256()
+            for name in sorted(os.listdir(self.template_dir)):
+                path = os.path.join(self.template_dir, name)
+                if os.path.isfile(path):
+                    digest.update(name.encode('utf-8'))
+                    digest.update(file_hash(path).encode('ascii'))
+            self._templates_hash = digest.hexdigest()
+        return self._templates_hash
+
+    def _path(self, rel_path):
+        return os.path.join(self.output_dir, *rel_path.split('/'))
+
+    def write_if_changed(self, rel_path, inputs, render):
+        """Call render() and write its result only when `inputs` differ from the last build's."""
+        inputs_hash = content_hash(json.dumps([self.templates_hash, inputs], sort_keys=True).encode('utf-8'))
+        path = self._path(rel_path)
+        if self.manifest['files'].get(rel_path) == inputs_hash and os.path.exists(path):
+            self.skipped += 1
+            return False
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(render())
+        self.manifest['files'][rel_path] = inputs_hash
+        self.written.append(rel_path)
+        return True
+
+    def fingerprint_asset(self, source):
+        """Copy `source` to assets/<name>.<hash><ext> unless that exact file is already there."""
+        digest = file_hash(source)[:12]
+        stem, ext = os.path.splitext(os.path.basename(source))
+        rel_path = f"assets/{stem}.{digest}{ext}"
+        path = self._path(rel_path)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(source, path)
+            self.written.append(rel_path)
+        return rel_path
+
+    def add_day(self, day, results, image_dir=None, trend_changes=None):
+        """
+        Store a day's content and fingerprinted images as days/<date>.json.
+
+        `trend_changes` is the (rising, falling) pair of [(name, previous, current)]
+        lists from the trend index, listed under the day's trends.
+        """
+        image_dir = image_dir or DATA_DIR
+        rising, falling = trend_changes or ([], [])
+        images = []
+        for file_name, title in SITE_IMAGES:
+            source = os.path.join(image_dir, file_name)
+            if os.path.exists(source):
+                rel_path = self.fingerprint_asset(source)
+                images.append(dict(site_assets.image_variants(self.output_dir, rel_path), title=title, src=rel_path))
+
+        key = day.strftime('%Y-%m-%d')
+        content = {
+            'summary': results.get('summary', ''),
+            'top_articles': results.get('top_articles', ''),
+            'trends': results.get('trends', ''),
+            'rising': [list(change) for change in rising],
+            'falling': [list(change) for change in falling],
+            'images': images,
+        }
+        data = json.dumps(content, indent=1, sort_keys=True).encode('utf-8')
+        data_hash = content_hash(data)
+        rel_path = f"days/{key}.json"
+        path = self._path(rel_path)
+        if self.manifest['days'].get(key, {}).get('hash') != data_hash or not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.written.append(rel_path)
+        self.manifest['days'][key] = {'hash': data_hash, 'headline': headline(content['summary'])}
+
+    def _load_day(self, key):
+        with open(self._path(f"days/{key}.json"), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def build(self):
+        """Render every page whose inputs changed and save the manifest. Returns the paths written."""
+        days = sorted(self.manifest['days'])
+        day_template = None
+        for i, key in enumerate(days):
+            previous = days[i - 1] if i > 0 else None
+            following = days[i + 1] if i + 1 < len(days) else None
+            inputs = [key, self.manifest['days'][key]['hash'], previous, following]
+
+            def render_day(key=key, previous=previous, following=following, root='../'):
+                nonlocal day_template
+                day_template = day_template or self.env.get_template('index.html')
+                return day_template.render(
+                    date=key, content=self._load_day(key), previous=previous, next=following, root=root
+                )
+
+            self.write_if_changed(f"days/{key}.html", inputs, render_day)
+            if following is None:
+                self.write_if_changed('index.html', inputs, lambda: render_day(root=''))
+
+        self._build_archive(days)
+        site_assets.compress_outputs(self.output_dir, self.written, self.manifest.setdefault('compressed', {}))
+        self.save_manifest()
+        metrics.count('site_files_written', len(self.written))
+        logging.info(f"Site built: {len(self.written)} files written, {self.skipped} pages unchanged")
+        return self.written
+
+    def _build_archive(self, days):
+        pages = [days[i:i + ARCHIVE_PAGE_SIZE] for i in range(0, len(days), ARCHIVE_PAGE_SIZE)] or [[]]
+        archive_template = None
+        for number, page_days in enumerate(pages, start=1):
+            entries = [{'date': key, 'headline': self.manifest['days'][key]['headline']} for key in reversed(page_days)]
+            newer = f"page-{number + 1}.html" if number < len(pages) else None
+            older = f"page-{number - 1}.html" if number > 1 else None
+            inputs = [entries, newer, older]
+
+            def render_page(entries=entries, newer=newer, older=older):
+                nonlocal archive_template
+                archive_template = archive_template or self.env.get_template('archive.html')
+                return archive_template.render(days=entries, newer=newer, older=older, root='../')
+
+            self.write_if_changed(f"archive/page-{number}.html", inputs, render_page)
+            if number == len(pages):
+                self.write_if_changed('archive/index.html', inputs, render_page)
+
+def load_results(day=None):
+    file_path = os.path.join(artifact_dir(day), 'content_analysis_results.json')
+    try:
+        with open(file_path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        print(f"Error: content_analysis_results.json not found in {artifact_dir(day)}")
+    except json.JSONDecodeError:
+        print(f"Error: Unable to parse {file_path}")
+    return None
+
+def load_trend_changes(day=None):
+    """(rising, falling) trends as of `day` or else the latest day in the trend index."""
+    with TrendIndex() as index:
+        latest = day or index.get_latest_day()
+        if latest is None:
+            return [], []
+        return index.rising(latest), index.falling(latest)
+
+def generate_website(day=None, output_dir=None, publish_day=None):
+    """
+    Add a run's summary to the site and rebuild the pages that changed.
+
+    Args:
+        day (date or str, optional): Date the summary is published under; its
+            results and charts are read from that day's artifact directory.
+            Defaults to the daily run's artifacts in DATA_DIR.
+        output_dir (str, optional): Site directory. Defaults to SITE_DIR, which the
+            deploy workflow fills with the previously published site first.
+        publish_day (date or str, optional): Date the daily run is published under,
+            normally its collection day. Defaults to `day`, else today.
+    """
+    day = parse_day(day)
+    results = load_results(day)
+    if results is None:
+        return None
+
+    builder = SiteBuilder(output_dir)
+    builder.add_day(parse_day(publish_day) or day or date.today(), results, image_dir=artifact_dir(day),
+                    trend_changes=load_trend_changes(day))
+    written = builder.build()
+    print(f"Website generated in {builder.output_dir}: {len(written)} files written, {builder.skipped} unchanged")
+    return written
 
 if __name__ == "__main__":
+    setup_logging()
     generate_website()
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+from collections import Counter
+from datetime import datetime, timedelta
+from config import DATA_DIR, WORDCLOUD_WINDOWS, WORDCLOUD_MAX_WORDS, WORDCLOUD_CACHE_DIR
+from text_preprocessing import tokenize_many
+import metrics
+
+def paper_text(paper):
+    return f"{paper.get('title') or ''} {paper.get('summary') or ''}"
+
+def paper_day(paper):
+    return (paper.get('published') or '')[:10] or datetime.now().strftime('%Y-%m-%d')
+
+def update_term_counts(store):
+    """
+    Fold papers that are new to the store (or newly revised) into its per-day term counts.
+
+    Only those papers are tokenized, in one batch; a revised paper's earlier
+    version is tokenized again so its counts can be subtracted. Returns the
+    number of papers counted.
+    """
+    # Other processes may be counting the same papers; hold the write lock until ours are recorded
+    with store.exclusive():
+        return _update_term_counts(store)
+
+def _update_term_counts(store):
+    pending = store.get_uncounted_papers()
+    if not pending:
+        return 0
+
+    new_papers = [paper for paper, _ in pending]
+    old_papers = [previous for _, previous in pending if previous is not None]
+    tokens = tokenize_many([paper_text(paper) for paper in new_papers + old_papers])
+
+    deltas = {}
+    for paper, paper_tokens in zip(new_papers, tokens):
+        deltas.setdefault(paper_day(paper), Counter()).update(paper_tokens)
+    for paper, paper_tokens in zip(old_papers, tokens[len(new_papers):]):
+        deltas.setdefault(paper_day(paper), Counter()).subtract(paper_tokens)
+
+    store.add_term_counts(deltas, [(paper['id'], paper_day(paper)) for paper in new_papers])
+    logging.info(f"Counted terms for {len(new_papers)} papers ({len(old_papers)} revised)")
+    return len(new_papers)
+
+def window_frequencies(store, end, windows=None):
+    """
+    Term frequencies for each window ending on `end`, e.g. {'daily': Counter, 'weekly': Counter}.
+
+    The stored per-day counters are read once and each window is the
+    previous (shorter) window plus the days it adds, so nothing is
+    re-tokenized and each day is summed only once.
+    """
+    windows = windows or WORDCLOUD_WINDOWS
+    longest = max(windows.values())
+    daily = store.get_daily_term_counts(end - timedelta(days=longest - 1), end)
+
+    frequencies = {}
+    running = Counter()
+    covered = 0
+    for name, days in sorted(windows.items(), key=lambda item: item[1]):
+        for offset in range(covered, days):
+            running.update(daily.get(end - timedelta(days=offset), {}))
+        covered = days
+        frequencies[name] = Counter(running)
+    return frequencies
+
+def top_frequencies(counter, limit=WORDCLOUD_MAX_WORDS):
+    return dict(counter.most_common(limit))
+
+def frequency_hash(frequencies):
+    """Stable hash of a frequency table, used to key rendered clouds."""
+    payload = json.dumps(sorted(frequencies.items()), separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def plan_wordclouds(clouds, chart, cache_dir=None):
+    """
+    Split word clouds into cached ones and ones that still need rendering.
+
+    Args:
+        clouds (dict): {output_path: frequency table}.
+        chart: Module-level function drawing a cloud figure from a frequency table.
+
+    Returns:
+        (jobs, copies): render_charts jobs that write new clouds into the
+        cache, and (cached_path, output_path) pairs to copy once they exist.
+    """
+    cache_dir = cache_dir or os.path.join(DATA_DIR, WORDCLOUD_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    jobs = []
+    copies = []
+    for path, frequencies in clouds.items():
+        cached = os.path.join(cache_dir, f"{frequency_hash(frequencies)}.png")
+        if not os.path.exists(cached) and all(job[2] != cached for job in jobs):
+            jobs.append((chart, (frequencies,), cached))
+        copies.append((cached, path))
+    metrics.count('wordcloud_cache_hits', len(clouds) - len(jobs))
+    metrics.count('wordcloud_cache_misses', len(jobs))
+    logging.info(f"Word clouds: {len(clouds) - len(jobs)} cached, {len(jobs)} to render")
+    return jobs, copies
+
+def publish_wordclouds(copies):
+    """Copy rendered clouds from the cache to their output paths; returns the paths written."""
+    written = []
+    for cached, path in copies:
+        if os.path.exists(cached):
+            shutil.copyfile(cached, path)
+            written.append(path)
+    return written
@@ -0,0 +1,83 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+import tempfile
+import numpy as np
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from abstract_similarity import build_tfidf_matrix, top_k_neighbors, get_neighbor_table, load_related_papers
+from text_preprocessing import FALLBACK_STOPWORDS
+
+ABSTRACTS = [
+    "Diffusion models generate images from noise with denoising steps",
+    "Denoising diffusion models for image generation and editing",
+    "Graph neural networks learn molecular property prediction",
+    "Message passing graph networks predict molecular properties",
+    "Large language models follow instructions after alignment tuning",
+    "Instruction tuning aligns large language models with feedback",
+]
+
+@patch('text_preprocessing._stopwords', FALLBACK_STOPWORDS)
+class TestAbstractSimilarity(unittest.TestCase):
+
+    def test_rows_are_normalized(self):
+        matrix = build_tfidf_matrix(ABSTRACTS, min_df=1)
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        np.testing.assert_allclose(norms, 1, rtol=1e-5)
+
+    def test_hashing_matrix_has_fixed_width(self):
+        matrix = build_tfidf_matrix(ABSTRACTS, n_features=64)
+        self.assertEqual(matrix.shape, (6, 64))
+
+    def test_top_k_matches_dense_and_is_block_independent(self):
+        matrix = build_tfidf_matrix(ABSTRACTS, min_df=1)
+        neighbors, scores = top_k_neighbors(matrix, k=1)
+        self.assertEqual(neighbors[:, 0].tolist(), [1, 0, 3, 2, 5, 4])
+
+        dense = (matrix @ matrix.T).toarray()
+        np.fill_diagonal(dense, -1)
+        np.testing.assert_allclose(scores[:, 0], dense.max(axis=1), rtol=1e-5)
+
+        blocked_neighbors, blocked_scores = top_k_neighbors(matrix, k=3, block_size=2)
+        full_neighbors, full_scores = top_k_neighbors(matrix, k=3, block_size=6)
+        np.testing.assert_array_equal(blocked_neighbors, full_neighbors)
+        np.testing.assert_allclose(blocked_scores, full_scores)
+
+    def test_neighbor_table_is_persisted_and_reused(self):
+        papers = [{'id': f'paper{i}', 'summary': text} for i, text in enumerate(ABSTRACTS)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'neighbors.npz')
+            neighbors, _ = get_neighbor_table(papers, k=2, path=path)
+            with patch('abstract_similarity.build_tfidf_matrix') as mock_build:
+                reused, _ = get_neighbor_table(papers, k=2, path=path)
+                mock_build.assert_not_called()
+            np.testing.assert_array_equal(neighbors, reused)
+            self.assertEqual(neighbors[0][0], 1)
+
+            related = load_related_papers(path)
+            self.assertEqual(sorted(related), [f'paper{i}' for i in range(6)])
+            self.assertEqual(related['paper0'][0][0], 'paper1')
+            self.assertGreater(related['paper0'][0][1], 0)
+        self.assertEqual(load_related_papers(os.path.join(tmp_dir, 'missing.npz')), {})
+
+    def test_small_corpus_still_has_neighbors(self):
+        papers = [
+            {'id': 'a', 'summary': ABSTRACTS[0]},
+            {'id': 'b', 'summary': ABSTRACTS[1]},
+            {'id': 'c', 'summary': ABSTRACTS[2]},
+        ]
+        self.assertGreater(build_tfidf_matrix([paper['summary'] for paper in papers[:2]]).shape[1], 0)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'neighbors.npz')
+            neighbors, scores = get_neighbor_table(papers, k=2, path=path)
+            related = load_related_papers(path)
+        self.assertEqual(neighbors[0][0], 1)
+        self.assertGreater(scores[0][0], 0)
+        self.assertEqual(related['a'][0][0], 'b')
+        self.assertEqual(related['b'][0][0], 'a')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,22 @@
 import unittest
-from unittest.mock import patch, mock_open
+from unittest.mock import patch, mock_open, MagicMock
 from datetime import datetime, timedelta
-import json
+import io
 import sys
 import os
+import tempfile
+import threading
+import urllib3
+import requests
 
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from arxiv_data_collector import get_last_run_date, save_last_run_date, fetch_papers, parse_arxiv_response, save_papers
+from arxiv_data_collector import get_date_range, get_last_run_date, save_last_run_date, fetch_papers, stream_papers, parse_arxiv_response, iter_arxiv_entries, save_papers, fetch_daily_papers, fetch_page, RequestThrottle
+from arxiv_data_collector import main as collector_main
+from paper_store import PaperStore
+from synthetic_data import LocalArxivSession, synthetic_papers
+from paper_files import iter_papers, latest_papers_path
 
 class TestArxivCollector(unittest.TestCase):
 
@@ -31,14 +39,104 @@ class TestArxivCollector(unittest.TestCase):
         save_last_run_date(date)
         mock_file().write.assert_called_once_with('2023-09-16')
 
-    @patch('requests.get')
-    def test_fetch_papers(self, mock_get):
-        mock_response = mock_get.return_value
-        mock_response.text = '<feed xmlns="http://www.w3.org/2005/Atom"></feed>'
+    def test_get_date_range_starts_at_high_water_mark(self):
+        store = MagicMock()
+        store.get_high_water_mark.return_value = datetime.now() - timedelta(days=1)
+        start_date, end_date = get_date_range(store)
+        self.assertEqual(start_date, (datetime.now() - timedelta(days=1)).date())
+
+    def test_get_date_range_empty_store(self):
+        store = MagicMock()
+        store.get_high_water_mark.return_value = None
+        start_date, end_date = get_date_range(store)
+        self.assertEqual(end_date - start_date, timedelta(days=2))
+
+    @patch('arxiv_data_collector.REQUEST_DELAY', 0)
+    @patch('arxiv_data_collector.create_session')
+    def test_fetch_papers(self, mock_create_session):
+        mock_session = mock_create_session.return_value.__enter__.return_value
+        mock_response = mock_session.get.return_value
+        mock_response.__enter__.return_value = mock_response
+        mock_response.raw = io.BytesIO(b'<feed xmlns="http://www.w3.org/2005/Atom"></feed>')
         start_date = datetime(2023, 9, 15).date()
         end_date = datetime(2023, 9, 16).date()
-        result = fetch_papers(start_date, end_date)
+        result, failed = fetch_papers(start_date, end_date)
         self.assertEqual(result, [])
+        self.assertEqual(failed, [])
+
+    @patch('arxiv_data_collector.MAX_RESULTS', 2)
+    @patch('arxiv_data_collector.REQUEST_DELAY', 0)
+    @patch('arxiv_data_collector.create_session')
+    def test_fetch_papers_paginates_and_deduplicates(self, mock_create_session):
+        def feed(ids):
+            entries = ''.join(
+                f'<entry><id>http://arxiv.org/abs/{i}</id><title>T{i}</title><summary>S</summary>'
+                f'<published>2023-09-15T00:00:00Z</published><updated>2023-09-15T00:00:00Z</updated></entry>'
+                for i in ids
+            )
+            return (f'<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+                    f'<opensearch:totalResults>5</opensearch:totalResults>{entries}</feed>').encode()
+
+        pages = {0: feed(['1', '2']), 2: feed(['2', '3']), 4: feed(['4'])}
+
+        def get(url, params, timeout, stream):
+            response = MagicMock()
+            response.__enter__.return_value = response
+            response.raw = io.BytesIO(pages[params['start']])
+            return response
+
+        mock_session = mock_create_session.return_value.__enter__.return_value
+        mock_session.get.side_effect = get
+        result, _ = fetch_papers(datetime(2023, 9, 15).date(), datetime(2023, 9, 16).date())
+        self.assertEqual([paper['title'] for paper in result], ['T1', 'T2', 'T3', 'T4'])
+        self.assertEqual(mock_session.get.call_count, 3)
+
+    @patch('arxiv_data_collector.time.sleep')
+    def test_fetch_page_retries_body_broken_mid_stream(self, mock_sleep):
+        feed = (b'<feed xmlns="http://www.w3.org/2005/Atom"><entry><id>http://arxiv.org/abs/1</id>'
+                b'<title>T1</title></entry></feed>')
+
+        class BrokenStream(io.BytesIO):
+            def read(self, *args):
+                raise urllib3.exceptions.ProtocolError('Connection broken: IncompleteRead')
+
+        responses = []
+        for raw in (BrokenStream(feed[:40]), io.BytesIO(feed)):
+            response = MagicMock()
+            response.__enter__.return_value = response
+            response.raw = raw
+            responses.append(response)
+        session = MagicMock()
+        session.get.side_effect = responses
+
+        total, papers = fetch_page(session, RequestThrottle(0), 'query', 0)
+        self.assertEqual([paper['title'] for paper in papers], ['T1'])
+        self.assertEqual(session.get.call_count, 2)
+        mock_sleep.assert_called_once()
+
+    @patch('arxiv_data_collector.MAX_RESULTS', 2)
+    @patch('arxiv_data_collector.REQUEST_DELAY', 0)
+    @patch('arxiv_data_collector.create_session')
+    def test_stream_papers(self, mock_create_session):
+        corpus = synthetic_papers(30)
+        mock_create_session.side_effect = lambda: LocalArxivSession(corpus)
+        day = datetime(2024, 1, 1).date()
+        papers = list(stream_papers(day, day))
+        self.assertEqual(sorted(paper['id'] for paper in papers), sorted(paper['id'] for paper in corpus))
+
+    @patch('arxiv_data_collector.MAX_RESULTS', 2)
+    @patch('arxiv_data_collector.REQUEST_DELAY', 0)
+    @patch('arxiv_data_collector.create_session')
+    def test_stream_papers_stops_downloading_when_consumer_stops(self, mock_create_session):
+        session = LocalArxivSession(synthetic_papers(30))
+        mock_create_session.return_value = session
+        day = datetime(2024, 1, 1).date()
+        stream = stream_papers(day, day)
+        first = [next(stream) for _ in range(3)]
+        stream.close()
+        self.assertEqual(len({paper['id'] for paper in first}), 3)
+        self.assertFalse(any(thread.name == 'stream-papers' for thread in threading.enumerate()))
+        self.assertEqual(session.requests, 1)
 
     def test_parse_arxiv_response(self):
         xml_string = '''
@@ -58,13 +156,87 @@ class TestArxivCollector(unittest.TestCase):
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0]['title'], 'Test Paper')
 
-    @patch('builtins.open', new_callable=mock_open)
-    @patch('json.dump')
-    def test_save_papers(self, mock_json_dump, mock_file):
+    def test_iter_arxiv_entries_reports_total(self):
+        xml_bytes = (b'<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+                     b'<opensearch:totalResults>2</opensearch:totalResults>'
+                     b'<entry><id>a</id><title>A</title><author><name>X</name></author></entry>'
+                     b'<entry><id>b</id><title>B</title><category term="cs.LG"/></entry></feed>')
+        totals = []
+        papers = list(iter_arxiv_entries(io.BytesIO(xml_bytes), on_total=totals.append))
+        self.assertEqual(totals, [2])
+        self.assertEqual([paper['title'] for paper in papers], ['A', 'B'])
+        self.assertEqual(papers[0]['authors'], ['X'])
+        self.assertEqual(papers[1]['categories'], ['cs.LG'])
+
+    @patch('arxiv_data_collector.write_papers')
+    def test_save_papers(self, mock_write_papers):
         papers = [{'title': 'Test Paper'}]
-        date = datetime(2023, 9, 16).date()
-        save_papers(papers, date)
-        mock_json_dump.assert_called_once()
+        save_papers(papers)
+        mock_write_papers.assert_called_once_with(papers, latest_papers_path())
+
+    @patch('arxiv_data_collector.PaperStore')
+    @patch('arxiv_data_collector.fetch_papers')
+    def test_fetch_daily_papers_for_a_date(self, mock_fetch_papers, mock_store):
+        mock_fetch_papers.return_value = ([{'title': 'Test Paper'}], [])
+        papers = fetch_daily_papers('2023-09-15')
+        day = datetime(2023, 9, 15).date()
+        mock_fetch_papers.assert_called_once_with(day, day)
+        mock_store.return_value.__enter__.return_value.upsert_papers.assert_called_once_with(
+            papers, advance_high_water_mark=True
+        )
+
+    @patch('arxiv_data_collector.PaperStore')
+    @patch('arxiv_data_collector.fetch_papers')
+    def test_fetch_daily_papers_with_failed_pages(self, mock_fetch_papers, mock_store):
+        papers = [{'title': 'Test Paper'}]
+        mock_fetch_papers.return_value = (papers, [1000])
+        with self.assertRaises(RuntimeError):
+            fetch_daily_papers('2023-09-15')
+        mock_store.return_value.__enter__.return_value.upsert_papers.assert_called_once_with(
+            papers, advance_high_water_mark=False
+        )
+
+    @patch('arxiv_data_collector.PAGE_RETRIES', 1)
+    @patch('arxiv_data_collector.MAX_RESULTS', 10)
+    @patch('arxiv_data_collector.REQUEST_DELAY', 0)
+    @patch('arxiv_data_collector.save_papers')
+    def test_failed_page_is_fetched_again_by_the_next_run(self, mock_save_papers):
+        start, _ = get_date_range()
+        corpus = synthetic_papers(25, papers_per_day=25, start=datetime.combine(start, datetime.min.time()))
+
+        class FlakySession(LocalArxivSession):
+            fail = {10}
+
+            def get(self, url, params=None, **kwargs):
+                if int(params['start']) in self.fail:
+                    self.fail.discard(int(params['start']))
+                    raise requests.exceptions.ConnectionError('Connection reset')
+                return super().get(url, params={**params, 'max_results': 10}, **kwargs)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                patch('arxiv_data_collector.DATA_DIR', tmp_dir), \
+                patch('arxiv_data_collector.LOG_FILE', os.path.join(tmp_dir, 'arxiv_collector.log')), \
+                patch('arxiv_data_collector.PaperStore', lambda: PaperStore(os.path.join(tmp_dir, 'papers.db'))), \
+                patch('arxiv_data_collector.create_session', lambda: FlakySession(corpus)):
+            collector_main()
+            with PaperStore(os.path.join(tmp_dir, 'papers.db')) as store:
+                self.assertEqual(len(store.get_papers()), 15)
+                self.assertIsNone(store.get_high_water_mark())
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, 'last_update.txt')))
+
+            collector_main()
+            with PaperStore(os.path.join(tmp_dir, 'papers.db')) as store:
+                self.assertEqual(len(store.get_papers()), 25)
+                self.assertIsNotNone(store.get_high_water_mark())
+            self.assertTrue(os.path.exists(os.path.join(tmp_dir, 'last_update.txt')))
+            with open(os.path.join(tmp_dir, 'arxiv_collector.log')) as f:
+                self.assertIn('pages could not be fetched', f.read())
+
+    def test_save_papers_for_a_date(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, patch('config.DAYS_DIR', tmp_dir):
+            save_papers([{'title': 'Test Paper'}], '2023-09-15')
+            path = os.path.join(tmp_dir, '2023-09-15', 'latest_papers.jsonl')
+            self.assertEqual(list(iter_papers(path)), [{'title': 'Test Paper'}])
 
 if __name__ == '__main__':
     unittest.main()
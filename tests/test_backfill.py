@@ -0,0 +1,91 @@
+import unittest
+import os
+import sys
+import tempfile
+from concurrent.futures import Executor
+from datetime import date
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import backfill
+from backfill import days_between
+from trend_index import TrendIndex
+
+class InlineExecutor(Executor):
+    """Runs the pool's work in-process so the stage functions can be patched."""
+
+    def __init__(self, max_workers=None, initializer=None, initargs=()):
+        self.max_workers = max_workers
+
+    def map(self, fn, *iterables):
+        return map(fn, *iterables)
+
+class TestBackfill(unittest.TestCase):
+    def test_days_between(self):
+        self.assertEqual(days_between('2024-09-09', '2024-09-11'),
+                         [date(2024, 9, 9), date(2024, 9, 10), date(2024, 9, 11)])
+        with self.assertRaises(ValueError):
+            days_between('2024-09-11', '2024-09-09')
+
+    @patch('backfill.publish_days')
+    @patch('backfill.has_papers')
+    @patch('backfill.run_day_stage')
+    @patch('backfill.ProcessPoolExecutor', InlineExecutor)
+    def test_stages_run_across_days_and_failures_drop_out(self, mock_run, mock_has_papers, mock_publish):
+        weekend = date(2024, 9, 8)
+        broken = date(2024, 9, 9)
+        mock_has_papers.side_effect = lambda day: day != weekend
+        mock_run.side_effect = lambda day, stage: 'failed at analyze: boom' if (day, stage) == (broken, 'analyze') else 'ran'
+
+        outcomes = backfill.backfill('2024-09-08', '2024-09-10', processes=2)
+
+        self.assertEqual(outcomes, {
+            '2024-09-08': 'no papers',
+            '2024-09-09': 'failed at analyze: boom',
+            '2024-09-10': 'done',
+        })
+        stages = [call.args for call in mock_run.call_args_list]
+        self.assertEqual(stages, [
+            (weekend, 'collect'), (broken, 'collect'), (date(2024, 9, 10), 'collect'),
+            (broken, 'analyze'), (date(2024, 9, 10), 'analyze'),
+            (date(2024, 9, 10), 'visualize'),
+        ])
+        mock_publish.assert_called_once_with([date(2024, 9, 10)])
+
+    def test_published_days_list_their_trend_changes(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with TrendIndex(os.path.join(tmp_dir, 'trends.db')) as index:
+                index.record_day(date(2024, 9, 3), '1. **Agents**: planning')
+                index.record_day(date(2024, 9, 10), '1. **Agents**: planning',
+                                 [{'title': 'Agents that plan'}, {'title': 'Agents for code'}])
+            output_dir = os.path.join(tmp_dir, 'output')
+            results = {'summary': 'Agents planned.', 'top_articles': '', 'trends': '1. **Agents**: planning'}
+            with patch('website_generator.TrendIndex', lambda: TrendIndex(os.path.join(tmp_dir, 'trends.db'))), \
+                    patch('website_generator.load_results', return_value=results), \
+                    patch('website_generator.SITE_DIR', output_dir), \
+                    patch('website_generator.DATA_DIR', tmp_dir), \
+                    patch('backfill.artifact_dir', return_value=tmp_dir):
+                backfill.publish_days([date(2024, 9, 10)])
+            with open(os.path.join(output_dir, 'days', '2024-09-10.html'), 'r') as f:
+                page = f.read()
+        self.assertIn('Rising this week', page)
+        self.assertIn('<li>Agents: 1 &rarr; 2</li>', page)
+
+    def test_shared_limits(self):
+        limits = backfill.create_shared_limits()
+        import arxiv_data_collector
+        from arxiv_data_collector import RequestThrottle
+        try:
+            backfill._init_worker(limits)
+            throttle = RequestThrottle(delay=5)
+            with patch('time.sleep'):
+                throttle.wait()
+            self.assertGreater(limits['arxiv_slot'].value, 0)
+        finally:
+            arxiv_data_collector.share_request_throttle(None)
+            import llm_client
+            llm_client.share_rate_limits(None, None)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import benchmark
+from benchmark import compare_results, run_benchmarks, save_results, main
+
+def results(**timings):
+    return {'results': {name: {'1000': {'seconds': seconds}} for name, seconds in timings.items()}}
+
+class TestBenchmark(unittest.TestCase):
+    def test_compare_flags_regressions_beyond_threshold_and_noise(self):
+        baseline = results(parse=1.0, layout=2.0, format=0.001, site=1.0)
+        current = results(parse=1.1, layout=3.0, format=0.004, site=0.5, new=1.0)
+        rows = {row[0]: row for row in compare_results(baseline, current, threshold=0.25, min_seconds=0.01)}
+        self.assertEqual(rows['parse'][-1], 'ok')
+        self.assertEqual(rows['layout'][-1], 'regression')
+        self.assertAlmostEqual(rows['layout'][4], 1.5)
+        # 4x slower, but by less than the noise floor
+        self.assertEqual(rows['format'][-1], 'ok')
+        self.assertEqual(rows['site'][-1], 'improved')
+        self.assertNotIn('new', rows)
+
+    def test_run_respects_max_size_and_saves(self):
+        document = run_benchmarks(sizes=[20, 40], names=['parse_arxiv_response', 'format_papers'], repeat=1)
+        self.assertEqual(sorted(document['results']['parse_arxiv_response']), ['20', '40'])
+        result = document['results']['format_papers']['20']
+        self.assertEqual(result['repeat'], 1)
+        self.assertGreater(result['seconds'], 0)
+
+        with patch.dict(benchmark.BENCHMARKS, {'small': (benchmark.bench_format_papers, 20)}):
+            document = run_benchmarks(sizes=[20, 40], names=['small'], repeat=1)
+        self.assertEqual(list(document['results']['small']), ['20'])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = save_results(document, os.path.join(tmp_dir, 'bench.json'))
+            with open(path) as f:
+                self.assertEqual(json.load(f)['results'], document['results'])
+
+    def test_local_analysis_restores_content_analysis(self):
+        import content_analysis
+        saved = content_analysis.PaperStore
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with self.assertRaises(RuntimeError):
+                with benchmark.local_analysis(tmp_dir) as patched:
+                    self.assertIsNot(patched.PaperStore, saved)
+                    raise RuntimeError
+        self.assertIs(content_analysis.PaperStore, saved)
+
+    def test_unknown_benchmark(self):
+        with self.assertRaises(ValueError):
+            run_benchmarks(sizes=[10], names=['nope'])
+
+    def test_compare_command_exit_status(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline = os.path.join(tmp_dir, 'baseline.json')
+            current = os.path.join(tmp_dir, 'current.json')
+            save_results(results(parse=1.0), baseline)
+            save_results(results(parse=2.0), current)
+            with patch('builtins.print'):
+                self.assertEqual(main(['compare', baseline, current]), 1)
+                self.assertEqual(main(['compare', baseline, baseline]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
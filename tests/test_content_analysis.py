@@ -1,13 +1,14 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 import sys
 import os
-import json
+import tempfile
 
 # Add the src directory to the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from content_analysis import load_papers, save_results, run_content_analysis, paper_analyzer_agent, trend_spotter_agent, summary_writer_agent, article_selector_agent
+from paper_files import write_papers
+from content_analysis import load_papers, save_results, run_content_analysis, paper_analyzer_agent, trend_spotter_agent, summary_writer_agent, article_selector_agent, chunk_papers, reduce_analyses, parse_paper_analyses
 
 class TestContentAnalysis(unittest.TestCase):
 
@@ -17,12 +18,13 @@ class TestContentAnalysis(unittest.TestCase):
             {"title": "Test Paper 2", "summary": "This is a test summary 2"}
         ]
 
-    @patch('os.path.exists')
-    @patch('builtins.open', new_callable=unittest.mock.mock_open, read_data=json.dumps([{"title": "Test Paper"}]))
-    def test_load_papers(self, mock_file, mock_exists):
-        mock_exists.return_value = True
-        result = load_papers()
-        self.assertEqual(result, [{"title": "Test Paper"}])
+    def test_load_papers(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, patch('config.DAYS_DIR', tmp_dir):
+            self.assertIsNone(load_papers('2024-09-10'))
+            write_papers(self.test_papers, os.path.join(tmp_dir, '2024-09-10', 'latest_papers.jsonl'))
+            self.assertEqual(load_papers('2024-09-10'), self.test_papers)
+            self.assertEqual(load_papers('2024-09-10', columns=['title']),
+                             [{"title": "Test Paper 1"}, {"title": "Test Paper 2"}])
 
     @patch('builtins.open', new_callable=unittest.mock.mock_open)
     @patch('json.dump')
@@ -37,7 +39,8 @@ class TestContentAnalysis(unittest.TestCase):
     @patch('content_analysis.summary_writer_agent')
     @patch('content_analysis.article_selector_agent')
     @patch('content_analysis.save_results')
-    def test_run_content_analysis(self, mock_save_results, mock_article_selector, 
+    @patch('content_analysis.record_trends')
+    def test_run_content_analysis(self, mock_record_trends, mock_save_results, mock_article_selector, 
                                   mock_summary_writer, mock_trend_spotter, 
                                   mock_paper_analyzer, mock_load_papers):
         mock_load_papers.return_value = self.test_papers
@@ -58,15 +61,25 @@ class TestContentAnalysis(unittest.TestCase):
             "trends": "Trends",
             "summary": "Summary",
             "top_articles": "Top Articles"
-        })
+        }, None)
+        mock_record_trends.assert_called_once_with("Trends", self.test_papers, None)
 
     @patch('content_analysis.generic_agent')
-    def test_paper_analyzer_agent(self, mock_generic_agent):
+    @patch('content_analysis.PaperStore')
+    def test_paper_analyzer_agent(self, mock_store_class, mock_generic_agent):
+        mock_store_class.return_value.__enter__.return_value.get_analyses.return_value = {}
         mock_generic_agent.return_value = "Analysis"
         result = paper_analyzer_agent(self.test_papers)
         self.assertEqual(result, "Analysis")
         mock_generic_agent.assert_called_once()
 
+    @patch('content_analysis.PaperStore')
+    @patch('content_analysis.generic_agent')
+    def test_paper_analyzer_agent_without_papers(self, mock_generic_agent, mock_store_class):
+        mock_generic_agent.return_value = "Analysis"
+        self.assertEqual(paper_analyzer_agent(None), "Analysis")
+        mock_store_class.assert_not_called()
+
     @patch('content_analysis.generic_agent')
     def test_trend_spotter_agent(self, mock_generic_agent):
         mock_generic_agent.return_value = "Trends"
@@ -88,5 +101,56 @@ class TestContentAnalysis(unittest.TestCase):
         self.assertEqual(result, "Top Articles")
         mock_generic_agent.assert_called_once()
 
+    def test_chunk_papers(self):
+        papers = [{"title": f"Paper {i}", "summary": "x" * 400} for i in range(10)]
+        batches = chunk_papers(papers, token_budget=300)
+        self.assertEqual(len(batches), 5)
+        self.assertEqual([paper for batch in batches for paper in batch], papers)
+        self.assertEqual(chunk_papers(papers, token_budget=100000), [papers])
+
+    @patch('content_analysis.ANALYSIS_BATCH_TOKENS', 300)
+    @patch('content_analysis.PaperStore')
+    @patch('content_analysis.generic_agent')
+    def test_paper_analyzer_agent_batches(self, mock_generic_agent, mock_store_class):
+        mock_store_class.return_value.__enter__.return_value.get_analyses.return_value = {}
+        papers = [{"title": f"Paper {i}", "summary": "x" * 400} for i in range(10)]
+        mock_generic_agent.side_effect = lambda template, papers=None, **kwargs: f"Analysis of {len(papers)}"
+        result = paper_analyzer_agent(papers)
+        self.assertEqual(mock_generic_agent.call_count, 5)
+        self.assertEqual(result, "\n\n".join(["Analysis of 2"] * 5))
+
+    @patch('content_analysis.generic_agent')
+    def test_reduce_analyses_condenses_when_over_budget(self, mock_generic_agent):
+        mock_generic_agent.return_value = "Condensed"
+        self.assertEqual(reduce_analyses(["a", "b"], token_budget=100), "a\n\nb")
+        mock_generic_agent.assert_not_called()
+        result = reduce_analyses(["x" * 800] * 3, token_budget=300)
+        self.assertEqual(mock_generic_agent.call_count, 3)
+        self.assertEqual(result, "\n\n".join(["Condensed"] * 3))
+
+    def test_parse_paper_analyses(self):
+        response = "[2409.00001v1] First paper.\nMore detail.\n\n2. **[2409.00002]** Second paper."
+        self.assertEqual(parse_paper_analyses(response), {
+            "2409.00001v1": "First paper. More detail.",
+            "2409.00002": "Second paper."
+        })
+
+    @patch('content_analysis.PaperStore')
+    @patch('content_analysis.generic_agent')
+    def test_paper_analyzer_agent_reuses_stored_analyses(self, mock_generic_agent, mock_store_class):
+        papers = [
+            {"id": "http://arxiv.org/abs/2409.00001v1", "title": "Old Paper"},
+            {"id": "http://arxiv.org/abs/2409.00002v2", "title": "New Paper"}
+        ]
+        store = mock_store_class.return_value.__enter__.return_value
+        store.get_analyses.return_value = {"http://arxiv.org/abs/2409.00001v1": "Stored analysis."}
+        mock_generic_agent.return_value = "[2409.00002] Fresh analysis."
+
+        result = paper_analyzer_agent(papers)
+
+        self.assertEqual(mock_generic_agent.call_args.kwargs["papers"], [papers[1]])
+        store.save_analyses.assert_called_once_with({"http://arxiv.org/abs/2409.00002v2": "Fresh analysis."}, unittest.mock.ANY)
+        self.assertEqual(result, "[2409.00001v1] Stored analysis.\n\n[2409.00002v2] Fresh analysis.")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
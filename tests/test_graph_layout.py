@@ -0,0 +1,88 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import graph_layout
+from graph_layout import graph_hash, layout_graph, grid_force_layout, seed_positions, load_positions
+
+def paper_graph(ids, edges):
+    G = nx.Graph()
+    for i, paper_id in enumerate(ids):
+        G.add_node(i, paper_id=paper_id)
+    G.add_edges_from(edges)
+    return G
+
+class TestGraphLayout(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.positions = os.path.join(self.tmpdir.name, 'positions.json')
+        self.cache = os.path.join(self.tmpdir.name, 'cache')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def layout(self, G):
+        return layout_graph(G, positions_path=self.positions, cache_dir=self.cache)
+
+    def test_graph_hash_ignores_node_order(self):
+        first = paper_graph(['a', 'b', 'c'], [(0, 1), (1, 2)])
+        second = paper_graph(['c', 'b', 'a'], [(0, 1), (1, 2)])
+        self.assertEqual(graph_hash(first), graph_hash(second))
+        self.assertNotEqual(graph_hash(first), graph_hash(paper_graph(['a', 'b', 'c'], [(0, 1)])))
+
+    def test_positions_persist_by_paper_id(self):
+        self.layout(paper_graph(['a', 'b', 'c'], [(0, 1), (1, 2)]))
+        stored = load_positions(self.positions)
+        self.assertEqual(set(stored), {'a', 'b', 'c'})
+
+        # Next day: same papers at different node indices plus a new one
+        G = paper_graph(['d', 'c', 'b', 'a'], [(0, 1), (1, 2), (2, 3)])
+        with patch.object(graph_layout.nx, 'spring_layout', wraps=nx.spring_layout) as spring:
+            self.layout(G)
+        self.assertEqual(spring.call_args.kwargs['iterations'], graph_layout.LAYOUT_REFINE_ITERATIONS)
+        initial = spring.call_args.kwargs['pos']
+        np.testing.assert_allclose(initial[3], stored['a'])
+        # The new paper starts next to its only neighbour
+        self.assertLess(np.linalg.norm(initial[0] - initial[1]), 0.2)
+
+    def test_persisted_positions_are_bounded(self):
+        with patch.object(graph_layout, 'LAYOUT_POSITIONS_RECENT', 2):
+            for day in range(3):
+                ids = [f"{day}-{i}" for i in range(3)]
+                self.layout(paper_graph(ids, [(0, 1), (1, 2)]))
+        # Today's papers, then the two most recent ones that dropped out
+        self.assertEqual(list(load_positions(self.positions)), ['1-1', '1-2', '2-0', '2-1', '2-2'])
+
+    def test_identical_graph_uses_cache(self):
+        G = paper_graph(['a', 'b', 'c'], [(0, 1)])
+        first = self.layout(G)
+        with patch.object(graph_layout.nx, 'spring_layout') as spring:
+            second = self.layout(G)
+        spring.assert_not_called()
+        for node in G.nodes:
+            np.testing.assert_allclose(first[node], second[node], atol=1e-5)
+
+    def test_large_graphs_use_grid_layout(self):
+        G = paper_graph([str(i) for i in range(30)], [(i, i + 1) for i in range(29)])
+        with patch.object(graph_layout, 'LAYOUT_GRID_THRESHOLD', 10), \
+             patch.object(graph_layout.nx, 'spring_layout') as spring:
+            pos = self.layout(G)
+        spring.assert_not_called()
+        self.assertEqual(len(pos), 30)
+        self.assertLessEqual(max(np.abs(xy).max() for xy in pos.values()), 1.0 + 1e-9)
+
+    def test_grid_force_layout_pulls_neighbours_together(self):
+        G = paper_graph([str(i) for i in range(40)], [(0, 1)])
+        keys = {node: str(node) for node in G.nodes}
+        pos = grid_force_layout(G, seed_positions(G, keys, {}), iterations=50)
+        distances = [np.linalg.norm(pos[0] - pos[j]) for j in range(2, 40)]
+        self.assertLess(np.linalg.norm(pos[0] - pos[1]), np.median(distances))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from llm_backends import LocalBackend, LocalBackendError, GeminiBackend, get_backend
+
+class TestLocalBackend(unittest.TestCase):
+
+    def test_responses_are_deterministic(self):
+        prompt = "Identify the top trends in transformers, diffusion and transformers"
+        self.assertEqual(LocalBackend('instant').generate(prompt), LocalBackend('instant').generate(prompt))
+        self.assertTrue(LocalBackend('instant').generate(prompt).startswith("1. Transformers"))
+
+    def test_tagged_entries_get_one_line_each(self):
+        prompt = "Analyze:\n\n[2409.00001v1] First Paper\nAbstract\n\n[2409.00002v1] Second Paper"
+        lines = LocalBackend('instant').generate(prompt).splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("[2409.00001v1] First Paper"))
+
+    def test_latency_profile(self):
+        sleep = MagicMock()
+        backend = LocalBackend({'latency': 0.5, 'tokens_per_second': None, 'error_rate': 0.0,
+                                'max_concurrency': None}, sleep=sleep)
+        backend.generate("prompt")
+        sleep.assert_called_once_with(0.5)
+
+    def test_error_rate(self):
+        backend = LocalBackend('instant', error_rate=1.0)
+        with self.assertRaises(LocalBackendError) as context:
+            backend.generate("prompt")
+        self.assertEqual(context.exception.code, 503)
+
+    def test_concurrency_quota(self):
+        backend = LocalBackend('instant', max_concurrency=0)
+        with self.assertRaises(LocalBackendError) as context:
+            backend.generate("prompt")
+        self.assertEqual(context.exception.code, 429)
+
+    def test_get_backend(self):
+        self.assertIsInstance(get_backend('local'), LocalBackend)
+        with self.assertRaises(ValueError):
+            get_backend('unknown')
+        backend = GeminiBackend(api_key=None)
+        with self.assertRaises(ValueError):
+            backend.generate("prompt")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sys
+import os
+import tempfile
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from llm_cache import ResponseCache, make_cache_key
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, 'llm_cache.db')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_make_cache_key(self):
+        key = make_cache_key('model', 'system', 'prompt')
+        self.assertEqual(key, make_cache_key('model', 'system', 'prompt'))
+        self.assertNotEqual(key, make_cache_key('other-model', 'system', 'prompt'))
+        self.assertNotEqual(make_cache_key('model', 'ab', 'c'), make_cache_key('model', 'a', 'bc'))
+
+    def test_get_or_generate_hits_after_first_call(self):
+        cache = ResponseCache(self.path)
+        generate = MagicMock(return_value="Analysis")
+        self.assertEqual(cache.get_or_generate('model', None, 'prompt', generate), "Analysis")
+        self.assertEqual(cache.get_or_generate('model', None, 'prompt', generate), "Analysis")
+        generate.assert_called_once()
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        cache.close()
+
+    def test_disabled_cache_always_generates(self):
+        cache = ResponseCache(self.path, enabled=False)
+        generate = MagicMock(return_value="Analysis")
+        cache.get_or_generate('model', None, 'prompt', generate)
+        cache.get_or_generate('model', None, 'prompt', generate)
+        self.assertEqual(generate.call_count, 2)
+
+    @patch('llm_cache.time.time')
+    def test_expired_entries_miss(self, mock_time):
+        cache = ResponseCache(self.path, ttl=60)
+        mock_time.return_value = 1000
+        cache.set('key', 'value')
+        mock_time.return_value = 1030
+        self.assertEqual(cache.get('key'), 'value')
+        mock_time.return_value = 1061
+        self.assertIsNone(cache.get('key'))
+        cache.close()
+
+    @patch('llm_cache.time.time')
+    def test_evicts_least_recently_used(self, mock_time):
+        cache = ResponseCache(self.path, max_bytes=10)
+        mock_time.return_value = 1
+        cache.set('a', 'aaaa')
+        mock_time.return_value = 2
+        cache.set('b', 'bbbb')
+        mock_time.return_value = 3
+        cache.get('a')
+        mock_time.return_value = 4
+        cache.set('c', 'cccc')
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 'aaaa')
+        self.assertEqual(cache.get('c'), 'cccc')
+        cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
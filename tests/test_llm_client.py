@@ -0,0 +1,100 @@
+import unittest
+import multiprocessing
+from unittest.mock import MagicMock
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from llm_client import LLMClient, TokenBucket, AIMDLimiter, is_retryable, is_throttled
+
+class ApiError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP {code}")
+        self.code = code
+
+def _take_from_shared_bucket(state):
+    # One second after the parent drained the bucket, exactly one token has refilled
+    bucket = TokenBucket(capacity=2, rate=1, clock=lambda: 1.0, sleep=lambda seconds: sys.exit(1), shared=state)
+    bucket.acquire()
+
+class TestLLMClient(unittest.TestCase):
+
+    def make_client(self, generate, **kwargs):
+        self.sleep = MagicMock()
+        return LLMClient(generate, requests_per_minute=600, tokens_per_minute=100000,
+                         max_concurrency=4, max_retries=3, sleep=self.sleep, **kwargs)
+
+    def test_error_classification(self):
+        self.assertTrue(is_retryable(ApiError(429)))
+        self.assertTrue(is_throttled(ApiError(429)))
+        self.assertTrue(is_retryable(ApiError(503)))
+        self.assertTrue(is_retryable(TimeoutError()))
+        self.assertFalse(is_retryable(ApiError(400)))
+        self.assertFalse(is_retryable(ValueError()))
+
+    def test_retries_then_succeeds(self):
+        generate = MagicMock(side_effect=[ApiError(429), ApiError(503), "ok"])
+        client = self.make_client(generate)
+        self.assertEqual(client.generate("prompt"), "ok")
+        self.assertEqual(generate.call_count, 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        stats = client.stats()
+        self.assertEqual(stats['retries'], 2)
+        self.assertEqual(stats['throttled'], 1)
+        self.assertEqual(stats['successes'], 1)
+
+    def test_gives_up_after_max_retries(self):
+        generate = MagicMock(side_effect=ApiError(503))
+        client = self.make_client(generate)
+        with self.assertRaises(ApiError):
+            client.generate("prompt")
+        self.assertEqual(generate.call_count, 3)
+        self.assertEqual(client.stats()['failures'], 1)
+
+    def test_non_retryable_error_raises_immediately(self):
+        generate = MagicMock(side_effect=ApiError(400))
+        client = self.make_client(generate)
+        with self.assertRaises(ApiError):
+            client.generate("prompt")
+        generate.assert_called_once()
+
+    def test_token_bucket_waits_for_refill(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        bucket = TokenBucket(capacity=2, rate=1, clock=lambda: now[0], sleep=sleep)
+        bucket.acquire()
+        bucket.acquire()
+        bucket.acquire()
+        self.assertEqual(sleeps, [1.0])
+
+    def test_shared_token_bucket_spans_processes(self):
+        now = [0.0]
+        state = multiprocessing.Array('d', [2, 0.0])
+        first = TokenBucket(capacity=2, rate=1, clock=lambda: now[0], shared=state)
+        first.acquire(2)
+
+        # Another process drawing from the same state takes the refilled token, and the parent sees it gone
+        child = multiprocessing.Process(target=_take_from_shared_bucket, args=(state,))
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertEqual((state[0], state[1]), (0, 1.0))
+
+    def test_aimd_limiter(self):
+        limiter = AIMDLimiter(max_limit=8)
+        limiter.acquire()
+        limiter.release(throttled=True)
+        self.assertEqual(limiter.limit, 4)
+        limiter.acquire()
+        limiter.release()
+        self.assertEqual(limiter.limit, 4.25)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import metrics
+from metrics import RunMetrics, SamplingProfiler, cache_hit_rates
+from stage_runner import Stage, StageRunner, StageFailed
+
+def busy_loop(seconds):
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += 1
+    return total
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def test_count_without_a_run_is_a_no_op(self):
+        metrics.count('http_requests')
+        self.assertIsNone(metrics._active)
+
+    def test_counters_are_attributed_to_the_running_stage(self):
+        with RunMetrics(output_dir=self.tmp_dir.name) as run:
+            metrics.count('http_requests')
+            with run.stage('collect'):
+                metrics.count('http_requests', 2)
+                metrics.count('http_bytes', 1024)
+            with run.stage('analyze'):
+                metrics.count('llm_cache_hits', 3)
+                metrics.count('llm_cache_misses')
+                with metrics.timed('agent'):
+                    pass
+        self.assertIsNone(metrics._active)
+
+        record = run.record()
+        self.assertTrue(record['success'])
+        self.assertEqual(record['stages']['collect']['counters'], {'http_requests': 2, 'http_bytes': 1024})
+        self.assertEqual(record['stages']['analyze']['cache_hit_rates'], {'llm': 0.75})
+        self.assertIn('agent_seconds', record['stages']['analyze']['counters'])
+        self.assertEqual(record['counters']['http_requests'], 3)
+        for field in ('wall_seconds', 'cpu_seconds', 'child_cpu_seconds', 'peak_rss_mb'):
+            self.assertIn(field, record['stages']['collect'])
+
+    def test_failed_stage(self):
+        with RunMetrics(output_dir=self.tmp_dir.name) as run:
+            with self.assertRaises(RuntimeError):
+                with run.stage('analyze'):
+                    raise RuntimeError('boom')
+        self.assertEqual(run.stages['analyze']['status'], 'failed')
+
+    def test_cache_hit_rates(self):
+        self.assertEqual(cache_hit_rates({'layout_cache_hits': 0, 'layout_cache_misses': 2}), {'layout': 0.0})
+        self.assertEqual(cache_hit_rates({'wordcloud_cache_hits': 2}), {'wordcloud': 1.0})
+
+    def test_save_writes_record_and_textfile(self):
+        with RunMetrics(labels={'day': 'daily'}, output_dir=self.tmp_dir.name) as run:
+            with run.stage('collect'):
+                metrics.count('http_requests', 2)
+            run.skipped('analyze')
+        json_path = run.save()
+
+        with open(json_path) as f:
+            self.assertEqual(json.load(f)['stages']['analyze'], {'status': 'skipped'})
+        with open(os.path.join(self.tmp_dir.name, 'pipeline.prom')) as f:
+            text = f.read()
+        self.assertIn('# TYPE arxiv_pipeline_stage_wall_seconds gauge', text)
+        self.assertIn('arxiv_pipeline_stage_http_requests{stage="collect"} 2', text)
+        self.assertIn('arxiv_pipeline_stage_ran{stage="analyze"} 0', text)
+        self.assertIn('arxiv_pipeline_last_run_success 1', text)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'pipeline.prom.tmp')))
+
+    def test_sampling_profiler(self):
+        profiler = SamplingProfiler(interval=0.001)
+        profiler.start()
+        busy_loop(0.1)
+        profiler.stop()
+        self.assertTrue(any('busy_loop' in stack for stack in profiler.samples))
+
+        path = os.path.join(self.tmp_dir.name, 'profile.txt')
+        profiler.save(path)
+        with open(path) as f:
+            stack, samples = f.readline().rsplit(' ', 1)
+        self.assertTrue(stack.startswith('MainThread;'))
+        self.assertGreater(int(samples), 0)
+
+    def test_stage_runner_records_stages(self):
+        output = os.path.join(self.tmp_dir.name, 'out.txt')
+
+        def write_output():
+            metrics.count('site_files_written')
+            with open(output, 'w') as f:
+                f.write('ok')
+
+        stages = [Stage('website', write_output, outputs=[output])]
+        manifest = os.path.join(self.tmp_dir.name, 'manifest.json')
+        with RunMetrics(output_dir=self.tmp_dir.name, profile=['website']) as run:
+            StageRunner(stages, manifest, run).run()
+        self.assertEqual(run.stages['website']['counters'], {'site_files_written': 1})
+        self.assertTrue(any(name.startswith('profile-') for name in os.listdir(self.tmp_dir.name)))
+
+        with RunMetrics(output_dir=self.tmp_dir.name) as run:
+            StageRunner(stages, manifest, run).run()
+        self.assertEqual(run.stages['website'], {'status': 'skipped'})
+
+        with RunMetrics(output_dir=self.tmp_dir.name) as run:
+            with self.assertRaises(StageFailed):
+                broken = [Stage('website', lambda: None, outputs=[output + '.missing'])]
+                StageRunner(broken, manifest + '.broken', run).run()
+        # The stage itself ran; the runner failed it afterwards for its missing output
+        self.assertEqual(run.stages['website']['status'], 'ran')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from paper_files import (
+    PAPERS_FILE_NAMES, ColumnarPapers, count_papers, find_latest_papers, iter_papers, papers_format,
+    read_columns, write_papers
+)
+
+PAPERS = [
+    {'id': 'http://arxiv.org/abs/2409.00001v1', 'title': 'Sparse attention', 'summary': 'We study sparsity.',
+     'authors': ['Ana Costa', 'Wei Li'], 'categories': ['cs.LG'], 'published': '2024-09-10T00:00:00Z'},
+    {'id': 'http://arxiv.org/abs/2409.00002v2', 'title': 'Über robust agents', 'summary': None,
+     'authors': [], 'categories': ['cs.AI', 'cs.CL'], 'published': '2024-09-10T01:00:00Z'},
+]
+
+class TestPaperFiles(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def path(self, fmt):
+        return os.path.join(self.tmp_dir.name, PAPERS_FILE_NAMES[fmt])
+
+    def test_round_trip_in_every_format(self):
+        for fmt in PAPERS_FILE_NAMES:
+            with self.subTest(fmt=fmt):
+                path = self.path(fmt)
+                self.assertEqual(write_papers(iter(PAPERS), path), 2)
+                self.assertEqual(list(iter_papers(path)), PAPERS)
+                self.assertEqual(count_papers(path), 2)
+                self.assertFalse(os.path.exists(path + '.tmp'))
+
+    def test_projection(self):
+        for fmt in PAPERS_FILE_NAMES:
+            with self.subTest(fmt=fmt):
+                path = self.path(fmt)
+                write_papers(PAPERS, path)
+                self.assertEqual(list(iter_papers(path, ['title'])),
+                                 [{'title': 'Sparse attention'}, {'title': 'Über robust agents'}])
+                self.assertEqual(read_columns(path, ['summary', 'authors']), {
+                    'summary': ['We study sparsity.', None],
+                    'authors': [['Ana Costa', 'Wei Li'], []],
+                })
+
+    def test_columnar_random_access_and_missing_columns(self):
+        path = self.path('columnar')
+        write_papers(PAPERS, path)
+        with ColumnarPapers(path) as table:
+            self.assertEqual(len(table), 2)
+            self.assertEqual(table.column('title')[1], 'Über robust agents')
+            self.assertEqual(table.column('categories')[1], ['cs.AI', 'cs.CL'])
+            self.assertEqual(table.columns['title']['kind'], 'str')
+            self.assertEqual(table.columns['summary']['kind'], 'json')
+            self.assertEqual(list(table.column('updated')), [None, None])
+
+    def test_empty_columnar_file(self):
+        path = self.path('columnar')
+        write_papers([], path)
+        self.assertEqual(list(iter_papers(path)), [])
+        self.assertEqual(count_papers(path), 0)
+
+    def test_not_a_columnar_file(self):
+        path = self.path('columnar')
+        with open(path, 'wb') as f:
+            f.write(b'[]')
+        with self.assertRaises(ValueError):
+            ColumnarPapers(path)
+        with self.assertRaises(ValueError):
+            papers_format('papers.csv')
+
+    def test_find_latest_papers_falls_back_to_other_formats(self):
+        with patch('config.DAYS_DIR', self.tmp_dir.name), patch('paper_files.PAPERS_FORMAT', 'jsonl'):
+            day_dir = os.path.join(self.tmp_dir.name, '2024-09-10')
+            self.assertEqual(find_latest_papers('2024-09-10'), os.path.join(day_dir, 'latest_papers.jsonl'))
+            write_papers(PAPERS, os.path.join(day_dir, 'latest_papers.json'))
+            self.assertEqual(find_latest_papers('2024-09-10'), os.path.join(day_dir, 'latest_papers.json'))
+
+if __name__ == '__main__':
+    unittest.main()
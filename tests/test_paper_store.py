@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+import tempfile
+from datetime import datetime
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from paper_store import PaperStore, split_arxiv_id
+
+def make_paper(arxiv_id, published, categories=('cs.AI',), title='Test Paper'):
+    return {
+        'id': f'http://arxiv.org/abs/{arxiv_id}',
+        'title': title,
+        'summary': 'This is a test summary.',
+        'authors': ['John Doe'],
+        'categories': list(categories),
+        'published': published,
+        'updated': published,
+    }
+
+class TestPaperStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = PaperStore(os.path.join(self.tmp_dir.name, 'papers.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_split_arxiv_id(self):
+        self.assertEqual(split_arxiv_id('http://arxiv.org/abs/2409.12345v2'), ('2409.12345', 2))
+        self.assertEqual(split_arxiv_id('http://arxiv.org/abs/cs/0112017v1'), ('cs/0112017', 1))
+        self.assertEqual(split_arxiv_id('2409.12345'), ('2409.12345', 1))
+
+    def test_upsert_keeps_latest_version(self):
+        self.store.upsert_papers([make_paper('2409.00001v1', '2023-09-15T00:00:00Z')])
+        self.store.upsert_papers([
+            make_paper('2409.00001v1', '2023-09-15T00:00:00Z'),
+            make_paper('2409.00001v2', '2023-09-15T00:00:00Z', title='Revised'),
+        ])
+        papers = self.store.get_papers()
+        self.assertEqual(len(papers), 1)
+        self.assertEqual(papers[0]['title'], 'Revised')
+        self.assertEqual(self.store.get_paper('2409.00001v1')['title'], 'Test Paper')
+
+    def test_high_water_mark_only_advances(self):
+        self.assertIsNone(self.store.get_high_water_mark())
+        self.store.upsert_papers([make_paper('2409.00002v1', '2023-09-16T12:00:00Z')])
+        self.store.upsert_papers([make_paper('2409.00001v1', '2023-09-15T00:00:00Z')])
+        self.assertEqual(self.store.get_high_water_mark(), datetime(2023, 9, 16, 12))
+
+    def test_incomplete_fetch_keeps_high_water_mark(self):
+        self.store.upsert_papers([make_paper('2409.00001v1', '2023-09-15T00:00:00Z')])
+        self.store.upsert_papers([make_paper('2409.00002v1', '2023-09-16T12:00:00Z')], advance_high_water_mark=False)
+        self.assertEqual(self.store.get_high_water_mark(), datetime(2023, 9, 15))
+        self.assertEqual(len(self.store.get_papers()), 2)
+
+    def test_get_papers_filters(self):
+        self.store.upsert_papers([
+            make_paper('2409.00001v1', '2023-09-14T00:00:00Z', categories=['cs.CV']),
+            make_paper('2409.00002v1', '2023-09-15T08:00:00Z', categories=['cs.LG']),
+            make_paper('2409.00003v1', '2023-09-16T08:00:00Z', categories=['cs.LG', 'cs.AI']),
+        ])
+        since = self.store.get_papers(since=datetime(2023, 9, 15).date())
+        self.assertEqual([p['id'][-12:] for p in since], ['2409.00003v1', '2409.00002v1'])
+        until = self.store.get_papers(until=datetime(2023, 9, 15).date())
+        self.assertEqual(len(until), 2)
+        self.assertEqual(len(self.store.get_papers(category='cs.LG')), 2)
+
+    def test_analyses_keyed_by_id_and_version(self):
+        self.store.save_analyses({'http://arxiv.org/abs/2409.00001v1': 'Analysis v1'}, 'model')
+        analyses = self.store.get_analyses([
+            'http://arxiv.org/abs/2409.00001v1',
+            'http://arxiv.org/abs/2409.00001v2',
+        ])
+        self.assertEqual(analyses, {'http://arxiv.org/abs/2409.00001v1': 'Analysis v1'})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from prompt_format import format_paper, format_papers, short_id, trim, TokenUsage
+
+class TestPromptFormat(unittest.TestCase):
+
+    def setUp(self):
+        self.paper = {
+            'id': 'http://arxiv.org/abs/2409.12345v2',
+            'title': 'A  Test\n  Paper',
+            'summary': 'This is a test summary. It has two sentences.',
+            'authors': ['John Doe', 'Jane Roe'],
+            'categories': ['cs.AI', 'cs.LG'],
+            'published': '2023-09-15T00:00:00Z',
+            'updated': '2023-09-15T00:00:00Z',
+        }
+
+    def test_short_id(self):
+        self.assertEqual(short_id('http://arxiv.org/abs/2409.12345v2'), '2409.12345v2')
+        self.assertEqual(short_id('2409.12345'), '2409.12345v1')
+
+    def test_trim(self):
+        self.assertEqual(trim('one two three', 100), 'one two three')
+        self.assertEqual(trim('one two three', 9), 'one two...')
+
+    def test_format_paper_default_fields(self):
+        self.assertEqual(
+            format_paper(self.paper, fields=['title', 'summary'], abstract_chars=600),
+            '[2409.12345v2] A Test Paper\nThis is a test summary. It has two sentences.'
+        )
+
+    def test_format_paper_optional_fields(self):
+        text = format_paper(self.paper, fields=['title', 'categories'], abstract_chars=600)
+        self.assertEqual(text, '[2409.12345v2] A Test Paper\nCategories: cs.AI, cs.LG')
+        self.assertNotIn('John Doe', text)
+        self.assertNotIn('2023-09-15', text)
+
+    def test_format_papers(self):
+        self.assertEqual(format_papers([{'title': 'A'}, {'title': 'B'}], fields=['title']), 'A\n\nB')
+        self.assertEqual(format_papers('already text'), 'already text')
+        self.assertIsNone(format_papers(None))
+
+    def test_token_usage(self):
+        usage = TokenUsage()
+        usage.record('Paper_Analyzer', 100, 20)
+        usage.record('Paper_Analyzer', 50, 10)
+        self.assertEqual(usage.snapshot(), {
+            'Paper_Analyzer': {'calls': 2, 'prompt_tokens': 150, 'response_tokens': 30}
+        })
+
+if __name__ == '__main__':
+    unittest.main()
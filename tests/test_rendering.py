@@ -0,0 +1,48 @@
+import unittest
+import os
+import sys
+import tempfile
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from rendering import new_figure, save_figure, render_charts
+
+def line_chart(values):
+    fig = new_figure(figsize=(2, 2))
+    fig.add_subplot().plot(values)
+    return fig
+
+def broken_chart():
+    raise ValueError("no data")
+
+class TestRendering(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def test_save_figure_closes_figure(self):
+        fig = line_chart([1, 2, 3])
+        save_figure(fig, self.path('chart.png'))
+        self.assertTrue(os.path.getsize(self.path('chart.png')) > 0)
+        self.assertEqual(fig.axes, [])
+
+    def test_render_charts_in_process_pool(self):
+        jobs = [(line_chart, ([1, i],), self.path(f'chart{i}.png')) for i in range(3)]
+        written = render_charts(jobs, processes=2)
+        self.assertEqual(written, [path for _, _, path in jobs])
+        for path in written:
+            self.assertTrue(os.path.exists(path))
+
+    def test_failed_chart_is_skipped(self):
+        jobs = [(broken_chart, (), self.path('broken.png')), (line_chart, ([1],), self.path('ok.png'))]
+        with self.assertLogs(level='ERROR'):
+            written = render_charts(jobs, processes=1)
+        self.assertEqual(written, [self.path('ok.png')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+import random
+import sys
+import os
+from itertools import combinations
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from similarity import title_tokens, jaccard, shared_term_pairs, jaccard_pairs
+
+def random_token_sets(count, vocabulary=40, seed=0):
+    rng = random.Random(seed)
+    words = [f"w{i}" for i in range(vocabulary)]
+    return [frozenset(rng.sample(words, rng.randint(0, 8))) for _ in range(count)]
+
+class TestSimilarity(unittest.TestCase):
+
+    def test_title_tokens(self):
+        self.assertEqual(title_tokens({'title': 'Deep Learning for Deep Nets'}), {'deep', 'learning', 'for', 'nets'})
+        self.assertEqual(title_tokens({'title': None}), frozenset())
+
+    def test_shared_term_pairs_matches_brute_force(self):
+        token_sets = random_token_sets(120)
+        expected = [
+            (i, j, len(a & b)) for (i, a), (j, b) in combinations(enumerate(token_sets), 2)
+            if len(a & b) >= 2
+        ]
+        self.assertEqual(shared_term_pairs(token_sets, min_shared=2), expected)
+
+    def test_jaccard_pairs_matches_brute_force(self):
+        token_sets = random_token_sets(150, vocabulary=15, seed=1)
+        for threshold in (0.0, 0.3, 0.5, 0.8):
+            expected = [
+                (i, j, jaccard(a, b)) for (i, a), (j, b) in combinations(enumerate(token_sets), 2)
+                if jaccard(a, b) > threshold
+            ]
+            self.assertEqual(jaccard_pairs(token_sets, threshold), expected, f"threshold {threshold}")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import gzip
+import os
+import sys
+import tempfile
+from unittest.mock import patch
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from site_assets import image_variants, compress_outputs, purge_css, srcset
+
+CSS = """/* comment */
+.used { color: red; }
+.unused { color: blue; }
+.used, .unused-too { margin: 0; }
+.space-y-4 > * + * { margin-top: 1rem; }
+body { margin: 0; }
+@media (max-width: 640px) { .used { color: green; } .unused { color: black; } }
+@media print { .unused { display: none; } }
+"""
+
+class TestSiteAssets(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output = self.tmpdir.name
+        os.makedirs(os.path.join(self.output, 'assets'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_image_variants(self):
+        Image.new('RGB', (600, 300), 'white').save(os.path.join(self.output, 'assets', 'chart.abc.png'))
+        variants = image_variants(self.output, 'assets/chart.abc.png', widths=[400, 800])
+        self.assertEqual((variants['width'], variants['height']), (600, 300))
+        self.assertEqual(variants['png'], [('assets/chart.abc.w400.png', 400), ('assets/chart.abc.png', 600)])
+        self.assertEqual(variants['webp'], [('assets/chart.abc.w400.webp', 400), ('assets/chart.abc.webp', 600)])
+        with Image.open(os.path.join(self.output, 'assets', 'chart.abc.w400.webp')) as image:
+            self.assertEqual(image.size, (400, 200))
+        self.assertEqual(srcset(variants['png'], '../'), '../assets/chart.abc.w400.png 400w, ../assets/chart.abc.png 600w')
+
+    def test_existing_variants_are_not_reencoded(self):
+        Image.new('RGB', (600, 300), 'white').save(os.path.join(self.output, 'assets', 'chart.abc.png'))
+        image_variants(self.output, 'assets/chart.abc.png', widths=[400])
+        with patch('PIL.Image.Image.save') as save:
+            image_variants(self.output, 'assets/chart.abc.png', widths=[400])
+        save.assert_not_called()
+
+    def test_compress_skips_unchanged_content(self):
+        with open(os.path.join(self.output, 'index.html'), 'w') as f:
+            f.write('<html>' + 'x' * 1000 + '</html>')
+        hashes = {}
+        self.assertEqual(compress_outputs(self.output, ['index.html', 'assets/chart.png'], hashes), 1)
+        with gzip.open(os.path.join(self.output, 'index.html.gz'), 'rt') as f:
+            self.assertTrue(f.read().startswith('<html>'))
+        self.assertEqual(compress_outputs(self.output, ['index.html'], hashes), 0)
+
+    def test_purge_css(self):
+        css = purge_css(CSS, ['<div class="used space-y-4">'])
+        self.assertEqual(css, (
+            '.used{color: red;}.used{margin: 0;}.space-y-4 > * + *{margin-top: 1rem;}body{margin: 0;}'
+            '@media (max-width: 640px){.used{color: green;}}'
+        ))
+
+if __name__ == '__main__':
+    unittest.main()
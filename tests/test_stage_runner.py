@@ -0,0 +1,114 @@
+import unittest
+import os
+import sys
+import tempfile
+from unittest.mock import MagicMock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from stage_runner import Stage, StageRunner, StageFailed
+
+class TestStageRunner(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.manifest = self.path('manifest.json')
+        self.source_value = 'papers'
+        self.calls = []
+        self.fail = set()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.tmpdir.name, name)
+
+    def writer(self, name, output, transform):
+        def run():
+            self.calls.append(name)
+            if name in self.fail:
+                raise RuntimeError("boom")
+            with open(output, 'w') as f:
+                f.write(transform())
+        return run
+
+    def read(self, name):
+        with open(self.path(name)) as f:
+            return f.read()
+
+    def runner(self, params=None):
+        stages = [
+            Stage('collect', self.writer('collect', self.path('papers.json'), lambda: self.source_value),
+                  outputs=[self.path('papers.json')], params=params or {'day': '2024-09-10'}),
+            Stage('analyze', self.writer('analyze', self.path('results.json'), lambda: 'stable result'),
+                  inputs=[self.path('papers.json')], outputs=[self.path('results.json')]),
+            Stage('render', self.writer('render', self.path('page.html'), lambda: self.read('results.json')),
+                  inputs=[self.path('results.json')], outputs=[self.path('page.html')]),
+        ]
+        return StageRunner(stages, self.manifest)
+
+    def test_unchanged_stages_are_skipped(self):
+        self.assertEqual(self.runner().run(), {'collect': 'ran', 'analyze': 'ran', 'render': 'ran'})
+        self.calls.clear()
+        self.assertEqual(self.runner().run(), {'collect': 'skipped', 'analyze': 'skipped', 'render': 'skipped'})
+        self.assertEqual(self.calls, [])
+
+    def test_callable_inputs_are_resolved_when_the_stage_runs(self):
+        legacy, current = self.path('papers.legacy'), self.path('papers.json')
+        with open(legacy, 'w') as f:
+            f.write('old papers')
+        found = lambda: current if os.path.exists(current) else legacy
+        stages = [
+            Stage('collect', self.writer('collect', current, lambda: self.source_value), outputs=[current],
+                  params=lambda: {'source': self.source_value}),
+            Stage('analyze', self.writer('analyze', self.path('results.json'), lambda: 'result'),
+                  inputs=[found], outputs=[self.path('results.json')]),
+        ]
+        StageRunner(stages, self.manifest).run()
+        # Collect writing new papers reruns analyze, though the legacy file is unchanged
+        self.source_value = 'new papers'
+        self.assertEqual(StageRunner(stages, self.manifest).run(), {'collect': 'ran', 'analyze': 'ran'})
+
+    def test_changed_params_rerun_only_what_changed(self):
+        self.runner().run()
+        self.calls.clear()
+        self.source_value = 'new papers'
+        # analyze reruns on new papers but writes the same result, so render is reused
+        self.runner({'day': '2024-09-11'}).run()
+        self.assertEqual(self.calls, ['collect', 'analyze'])
+
+    def test_modified_output_reruns_its_stage(self):
+        self.runner().run()
+        self.calls.clear()
+        with open(self.path('page.html'), 'w') as f:
+            f.write('edited')
+        self.runner().run()
+        self.assertEqual(self.calls, ['render'])
+
+    def test_failure_stops_and_resume_repeats_only_needed_work(self):
+        self.fail.add('analyze')
+        with self.assertRaises(StageFailed) as raised:
+            self.runner().run()
+        self.assertEqual(raised.exception.stage, 'analyze')
+        self.assertEqual(self.calls, ['collect', 'analyze'])
+
+        self.fail.clear()
+        self.calls.clear()
+        self.assertEqual(self.runner().run(resume=True), {'analyze': 'ran', 'render': 'ran'})
+        self.assertEqual(self.calls, ['analyze', 'render'])
+        self.assertIsNone(self.runner().manifest['failed'])
+
+    def test_missing_output_is_a_failure(self):
+        runner = StageRunner([Stage('noop', MagicMock(), outputs=[self.path('never.json')])], self.manifest)
+        with self.assertRaises(StageFailed):
+            runner.run()
+
+    def test_stage_selection(self):
+        self.runner().run()
+        self.calls.clear()
+        self.assertEqual(self.runner().run(start='analyze', end='analyze', force=True), {'analyze': 'ran'})
+        self.assertEqual(self.calls, ['analyze'])
+        with self.assertRaises(ValueError):
+            self.runner().run(start='deploy')
+
+if __name__ == '__main__':
+    unittest.main()
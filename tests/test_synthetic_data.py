@@ -0,0 +1,39 @@
+import unittest
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from synthetic_data import synthetic_papers, atom_feed, LocalArxivSession
+from arxiv_data_collector import parse_arxiv_response, fetch_all_pages
+
+class TestSyntheticData(unittest.TestCase):
+    def test_corpus_is_deterministic_and_prefix_stable(self):
+        papers = synthetic_papers(50)
+        self.assertEqual(papers, synthetic_papers(50))
+        self.assertEqual(synthetic_papers(20), papers[:20])
+        self.assertEqual(len({paper['id'] for paper in papers}), 50)
+        self.assertNotEqual(papers, synthetic_papers(50, seed=1))
+
+    def test_feed_parses_back_to_the_papers(self):
+        papers = synthetic_papers(5)
+        parsed = parse_arxiv_response(atom_feed(papers))
+        self.assertEqual([paper['id'] for paper in parsed], [paper['id'] for paper in papers])
+        self.assertEqual(parsed[0]['title'], papers[0]['title'])
+        self.assertEqual(parsed[0]['authors'], papers[0]['authors'])
+        self.assertEqual(parsed[0]['categories'], papers[0]['categories'])
+        self.assertEqual(parsed[0]['summary'].strip(), papers[0]['summary'])
+
+    def test_local_session_pages_through_fetch_all_pages(self):
+        papers = synthetic_papers(2500)
+        session = LocalArxivSession(papers)
+        pages = {}
+        failed = fetch_all_pages('query', on_page=pages.__setitem__, session_factory=lambda: session, delay=0)
+        self.assertEqual(failed, [])
+        self.assertEqual(sorted(pages), [0, 1000, 2000])
+        self.assertEqual(session.requests, 3)
+        fetched = [paper['id'] for start in sorted(pages) for paper in pages[start]]
+        self.assertEqual(fetched, [paper['id'] for paper in papers])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+import sys
+import os
+import threading
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from task_graph import TaskGraph
+
+class TestTaskGraph(unittest.TestCase):
+
+    def test_run_passes_inputs_positionally(self):
+        graph = TaskGraph()
+        graph.add("double", lambda x: x * 2, inputs=["x"])
+        graph.add("total", lambda x, double: x + double, inputs=["x", "double"])
+        outputs, timings = graph.run({"x": 3})
+        self.assertEqual(outputs, {"double": 6, "total": 9})
+        self.assertEqual(set(timings), {"double", "total"})
+
+    def test_independent_nodes_run_concurrently(self):
+        barrier = threading.Barrier(2, timeout=5)
+        graph = TaskGraph()
+        graph.add("a", lambda: barrier.wait() is not None)
+        graph.add("b", lambda: barrier.wait() is not None)
+        outputs, _ = graph.run()
+        self.assertEqual(outputs, {"a": True, "b": True})
+
+    def test_node_error_propagates(self):
+        def fail():
+            raise RuntimeError("boom")
+        graph = TaskGraph()
+        graph.add("a", fail)
+        graph.add("b", lambda a: a, inputs=["a"])
+        with self.assertRaises(RuntimeError):
+            graph.run()
+
+    def test_rejects_unknown_inputs_and_cycles(self):
+        graph = TaskGraph()
+        graph.add("a", lambda missing: missing, inputs=["missing"])
+        with self.assertRaises(ValueError):
+            graph.run()
+
+        graph = TaskGraph()
+        graph.add("a", lambda b: b, inputs=["b"])
+        graph.add("b", lambda a: a, inputs=["a"])
+        with self.assertRaises(ValueError):
+            graph.run()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the src directory to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
+
+from text_preprocessing import tokenize, tokenize_many, count_tokens, FALLBACK_STOPWORDS
+
+@patch('text_preprocessing._stopwords', FALLBACK_STOPWORDS)
+class TestTextPreprocessing(unittest.TestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(
+            tokenize("The State-of-the-Art in 3D vision, and LLMs!"),
+            ['stateoftheart', 'vision', 'llms']
+        )
+
+    def test_tokenize_many_matches_tokenize(self):
+        texts = ["Graph neural networks for molecules", None, "Diffusion models and the web"]
+        expected = [tokenize(text or '') for text in texts]
+        self.assertEqual(tokenize_many(texts), expected)
+        self.assertEqual(tokenize_many(texts, processes=2, parallel_threshold=1), expected)
+
+    def test_count_tokens(self):
+        counts = count_tokens(["diffusion models", "diffusion transformers"])
+        self.assertEqual(counts['diffusion'], 2)
+        self.assertEqual(counts['models'], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from text_preprocessing import FALLBACK_STOPWORDS
+from trend_index import TrendIndex, parse_trend_names, normalize_trend
+
+def paper(title):
+    return {'title': title, 'summary': ''}
+
+TRENDS_DAY_ONE = """1. **Large Language Models**: Scaling continues.
+2. **Diffusion Models** - Better image synthesis.
+3. Graph Learning: Message passing."""
+
+@patch('text_preprocessing._stopwords', FALLBACK_STOPWORDS)
+class TestTrendIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = TrendIndex(os.path.join(self.tmpdir.name, 'trends.db'))
+
+    def tearDown(self):
+        self.index.close()
+        self.tmpdir.cleanup()
+
+    def test_parse_trend_names(self):
+        self.assertEqual(parse_trend_names(TRENDS_DAY_ONE), ['Large Language Models', 'Diffusion Models', 'Graph Learning'])
+        self.assertEqual(parse_trend_names("trend1, trend2"), ['trend1', 'trend2'])
+
+    def test_normalize_trend(self):
+        self.assertEqual(normalize_trend('Large Language Models'), normalize_trend('large-language model'))
+        self.assertEqual(normalize_trend('Analysis'), 'analysis')
+
+    def test_mentions_count_matching_papers(self):
+        mentions = self.index.record_day(date(2024, 9, 10), TRENDS_DAY_ONE, [
+            paper('A large language model for code'),
+            paper('Large language models as judges'),
+            paper('Diffusion model distillation'),
+        ])
+        self.assertEqual(mentions, {'large language model': 2, 'diffusion model': 1, 'graph learning': 1})
+
+    def test_rolling_counts_and_changes(self):
+        for day in (2, 3):
+            self.index.record_day(date(2024, 9, day), "1. Graph Learning: x", [paper('Graph learning')] * 3)
+        self.index.record_day(date(2024, 9, 10), "1. Graph Learning: x\n2. Diffusion Models: y",
+                              [paper('Graph learning'), paper('Diffusion models')] * 2)
+
+        counts = self.index.get_counts(date(2024, 9, 10))
+        self.assertEqual(counts, [('Diffusion Models', 2, 2, 2), ('Graph Learning', 2, 2, 8)])
+        self.assertEqual(self.index.rising(date(2024, 9, 10)), [('Diffusion Models', 0, 2)])
+        self.assertEqual(self.index.falling(date(2024, 9, 10)), [('Graph Learning', 6, 2)])
+
+    def test_out_of_order_day_updates_later_rollups(self):
+        self.index.record_day(date(2024, 9, 10), "1. Graph Learning: x", [paper('Graph learning')])
+        self.index.record_day(date(2024, 9, 8), "1. Graph Learning: x", [paper('Graph learning')] * 2)
+        self.assertEqual(self.index.get_counts(date(2024, 9, 10)), [('Graph Learning', 1, 3, 3)])
+
+    def test_history(self):
+        self.index.record_day(date(2024, 9, 9), "1. Graph Learning: x", [paper('Graph learning')] * 2)
+        self.index.record_day(date(2024, 9, 10), "1. Graph Learning: x", [paper('Graph learning')])
+        history = self.index.get_history(date(2024, 9, 10), days=3)
+        self.assertEqual(history['days'], ['2024-09-08', '2024-09-09', '2024-09-10'])
+        self.assertEqual(history['series'], {'Graph Learning': [0, 2, 1]})
+        self.assertEqual(self.index.get_latest_day(), date(2024, 9, 10))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,20 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch
 import sys
 import os
 
 # Add the src directory to the Python path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src')))
 
-from visual_summary import load_content_analysis_results, generate_wordcloud, generate_trend_graph, create_visual_summary
+from visual_summary import (
+    load_content_analysis_results, generate_wordcloud, generate_frequency_wordcloud, generate_trend_graph,
+    create_visual_summary
+)
+from text_preprocessing import FALLBACK_STOPWORDS
+import matplotlib
+from matplotlib.figure import Figure
+
+TREND_HISTORY = {'days': ['2024-09-09', '2024-09-10'], 'series': {'Trend 1': [1, 3], 'Trend 2': [2, 0]}}
 
 class TestVisualSummary(unittest.TestCase):
 
@@ -15,40 +23,60 @@ class TestVisualSummary(unittest.TestCase):
         result = load_content_analysis_results()
         self.assertEqual(result, {"summary": "test summary"})
 
+    @patch('text_preprocessing._stopwords', FALLBACK_STOPWORDS)
     @patch('visual_summary.WordCloud')
-    @patch('visual_summary.plt')
-    def test_generate_wordcloud(self, mock_plt, mock_wordcloud):
-        mock_wordcloud.return_value.generate.return_value = MagicMock()
-        result = generate_wordcloud("test text")
-        self.assertIsNotNone(result)
+    @patch('visual_summary.rendering')
+    def test_generate_wordcloud(self, mock_rendering, mock_wordcloud):
+        result = generate_wordcloud("Test text with the test words")
+        self.assertIs(result, mock_rendering.new_figure.return_value)
         mock_wordcloud.assert_called_once()
-        mock_plt.figure.assert_called_once()
+        mock_wordcloud.return_value.generate_from_frequencies.assert_called_once_with(
+            {'test': 2, 'text': 1, 'words': 1}
+        )
+        mock_rendering.new_figure.assert_called_once()
+
+    def test_generate_trend_graph(self):
+        fig = generate_trend_graph(TREND_HISTORY)
+        self.assertIsInstance(fig, Figure)
+        lines = fig.axes[0].get_lines()
+        self.assertEqual([line.get_label() for line in lines], ['Trend 1', 'Trend 2'])
+        self.assertEqual(list(lines[0].get_ydata()), [1, 3])
 
-    @patch('visual_summary.plt')
-    def test_generate_trend_graph(self, mock_plt):
-        result = generate_trend_graph("trend1, trend2, trend1")
-        self.assertIsNotNone(result)
-        mock_plt.figure.assert_called_once()
+    def test_charts_do_not_touch_pyplot(self):
+        import matplotlib.pyplot as plt
+        self.assertEqual(matplotlib.get_backend().lower(), 'agg')
+        before = len(plt.get_fignums())
+        generate_trend_graph(TREND_HISTORY)
+        self.assertEqual(len(plt.get_fignums()), before)
 
     @patch('visual_summary.load_content_analysis_results')
-    @patch('visual_summary.generate_wordcloud')
-    @patch('visual_summary.markdown.markdown')
-    @patch('visual_summary.open', new_callable=unittest.mock.mock_open)
-    def test_create_visual_summary(self, mock_open, mock_markdown, mock_generate_wordcloud, mock_load_results):
+    @patch('visual_summary.load_trend_history')
+    @patch('visual_summary.wordcloud_frequencies')
+    @patch('visual_summary.word_frequencies.publish_wordclouds')
+    @patch('visual_summary.word_frequencies.plan_wordclouds')
+    @patch('visual_summary.rendering.render_charts')
+    def test_create_visual_summary(self, mock_render_charts, mock_plan, mock_publish,
+                                   mock_frequencies, mock_trend_history, mock_load_results):
         mock_load_results.return_value = {
             "summary": "test summary",
             "trends": "test trends",
             "top_articles": "test articles"
         }
-        mock_generate_wordcloud.return_value.savefig.return_value = None
-        mock_markdown.side_effect = lambda x: x
+        cloud_job = (generate_frequency_wordcloud, ({'test': 1},), 'cache/abc.png')
+        mock_plan.return_value = ([cloud_job], [('cache/abc.png', 'data/summary_wordcloud.png')])
+        mock_publish.return_value = ['data/summary_wordcloud.png', 'data/wordcloud_weekly.png']
+        mock_render_charts.side_effect = lambda jobs: [path for _, _, path in jobs]
+        mock_trend_history.return_value = TREND_HISTORY
 
-        create_visual_summary()
+        rendered = create_visual_summary()
 
         mock_load_results.assert_called_once()
-        mock_generate_wordcloud.assert_called_once()
-        mock_open.assert_called_once()
-        self.assertEqual(mock_markdown.call_count, 3)
+        mock_plan.assert_called_once_with(mock_frequencies.return_value, generate_frequency_wordcloud)
+        jobs = mock_render_charts.call_args.args[0]
+        self.assertEqual([chart for chart, _, _ in jobs], [generate_frequency_wordcloud, generate_trend_graph])
+        self.assertEqual(jobs[1][1], (TREND_HISTORY,))
+        self.assertTrue(jobs[1][2].endswith('trend_graph.png'))
+        self.assertEqual(rendered[-2:], ['data/summary_wordcloud.png', 'data/wordcloud_weekly.png'])
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+import os
+import sys
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from PIL import Image
+
+import website_generator
+from website_generator import SiteBuilder, headline
+
+RESULTS = {'summary': 'Models got bigger. Also faster.', 'top_articles': '1. Paper A', 'trends': '1. **Scaling**: more'}
+
+class TestSiteBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.tmpdir.name, 'output')
+        self.images = os.path.join(self.tmpdir.name, 'data')
+        os.makedirs(self.images)
+        Image.new('RGB', (1000, 500), 'white').save(os.path.join(self.images, 'summary_wordcloud.png'))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def build(self, day, results=RESULTS, trend_changes=None):
+        builder = SiteBuilder(self.output, cache_dir=os.path.join(self.tmpdir.name, 'cache'))
+        builder.add_day(day, results, image_dir=self.images, trend_changes=trend_changes)
+        return builder.build()
+
+    def read(self, rel_path):
+        with open(os.path.join(self.output, rel_path), 'r') as f:
+            return f.read()
+
+    def test_first_build_writes_day_index_and_archive(self):
+        written = self.build(date(2024, 9, 10))
+        self.assertIn('days/2024-09-10.html', written)
+        self.assertIn('index.html', written)
+        self.assertIn('archive/index.html', written)
+        asset = [path for path in written if path.startswith('assets/')]
+        self.assertEqual(len(asset), 1)
+        self.assertRegex(asset[0], r'^assets/summary_wordcloud\.[0-9a-f]{12}\.png$')
+        stem = asset[0][:-len('.png')]
+        index = self.read('index.html')
+        self.assertIn(f'src="{asset[0]}"', index)
+        self.assertIn(f'{stem}.w400.webp 400w, {stem}.w800.webp 800w, {stem}.webp 1000w', index)
+        self.assertIn(f'src="../{asset[0]}"', self.read('days/2024-09-10.html'))
+        self.assertIn('<strong>Scaling</strong>', index)
+        self.assertNotIn('cdn.tailwindcss.com', index)
+        self.assertIn('.text-4xl{', index)
+        self.assertNotIn('.shadow{', index)
+        self.assertTrue(os.path.exists(os.path.join(self.output, 'index.html.gz')))
+
+    def test_trend_changes_are_listed_under_trends(self):
+        self.build(date(2024, 9, 10), trend_changes=([('Agents', 1, 4)], []))
+        index = self.read('index.html')
+        self.assertIn('Rising this week', index)
+        self.assertIn('<li>Agents: 1 &rarr; 4</li>', index)
+        self.assertNotIn('Falling this week', index)
+
+    def test_rebuild_without_changes_writes_nothing(self):
+        self.build(date(2024, 9, 10))
+        self.assertEqual(self.build(date(2024, 9, 10)), [])
+
+    def test_new_day_only_touches_affected_pages(self):
+        for day in range(1, 5):
+            self.build(date(2024, 9, day))
+        written = self.build(date(2024, 9, 5), dict(RESULTS, summary='New things happened.'))
+        self.assertEqual(sorted(written), [
+            'archive/index.html', 'archive/page-1.html', 'days/2024-09-04.html',
+            'days/2024-09-05.html', 'days/2024-09-05.json', 'index.html',
+        ])
+        self.assertIn('days/2024-09-05.html', self.read('days/2024-09-04.html'))
+        self.assertIn('New things happened', self.read('archive/index.html'))
+
+    def test_archive_pages_are_stable(self):
+        with patch.object(website_generator, 'ARCHIVE_PAGE_SIZE', 2):
+            for day in range(1, 4):
+                self.build(date(2024, 9, day))
+            written = self.build(date(2024, 9, 4))
+        self.assertIn('archive/page-2.html', written)
+        self.assertNotIn('archive/page-1.html', written)
+
+    @patch('website_generator.load_trend_changes', return_value=([], []))
+    @patch('website_generator.load_results', return_value=RESULTS)
+    def test_daily_run_is_published_under_the_collection_day(self, mock_load_results, mock_trend_changes):
+        with patch('website_generator.artifact_dir', return_value=self.images), \
+                patch('website_generator.DATA_DIR', self.tmpdir.name):
+            written = website_generator.generate_website(output_dir=self.output, publish_day='2024-09-10')
+        self.assertIn('days/2024-09-10.html', written)
+        mock_load_results.assert_called_once_with(None)
+
+    def test_headline(self):
+        self.assertEqual(headline('First sentence. Second one.'), 'First sentence')
+
+if __name__ == '__main__':
+    unittest.main()
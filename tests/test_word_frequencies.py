@@ -0,0 +1,85 @@
+import unittest
+import os
+import sys
+import tempfile
+from datetime import date
+from unittest.mock import patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import word_frequencies
+from paper_store import PaperStore
+from text_preprocessing import FALLBACK_STOPWORDS
+from word_frequencies import (
+    update_term_counts, window_frequencies, frequency_hash, plan_wordclouds, publish_wordclouds
+)
+
+def make_paper(arxiv_id, published, title, summary=''):
+    return {'id': f'http://arxiv.org/abs/{arxiv_id}', 'title': title, 'summary': summary,
+            'authors': [], 'categories': ['cs.AI'], 'published': published, 'updated': published}
+
+def cloud(frequencies):
+    raise AssertionError("not rendered in these tests")
+
+@patch('text_preprocessing._stopwords', FALLBACK_STOPWORDS)
+class TestWordFrequencies(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = PaperStore(os.path.join(self.tmpdir.name, 'papers.db'))
+
+    def tearDown(self):
+        self.store.close()
+        self.tmpdir.cleanup()
+
+    def test_counts_are_incremental(self):
+        self.store.upsert_papers([make_paper('2409.00001v1', '2024-09-10T00:00:00Z', 'Graph neural networks')])
+        self.assertEqual(update_term_counts(self.store), 1)
+        self.assertEqual(update_term_counts(self.store), 0)
+
+        self.store.upsert_papers([make_paper('2409.00002v1', '2024-09-10T00:00:00Z', 'Neural fields')])
+        with patch('word_frequencies.tokenize_many', wraps=word_frequencies.tokenize_many) as tokenize:
+            self.assertEqual(update_term_counts(self.store), 1)
+        self.assertEqual(tokenize.call_args.args[0], ['Neural fields '])
+
+        counts = self.store.get_daily_term_counts(date(2024, 9, 10), date(2024, 9, 10))
+        self.assertEqual(counts[date(2024, 9, 10)], {'graph': 1, 'neural': 2, 'networks': 1, 'fields': 1})
+
+    def test_revised_paper_replaces_earlier_counts(self):
+        self.store.upsert_papers([make_paper('2409.00001v1', '2024-09-10T00:00:00Z', 'Graph networks')])
+        update_term_counts(self.store)
+        self.store.upsert_papers([make_paper('2409.00001v2', '2024-09-10T00:00:00Z', 'Graph transformers')])
+        update_term_counts(self.store)
+        counts = self.store.get_daily_term_counts(date(2024, 9, 10), date(2024, 9, 10))
+        self.assertEqual(counts[date(2024, 9, 10)], {'graph': 1, 'transformers': 1})
+
+    def test_window_frequencies(self):
+        self.store.upsert_papers([
+            make_paper('2409.00001v1', '2024-09-10T00:00:00Z', 'diffusion'),
+            make_paper('2409.00002v1', '2024-09-05T00:00:00Z', 'diffusion agents'),
+            make_paper('2409.00003v1', '2024-08-20T00:00:00Z', 'agents'),
+        ])
+        update_term_counts(self.store)
+        windows = window_frequencies(self.store, date(2024, 9, 10), {'daily': 1, 'weekly': 7, 'monthly': 30})
+        self.assertEqual(windows['daily'], {'diffusion': 1})
+        self.assertEqual(windows['weekly'], {'diffusion': 2, 'agents': 1})
+        self.assertEqual(windows['monthly'], {'diffusion': 2, 'agents': 2})
+
+    def test_clouds_are_cached_by_frequency_hash(self):
+        self.assertEqual(frequency_hash({'a': 1, 'b': 2}), frequency_hash({'b': 2, 'a': 1}))
+        cache_dir = os.path.join(self.tmpdir.name, 'cache')
+        out = os.path.join(self.tmpdir.name, 'daily.png')
+        clouds = {out: {'a': 1}, os.path.join(self.tmpdir.name, 'weekly.png'): {'a': 1}}
+
+        jobs, copies = plan_wordclouds(clouds, cloud, cache_dir)
+        self.assertEqual(len(jobs), 1)
+        with open(jobs[0][2], 'wb') as f:
+            f.write(b'png')
+
+        jobs, copies = plan_wordclouds(clouds, cloud, cache_dir)
+        self.assertEqual(jobs, [])
+        self.assertEqual(publish_wordclouds(copies), list(clouds))
+        with open(out, 'rb') as f:
+            self.assertEqual(f.read(), b'png')
+
+if __name__ == '__main__':
+    unittest.main()